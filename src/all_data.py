@@ -1,9 +1,14 @@
+import datetime
 from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 from src.components.plot_filtered_result import plot_filtered_result
+from src.utils.integrity import drop_broken_rows, get_integrity_file
+from src.utils.reference_index import ReferenceIndex
+from src.utils.reference_table import open_shared_reference_table
+from src.utils.shared_cache import unique_values
 
 APP_DATA_PATH = Path("artifacts/app_data/")
 if not APP_DATA_PATH.is_dir():
@@ -23,12 +28,61 @@ time_series_default_values = [
 default_axis = "Y"
 default_direction = "GL"
 default_mv_avg_window_size_frac = "0.05"
+PAGE_SIZE = 20
 
 
 mv_avg_window_size_fracs = list(
     sorted(d.name for d in APP_DATA_PATH.iterdir() if d.is_dir())
 )
 
+
+def _mtime(path: Path) -> float:
+    return path.stat().st_mtime if path.is_file() else 0.0
+
+
+def get_reference_mtime(mv_avg_window_size_frac: str) -> float:
+    return max(
+        _mtime(APP_DATA_PATH / mv_avg_window_size_frac / "reference_table.csv"),
+        _mtime(get_integrity_file(mv_avg_window_size_frac)),
+    )
+
+
+# The index and query results are shared by all sessions of this process;
+# treat them as read-only. A rerun with the same filters is a cache hit.
+@st.cache_resource(max_entries=4)
+def load_reference_index(
+    mv_avg_window_size_frac: str,
+    mtime: float,
+) -> ReferenceIndex:
+    reference_table = open_shared_reference_table(
+        mv_avg_window_size_frac
+    ).to_pandas()
+    return ReferenceIndex(
+        drop_broken_rows(reference_table, mv_avg_window_size_frac)
+    )
+
+
+@st.cache_resource(max_entries=32)
+def query_reference_table(
+    mv_avg_window_size_frac: str,
+    mtime: float,
+    machine_ids: tuple[object, ...],
+    measure_direction: str,
+    axis: str,
+    start: datetime.date,
+    end: datetime.date,
+    speeds: tuple[str, ...],
+) -> pd.DataFrame:
+    return load_reference_index(mv_avg_window_size_frac, mtime).query(
+        list(machine_ids),
+        start,
+        end,
+        measure_direction=measure_direction,
+        axis=axis,
+        speeds=list(speeds),
+    )
+
+
 st.set_page_config(layout="wide")
 st.title("All Data Viewer")
 
@@ -54,26 +108,24 @@ with st.form("mv_avg_window_size_frac_form"):
 
 # ---- FORM 2 ----
 if st.session_state.mv_avg_done:
-    reference_table = pd.read_csv(
-        APP_DATA_PATH
-        / f"{st.session_state.mv_avg_window_size_frac}/reference_table.csv",
-        index_col=None,
-    )
+    frac = st.session_state.mv_avg_window_size_frac
+    mtime = get_reference_mtime(frac)
+    reference_index = load_reference_index(frac, mtime)
+    reference_table = open_shared_reference_table(frac)
     with st.form("single_selection_form"):
-        single_selection_row = st.columns(3)
-        machine_id = single_selection_row[0].selectbox(
+        single_selection_row = st.columns([2, 1, 1])
+        machine_ids = single_selection_row[0].multiselect(
             "machine_id",
-            list(sorted(reference_table["machine_id"].unique())),
-        )
-        measure_directions = list(
-            sorted(reference_table["measure_direction"].unique())
+            reference_index.machine_ids,
+            default=reference_index.machine_ids[:1],
         )
+        measure_directions = unique_values(reference_table, "measure_direction")
         measure_direction = single_selection_row[1].selectbox(
             "measure_direction",
             measure_directions,
             index=measure_directions.index(default_direction),
         )
-        axes = list(sorted(reference_table["axis"].unique()))
+        axes = unique_values(reference_table, "axis")
         axis = single_selection_row[2].selectbox(
             "axis",
             axes,
@@ -83,28 +135,33 @@ if st.session_state.mv_avg_done:
 
         if single_submitted:
             st.session_state.single_done = True
-            st.session_state.selected_machine_id = machine_id
+            st.session_state.selected_machine_ids = machine_ids
             st.session_state.selected_measure_direction = measure_direction
             st.session_state.selected_axis = axis
 
 # ---- FORM 3 ----
 if st.session_state.mv_avg_done and st.session_state.single_done:
-    filtered_table = reference_table[
-        (reference_table["machine_id"] == st.session_state.selected_machine_id)
-        & (
-            reference_table["measure_direction"]
-            == st.session_state.selected_measure_direction
-        )
-        & (reference_table["axis"] == st.session_state.selected_axis)
-    ]
+    date_bounds = reference_index.date_bounds(
+        st.session_state.selected_machine_ids
+    )
+    if date_bounds is None:
+        st.error("Select at least one machine with measurements.")
+        st.stop()
     with st.form("multi_selection_form"):
-        speed_possible_values = list(sorted(filtered_table["speed"].unique()))
+        speed_possible_values = unique_values(
+            reference_table,
+            "speed",
+            measure_direction=st.session_state.selected_measure_direction,
+            axis=st.session_state.selected_axis,
+        )
         speed = st.multiselect(
             "speed", speed_possible_values, default=speed_possible_values
         )
-        date_possible_values = list(sorted(filtered_table["date"].unique()))
-        date = st.multiselect(
-            "date", date_possible_values, default=date_possible_values
+        date_range = st.date_input(
+            "date range",
+            value=date_bounds,
+            min_value=date_bounds[0],
+            max_value=date_bounds[1],
         )
         time_series = st.multiselect(
             "time series",
@@ -114,9 +171,12 @@ if st.session_state.mv_avg_done and st.session_state.single_done:
 
         multi_submitted = st.form_submit_button("Apply")
         if multi_submitted:
+            if not isinstance(date_range, tuple) or len(date_range) != 2:
+                st.error("Select a start and an end date.")
+                st.stop()
             st.session_state.multi_done = True
             st.session_state.selected_speed = speed
-            st.session_state.selected_date = date
+            st.session_state.selected_date_range = date_range
             st.session_state.selected_time_series = time_series
 
 
@@ -125,23 +185,30 @@ if (
     and st.session_state.single_done
     and st.session_state.multi_done
 ):
-    machine_id = st.session_state.selected_machine_id
-    measure_direction = st.session_state.selected_measure_direction
-    axis = st.session_state.selected_axis
-    speed = st.session_state.selected_speed
-    date = st.session_state.selected_date
-    time_series = st.session_state.selected_time_series
-
-    filtered_table = reference_table[
-        (reference_table["machine_id"] == machine_id)
-        & (reference_table["measure_direction"] == measure_direction)
-        & (reference_table["axis"] == axis)
-        & (reference_table["speed"].isin(speed))
-        & (reference_table["date"].isin(date))
-    ]
+    start, end = st.session_state.selected_date_range
+    filtered_table = query_reference_table(
+        frac,
+        mtime,
+        tuple(st.session_state.selected_machine_ids),
+        st.session_state.selected_measure_direction,
+        st.session_state.selected_axis,
+        start,
+        end,
+        tuple(st.session_state.selected_speed),
+    )
+    n_pages = max(1, -(-len(filtered_table) // PAGE_SIZE))
+    page = st.number_input(
+        f"Page (of {n_pages}, {len(filtered_table)} measurements)",
+        min_value=1,
+        max_value=n_pages,
+        value=1,
+    )
 
     plot_filtered_result(
-        filtered_table=filtered_table,
-        time_series=time_series,
+        filtered_table=filtered_table.iloc[
+            (page - 1) * PAGE_SIZE : page * PAGE_SIZE
+        ],
+        time_series=st.session_state.selected_time_series,
         df_description="Filtered Reference Table",
+        row_index_vars=["machine_id", "date", "speed"],
     )
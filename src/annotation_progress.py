@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from src.utils.annotation_index import (
+    CLASSES,
+    SUMMARY_INDEX_VARS,
+    get_summary_index_file,
+    load_summary_index,
+    rebuild_summary_index,
+)
+
+APP_DATA_PATH = Path("artifacts/app_data/")
+if not APP_DATA_PATH.is_dir():
+    st.error(f"No data found in {APP_DATA_PATH}. Please run ETL first.")
+    st.stop()
+
+mv_avg_window_size_fracs = list(
+    sorted(d.name for d in APP_DATA_PATH.iterdir() if d.is_dir())
+)
+
+
+@st.cache_data
+def load_reference_counts(
+    mv_avg_window_size_frac: str,
+    mtime: float,
+) -> pd.DataFrame:
+    reference_table = pd.read_csv(
+        APP_DATA_PATH / mv_avg_window_size_frac / "reference_table.csv",
+        index_col=None,
+        usecols=[*SUMMARY_INDEX_VARS, "date"],
+        dtype=str,
+    )
+    reference_table = reference_table.drop_duplicates()
+    return (
+        reference_table.groupby(SUMMARY_INDEX_VARS)
+        .size()
+        .rename("total")
+        .reset_index()
+        .assign(mv_avg_window_size_frac=mv_avg_window_size_frac)
+    )
+
+
+@st.cache_data
+def load_progress(
+    index_mtime: float,
+    reference_mtimes: dict[str, float],
+) -> pd.DataFrame:
+    summary_index = load_summary_index()
+    reference_counts = pd.concat(
+        [
+            load_reference_counts(frac, mtime)
+            for frac, mtime in reference_mtimes.items()
+        ],
+        ignore_index=True,
+    )
+    progress = reference_counts.merge(
+        summary_index, on=SUMMARY_INDEX_VARS, how="left"
+    )
+    progress[[*CLASSES, "labeled"]] = (
+        progress[[*CLASSES, "labeled"]].fillna(0).astype(int)
+    )
+    progress["unlabeled"] = (progress["total"] - progress["labeled"]).clip(
+        lower=0
+    )
+    return progress
+
+
+def _mtime(path: Path) -> float:
+    return path.stat().st_mtime if path.is_file() else 0.0
+
+
+st.set_page_config(layout="wide")
+st.title("Annotation Progress")
+
+if st.button("Rebuild summary index"):
+    rebuild_summary_index()
+
+reference_mtimes = {
+    frac: _mtime(APP_DATA_PATH / frac / "reference_table.csv")
+    for frac in mv_avg_window_size_fracs
+}
+reference_mtimes = {
+    frac: mtime for frac, mtime in reference_mtimes.items() if mtime > 0
+}
+if len(reference_mtimes) == 0:
+    st.error(f"No reference tables found in {APP_DATA_PATH}.")
+    st.stop()
+progress = load_progress(
+    index_mtime=_mtime(get_summary_index_file()),
+    reference_mtimes=reference_mtimes,
+)
+
+count_columns = ["total", "labeled", "unlabeled", *CLASSES]
+group_by = st.multiselect(
+    "group by",
+    ["mv_avg_window_size_frac", *SUMMARY_INDEX_VARS],
+    default=["mv_avg_window_size_frac", "axis", "measure_direction", "speed"],
+)
+
+if len(group_by) == 0:
+    st.dataframe(progress)
+else:
+    grouped = progress.groupby(group_by)[count_columns].sum()
+    grouped["progress"] = grouped["labeled"] / grouped["total"].where(
+        grouped["total"] > 0
+    )
+    st.dataframe(
+        grouped,
+        column_config={
+            "progress": st.column_config.ProgressColumn(
+                "progress", min_value=0.0, max_value=1.0, format="percent"
+            )
+        },
+    )
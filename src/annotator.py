@@ -1,17 +1,81 @@
+from collections import deque
 from pathlib import Path
-from typing import Literal
+from typing import Literal, cast
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
-import streamlit.components.v1 as components
 import streamlit_hotkeys as hotkeys
 
+from src.components.artifact_updates import (
+    live_updates,
+    pop_artifact_changes,
+    record_own_write,
+)
+from src.components.plot_downsampled import (
+    get_sample_range_key,
+    load_pyramid,
+    plot_downsampled_series,
+)
+from src.components.plot_html import iter_plot_panels, show_plot_panel
+from src.utils.annotation_index import update_summary_index
+from src.utils.annotations import (
+    ANNO_INDEX_VARS,
+    SAVE_PATH,
+    get_annotation_file,
+    lookup_slice_labels,
+)
+from src.utils.downsampling import Pyramid, get_pyramid_file
+from src.utils.global_queue import (
+    QUEUE_ORDERS,
+    find_row_position,
+    list_slices,
+    merge_slice_queues,
+    score_priorities,
+)
+from src.utils.integrity import get_integrity_file
+from src.utils.measurement import (
+    MEASUREMENT_KEY_VARS,
+    normalize_measurement_keys,
+)
+from src.utils.quality import QUALITY_COLUMNS, get_quality_file, load_quality
+from src.utils.reference_table import (
+    get_reference_table_file,
+    open_shared_reference_table,
+    open_shared_slice_table,
+)
+from src.utils.scores import SCORES_FILE_NAME, get_scores_dir, load_scores
+from src.utils.session_snapshot import (
+    SessionSnapshot,
+    load_snapshot,
+    save_snapshot,
+)
+from src.utils.shared_cache import unique_values
+from src.utils.similarity import (
+    SimilarityIndex,
+    build_similarity_indexes,
+    get_similarity_index_file,
+    is_similarity_index_current,
+)
+from src.utils.spans import (
+    SPAN_CLASSES,
+    SPAN_COLUMNS,
+    SpanIndex,
+    get_spans_file,
+    iter_spans_files,
+    load_all_spans,
+    load_slice_spans,
+    save_slice_spans,
+)
+from src.utils.unlabeled_index import UnlabeledIndex
+
 APP_DATA_PATH = Path("artifacts/app_data/")
 if not APP_DATA_PATH.is_dir():
     st.error(f"No data found in {APP_DATA_PATH}. Please run ETL first.")
     st.stop()
 
-SAVE_PATH = Path("artifacts/annotator_data/")
 if not SAVE_PATH.is_dir():
     SAVE_PATH.mkdir(parents=True, exist_ok=True)
 
@@ -41,24 +105,35 @@ CLASS2COLOR = {
     "edge_case": "yellow",
     "anomaly": "red",
 }
-ANNO_INDEX_VARS = ["machine_id", "date", "speed"]
+TABLE_PAGE_SIZE = 50
+QUALITY_FORMATS = {
+    "length": "{:.0f}",
+    "nan_fraction": "{:.1%}",
+    "flatline_fraction": "{:.1%}",
+    "peak_residual": "{:.3g}",
+    "contour_rms": "{:.3g}",
+    "current_correlation": "{:.2f}",
+}
 
 mv_avg_window_size_fracs = list(
     sorted(d.name for d in APP_DATA_PATH.iterdir() if d.is_dir())
 )
 
-hotkeys.activate(
-    [
-        hotkeys.hk("next", "right"),
-        hotkeys.hk("previous", "left"),
-        hotkeys.hk("save", "s", meta=True, prevent_default=True),  # Ctrl+S
-        hotkeys.hk("save", "s", ctrl=True, prevent_default=True),  # Ctrl+S
-        hotkeys.hk("normal", "1"),
-        hotkeys.hk("normal", "space"),
-        hotkeys.hk("edge_case", "2"),
-        hotkeys.hk("anomaly", "3"),
-    ]
-)
+HOTKEYS_KEY = "annotator"
+HOTKEYS = [
+    hotkeys.hk("next", "right"),
+    hotkeys.hk("previous", "left"),
+    hotkeys.hk("next_unlabeled", "right", shift=True),
+    hotkeys.hk("previous_unlabeled", "left", shift=True),
+    hotkeys.hk("next_queued", "q"),
+    hotkeys.hk("next_global", "g"),
+    hotkeys.hk("save", "s", meta=True, prevent_default=True),  # Ctrl+S
+    hotkeys.hk("save", "s", ctrl=True, prevent_default=True),  # Ctrl+S
+    hotkeys.hk("normal", "1"),
+    hotkeys.hk("normal", "space"),
+    hotkeys.hk("edge_case", "2"),
+    hotkeys.hk("anomaly", "3"),
+]
 
 # Initialize state
 if "mv_avg_done" not in st.session_state:
@@ -67,8 +142,6 @@ if "single_done" not in st.session_state:
     st.session_state.single_done = False
 if "speed_done" not in st.session_state:
     st.session_state.speed_done = False
-if "reference_table" not in st.session_state:
-    st.session_state.reference_table = pd.DataFrame()
 if "selected_mv_avg_window_size_frac" not in st.session_state:
     st.session_state.selected_mv_avg_window_size_frac = (
         DEFAULT_MV_AVG_WINDOW_SIZE_FRAC
@@ -81,34 +154,500 @@ if "measure_direction" not in st.session_state:
     st.session_state.measure_direction = DEFAULT_DIRECTION
 if "speed" not in st.session_state:
     st.session_state.speed = DEFAULT_SPEED
-if "filtered_table" not in st.session_state:
-    st.session_state.filtered_table = pd.DataFrame()
+if "slice_loaded" not in st.session_state:
+    st.session_state.slice_loaded = False
+if "label_deltas" not in st.session_state:
+    st.session_state.label_deltas = {}
+if "unlabeled_index" not in st.session_state:
+    st.session_state.unlabeled_index = UnlabeledIndex([])
+if "similar_rows" not in st.session_state:
+    st.session_state.similar_rows = pd.DataFrame()
+if "review_queue" not in st.session_state:
+    st.session_state.review_queue = deque()
 if "content_name" not in st.session_state:
     st.session_state.content_name = "feature_selection"
+if "snapshot_restored" not in st.session_state:
+    st.session_state.snapshot_restored = False
+if "resume_snapshot" not in st.session_state:
+    st.session_state.resume_snapshot = None
+if "saved_snapshot" not in st.session_state:
+    st.session_state.saved_snapshot = None
+if "global_queue" not in st.session_state:
+    st.session_state.global_queue = None
+if "global_queue_served" not in st.session_state:
+    st.session_state.global_queue_served = 0
+if "pending_row_id" not in st.session_state:
+    st.session_state.pending_row_id = None
+
 
+def _mtime(path: Path) -> float:
+    return path.stat().st_mtime if path.is_file() else 0.0
 
-def set_annotations(
-    filtered_table: pd.DataFrame,
+
+def get_slice_mtime(mv_avg_window_size_frac: str) -> float:
+    # Slices leave out the rows flagged by `verify`, so they change with
+    # either file.
+    return max(
+        _mtime(APP_DATA_PATH / mv_avg_window_size_frac / "reference_table.csv"),
+        _mtime(get_integrity_file(mv_avg_window_size_frac)),
+    )
+
+
+# Large tables are cached once per process and shared by all sessions; they
+# must be treated as read-only. Sessions only keep their selection, row
+# position and unsaved label deltas.
+@st.cache_resource(max_entries=4)
+def load_reference_table(
+    mv_avg_window_size_frac: str,
+    mtime: float,
+) -> pa.Table:
+    return open_shared_reference_table(mv_avg_window_size_frac)
+
+
+def get_reference_table(mv_avg_window_size_frac: str) -> pa.Table:
+    return load_reference_table(
+        mv_avg_window_size_frac,
+        _mtime(APP_DATA_PATH / mv_avg_window_size_frac / "reference_table.csv"),
+    )
+
+
+@st.cache_resource(max_entries=16)
+def load_slice_table(
+    mv_avg_window_size_frac: str,
     axis: str,
     measure_direction: str,
     speed: str,
+    mtime: float,
 ) -> pd.DataFrame:
-    annotation_file = (
-        SAVE_PATH / axis / measure_direction / speed / "annotations.csv"
+    return open_shared_slice_table(
+        mv_avg_window_size_frac,
+        axis=axis,
+        measure_direction=measure_direction,
+        speed=speed,
+    )
+
+
+@st.cache_resource(max_entries=16)
+def load_slice_labels(
+    mv_avg_window_size_frac: str,
+    axis: str,
+    measure_direction: str,
+    speed: str,
+    mtime: float,
+    annotations_mtime: float,
+) -> npt.NDArray[np.object_]:
+    filtered_table = load_slice_table(
+        mv_avg_window_size_frac, axis, measure_direction, speed, mtime
+    )
+    labels = lookup_slice_labels(
+        cast(pd.MultiIndex, filtered_table.index),
+        axis=axis,
+        measure_direction=measure_direction,
+        speed=speed,
+    )
+    return labels.to_numpy(dtype=object)
+
+
+def get_filtered_table() -> pd.DataFrame:
+    frac = st.session_state.selected_mv_avg_window_size_frac
+    return load_slice_table(
+        frac,
+        st.session_state.axis,
+        st.session_state.measure_direction,
+        st.session_state.speed,
+        get_slice_mtime(frac),
+    )
+
+
+def get_slice_labels(
+    axis: str,
+    measure_direction: str,
+    speed: str,
+) -> npt.NDArray[np.object_]:
+    frac = st.session_state.selected_mv_avg_window_size_frac
+    return load_slice_labels(
+        frac,
+        axis,
+        measure_direction,
+        speed,
+        get_slice_mtime(frac),
+        _mtime(
+            get_annotation_file(
+                axis=axis, measure_direction=measure_direction, speed=speed
+            )
+        ),
+    )
+
+
+def get_base_labels() -> npt.NDArray[np.object_]:
+    return get_slice_labels(
+        st.session_state.axis,
+        st.session_state.measure_direction,
+        st.session_state.speed,
+    )
+
+
+# Unsaved labels are keyed by measurement rather than by row position, so
+# they stay on the right rows when the reference table is refreshed.
+def get_label(position: int) -> str | float:
+    label: str | float = st.session_state.label_deltas.get(
+        get_filtered_table().index[position], get_base_labels()[position]
+    )
+    return label
+
+
+def get_labels() -> pd.Series:  # type: ignore[type-arg]
+    index = get_filtered_table().index
+    labels = get_base_labels()
+    if st.session_state.label_deltas:
+        deltas = index.map(st.session_state.label_deltas).to_numpy()
+        labels = np.where(pd.notna(deltas), deltas, labels)
+    return pd.Series(labels, index=index, name="class")
+
+
+def get_slice_files() -> list[Path]:
+    return [
+        get_reference_table_file(
+            st.session_state.selected_mv_avg_window_size_frac
+        ),
+        get_annotation_file(
+            axis=st.session_state.axis,
+            measure_direction=st.session_state.measure_direction,
+            speed=st.session_state.speed,
+        ),
+        get_slice_spans_file(),
+    ]
+
+
+def refresh_slice() -> None:
+    filtered_table_len = len(get_filtered_table())
+    st.session_state.unlabeled_index = UnlabeledIndex(
+        get_labels().isna().to_numpy()
+    )
+    st.session_state.row_id = min(
+        st.session_state.row_id, max(filtered_table_len - 1, 0)
+    )
+    st.session_state.similar_rows = pd.DataFrame()
+    st.session_state.review_queue = deque(
+        row for row in st.session_state.review_queue if row < filtered_table_len
+    )
+
+
+def get_row_key(position: int) -> list[object]:
+    return [
+        value.item() if isinstance(value, np.generic) else value
+        for value in get_filtered_table().index[position]
+    ]
+
+
+def save_session_snapshot() -> None:
+    if not st.session_state.user:
+        return
+    snapshot = SessionSnapshot(
+        user=st.session_state.user,
+        mv_avg_window_size_frac=(
+            st.session_state.selected_mv_avg_window_size_frac
+        ),
+        axis=st.session_state.axis,
+        measure_direction=st.session_state.measure_direction,
+        speed=st.session_state.speed,
+        row_id=st.session_state.row_id,
+        row_key=get_row_key(st.session_state.row_id),
+    )
+    if snapshot != st.session_state.saved_snapshot:
+        save_snapshot(snapshot)
+        st.session_state.saved_snapshot = snapshot
+
+
+def restore_session(snapshot: SessionSnapshot) -> None:
+    # Skips the three selection forms; the slice itself is loaded below
+    # like any other selection.
+    st.session_state.mv_avg_done = True
+    st.session_state.single_done = True
+    st.session_state.speed_done = True
+    st.session_state.mv_avg_window_size_frac = snapshot.mv_avg_window_size_frac
+    st.session_state.selected_measure_direction = snapshot.measure_direction
+    st.session_state.selected_axis = snapshot.axis
+    st.session_state.selected_speed = snapshot.speed
+    st.session_state.resume_snapshot = snapshot
+    st.session_state.content_name = "plots"
+
+
+def find_resume_row(snapshot: SessionSnapshot) -> int:
+    index = get_filtered_table().index
+    if len(index) == 0:
+        return 0
+    row_id = min(snapshot.row_id, len(index) - 1)
+    key = tuple(snapshot.row_key)
+    if key and index[row_id] != key:
+        matches = np.flatnonzero(index.isin([key]))
+        if len(matches) > 0:
+            row_id = int(matches[0])
+    # Land on the next row still to label, usually the saved row itself.
+    unlabeled_index = st.session_state.unlabeled_index
+    if row_id not in unlabeled_index:
+        next_unlabeled = unlabeled_index.next_after(row_id)
+        if next_unlabeled is None:
+            next_unlabeled = unlabeled_index.first()
+        if next_unlabeled is not None:
+            row_id = next_unlabeled
+    return row_id
+
+
+@st.cache_resource(max_entries=2)
+def load_score_table(
+    mv_avg_window_size_frac: str,
+    mtime: float,
+) -> pd.DataFrame:
+    return load_scores(mv_avg_window_size_frac)
+
+
+def advance_global_queue() -> None:
+    # Rows labeled since the queue was started, by this or another session,
+    # are skipped. Moving to another slice reloads the page on that slice.
+    current_slice = (
+        st.session_state.axis,
+        st.session_state.measure_direction,
+        st.session_state.speed,
+    )
+    frac = st.session_state.selected_mv_avg_window_size_frac
+    for slice_, row_key in st.session_state.global_queue:
+        in_current_slice = (
+            st.session_state.slice_loaded and slice_ == current_slice
+        )
+        if in_current_slice:
+            index = get_filtered_table().index
+        else:
+            axis, measure_direction, speed = slice_
+            index = load_slice_table(
+                frac, axis, measure_direction, speed, get_slice_mtime(frac)
+            ).index
+        position = find_row_position(cast(pd.MultiIndex, index), row_key)
+        if position is None:
+            continue
+        if in_current_slice:
+            label = get_label(position)
+        else:
+            label = get_slice_labels(*slice_)[position]
+        if isinstance(label, str):
+            continue
+        st.session_state.global_queue_served += 1
+        if in_current_slice:
+            st.session_state.row_id = position
+            return
+        if st.session_state.label_deltas:
+            save_annotations_to_file()
+        (
+            st.session_state.selected_axis,
+            st.session_state.selected_measure_direction,
+            st.session_state.selected_speed,
+        ) = slice_
+        st.session_state.pending_row_id = position
+        return
+    st.session_state.global_queue = None
+    st.toast("Global queue is empty", icon="🏁")
+
+
+@st.cache_resource(max_entries=16)
+def load_slice_span_index(
+    axis: str,
+    measure_direction: str,
+    speed: str,
+    mtime: float,
+) -> SpanIndex:
+    return SpanIndex(load_slice_spans(axis, measure_direction, speed))
+
+
+def get_slice_spans_file() -> Path:
+    return get_spans_file(
+        st.session_state.axis,
+        st.session_state.measure_direction,
+        st.session_state.speed,
+    )
+
+
+def get_slice_span_index() -> SpanIndex:
+    return load_slice_span_index(
+        st.session_state.axis,
+        st.session_state.measure_direction,
+        st.session_state.speed,
+        _mtime(get_slice_spans_file()),
+    )
+
+
+@st.cache_resource(max_entries=1)
+def load_span_index(mtimes: tuple[tuple[Path, float], ...]) -> SpanIndex:
+    return SpanIndex(load_all_spans())
+
+
+def get_span_index() -> SpanIndex:
+    return load_span_index(tuple((f, _mtime(f)) for f in iter_spans_files()))
+
+
+def update_slice_spans(
+    row_key: tuple[object, ...],
+    add: dict[str, object] | None = None,
+    remove: dict[str, object] | None = None,
+) -> None:
+    # Spans are read back from disk first, so spans saved meanwhile by
+    # other sessions on the same slice are kept.
+    axis = st.session_state.axis
+    measure_direction = st.session_state.measure_direction
+    speed = st.session_state.speed
+    spans = load_slice_spans(axis, measure_direction, speed)
+    key = dict(zip(ANNO_INDEX_VARS, row_key))
+    if remove is not None:
+        target = {**key, **remove}
+        matches = np.flatnonzero(
+            np.logical_and.reduce(
+                [
+                    spans[column].astype(str) == str(target[column])
+                    for column in SPAN_COLUMNS
+                ]
+            )
+        )
+        spans = spans.drop(spans.index[matches[:1]])
+    if add is not None:
+        spans = pd.concat(
+            [spans, pd.DataFrame([{**key, **add}])], ignore_index=True
+        )
+    spans_file = save_slice_spans(spans, axis, measure_direction, speed)
+    record_own_write(spans_file)
+
+
+@st.cache_resource(max_entries=4)
+def load_quality_table(
+    mv_avg_window_size_frac: str,
+    mtime: float,
+) -> pd.DataFrame:
+    return load_quality(mv_avg_window_size_frac)
+
+
+@st.cache_resource(max_entries=16)
+def load_slice_quality(
+    mv_avg_window_size_frac: str,
+    axis: str,
+    measure_direction: str,
+    speed: str,
+    mtime: float,
+    quality_mtime: float,
+) -> pd.DataFrame:
+    filtered_table = load_slice_table(
+        mv_avg_window_size_frac, axis, measure_direction, speed, mtime
+    )
+    keys = normalize_measurement_keys(
+        filtered_table.index.to_frame(index=False).assign(
+            measure_direction=measure_direction, axis=axis
+        )
+    )
+    quality = load_quality_table(mv_avg_window_size_frac, quality_mtime)
+    return quality.reindex(
+        pd.MultiIndex.from_frame(keys[MEASUREMENT_KEY_VARS])
+    ).reset_index(drop=True)
+
+
+def get_slice_quality() -> pd.DataFrame | None:
+    frac = st.session_state.selected_mv_avg_window_size_frac
+    quality_file = get_quality_file(frac)
+    if not quality_file.is_file():
+        return None
+    return load_slice_quality(
+        frac,
+        st.session_state.axis,
+        st.session_state.measure_direction,
+        st.session_state.speed,
+        get_slice_mtime(frac),
+        quality_file.stat().st_mtime,
+    )
+
+
+def show_quality(quality: pd.Series) -> None:  # type: ignore[type-arg]
+    cols = st.columns(len(QUALITY_COLUMNS))
+    for col, column in zip(cols, QUALITY_COLUMNS):
+        value = quality[column]
+        col.metric(
+            column,
+            "n/a" if pd.isna(value) else QUALITY_FORMATS[column].format(value),
+        )
+
+
+@st.cache_resource(max_entries=8)
+def load_similarity_index(index_file: Path, mtime: float) -> SimilarityIndex:
+    return SimilarityIndex(index_file)
+
+
+def find_similar_rows(
+    row: pd.Series,  # type: ignore[type-arg]
+    k: int,
+) -> pd.DataFrame:
+    mv_avg_window_size_frac = st.session_state.mv_avg_window_size_frac
+    axis = st.session_state.axis
+    measure_direction = st.session_state.measure_direction
+    speed = st.session_state.speed
+    index_file = get_similarity_index_file(
+        mv_avg_window_size_frac=mv_avg_window_size_frac,
+        axis=axis,
+        measure_direction=measure_direction,
+        speed=speed,
+    )
+    # Rebuilt once a preprocessed file changed since the index was built.
+    if not is_similarity_index_current(index_file, mv_avg_window_size_frac):
+        with st.spinner("Building similarity index..."):
+            index_files = build_similarity_indexes(
+                mv_avg_window_size_frac,
+                slices=[(axis, measure_direction, speed)],
+            )
+        if index_file not in index_files:
+            st.warning("No series found to build a similarity index.")
+            return pd.DataFrame()
+    similarity_index = load_similarity_index(
+        index_file, index_file.stat().st_mtime
+    )
+    machine_id, date, _ = cast(tuple[object, object, object], row.name)
+    key = (str(machine_id), measure_direction, axis, speed, str(date))
+    if key not in similarity_index:
+        st.warning("Selected measurement is missing in the similarity index.")
+        return pd.DataFrame()
+
+    similar = similarity_index.query(key, k)
+    positions: dict[tuple[str, str, str], int] = {}
+    for position, (table_machine_id, table_date, table_speed) in enumerate(
+        get_filtered_table().index
+    ):
+        positions.setdefault(
+            (str(table_machine_id), str(table_date), str(table_speed)),
+            position,
+        )
+    similar["row"] = [
+        positions.get((m, d, s), -1)
+        for m, d, s in similar[["machine_id", "date", "speed"]].itertuples(
+            index=False
+        )
+    ]
+    similar = similar[similar["row"] >= 0].copy()
+    similar["class"] = get_labels().to_numpy()[similar["row"].to_numpy()]
+    return similar[["row", "machine_id", "date", "similarity", "class"]]
+
+
+def get_pyramid_key(
+    row: pd.Series,  # type: ignore[type-arg]
+    axis: str,
+) -> tuple[str, ...]:
+    machine_id, date, speed = cast(tuple[object, object, object], row.name)
+    return (
+        str(machine_id),
+        st.session_state.measure_direction,
+        axis,
+        str(speed),
+        str(date),
     )
-    if annotation_file.is_file():
-        annotations = pd.read_csv(annotation_file, index_col=None)
-        annotations = annotations[annotations["speed"] == speed]
-        annotations = annotations.set_index(ANNO_INDEX_VARS)
-        filtered_table = filtered_table.join(annotations, how="left")
-    else:
-        filtered_table["class"] = pd.NA
-    return filtered_table
 
 
 def plot_example(
     row: pd.Series,  # type: ignore[type-arg]
     axis: str,
+    pyramid: Pyramid | None = None,
+    spans: pd.DataFrame | None = None,
 ) -> None:
     time_series = ["contour_deviation_1", "current_1"]
     if axis == "Y":
@@ -125,12 +664,28 @@ def plot_example(
                 unsafe_allow_html=True,
             )
 
-    cols = st.columns([7] * len(time_series))
-    for col, ts_name in zip(cols, time_series):
-        with col:
-            html_file = open(row[ts_name], encoding="utf-8")
-            source_code = html_file.read()
-            _ = components.html(source_code, height=650)
+    key = get_pyramid_key(row, axis)
+    if pyramid is not None and key in pyramid:
+        cols = st.columns([7] * len(time_series))
+        for col, ts_name in zip(cols, time_series):
+            with col:
+                plot_downsampled_series(
+                    pyramid,
+                    key,
+                    ts_name,
+                    spans=(
+                        None
+                        if spans is None
+                        else spans[spans["time_series"] == ts_name]
+                    ),
+                )
+    else:
+        plot_files = [row[ts_name] for ts_name in time_series]
+        (panels,) = iter_plot_panels([plot_files])
+        cols = st.columns([7] * len(time_series))
+        for col, plot_file, panel in zip(cols, plot_files, panels):
+            with col:
+                show_plot_panel(panel, plot_file)
 
     st.write("### Selected Row Information")
     # st.dataframe(row.reset_index()[columns_to_show].astype(str))
@@ -148,51 +703,92 @@ def take_action_on_hotkey(
         if st.session_state.row_id > 0:
             st.session_state.row_id -= 1
 
-    if hotkeys.pressed("next"):
+    def advance() -> None:
+        if st.session_state.global_queue is not None:
+            advance_global_queue()
+        else:
+            increase_row_id()
+
+    def jump_to(row_id: int | None, direction: str) -> None:
+        if row_id is None:
+            st.info(f"No unlabeled rows {direction} this one")
+        else:
+            st.session_state.row_id = row_id
+
+    if hotkeys.pressed("next", key=HOTKEYS_KEY):
         increase_row_id()
-    elif hotkeys.pressed("previous"):
+    elif hotkeys.pressed("previous", key=HOTKEYS_KEY):
         decrease_row_id()
-    elif hotkeys.pressed("save"):
+    elif hotkeys.pressed("next_unlabeled", key=HOTKEYS_KEY):
+        jump_to(
+            st.session_state.unlabeled_index.next_after(
+                st.session_state.row_id
+            ),
+            "after",
+        )
+    elif hotkeys.pressed("previous_unlabeled", key=HOTKEYS_KEY):
+        jump_to(
+            st.session_state.unlabeled_index.previous_before(
+                st.session_state.row_id
+            ),
+            "before",
+        )
+    elif hotkeys.pressed("next_queued", key=HOTKEYS_KEY):
+        if len(st.session_state.review_queue) == 0:
+            st.info("Review queue is empty")
+        else:
+            st.session_state.row_id = st.session_state.review_queue.popleft()
+    elif hotkeys.pressed("next_global", key=HOTKEYS_KEY):
+        if st.session_state.global_queue is None:
+            st.info("No global queue started")
+        else:
+            advance_global_queue()
+    elif hotkeys.pressed("save", key=HOTKEYS_KEY):
         save_annotations_to_file()
-        st.success("Data saved!")
-    elif hotkeys.pressed("normal"):
+        st.toast("Data saved!", icon="✅")
+    elif hotkeys.pressed("normal", key=HOTKEYS_KEY):
         save_single_label("normal")
         save_annotations_to_file()
-        st.info("Marked as normal")
-        increase_row_id()
-    elif hotkeys.pressed("edge_case"):
+        st.toast("Marked as normal", icon="🟢")
+        advance()
+    elif hotkeys.pressed("edge_case", key=HOTKEYS_KEY):
         save_single_label("edge_case")
         save_annotations_to_file()
-        st.warning("Marked as edge case")
-        increase_row_id()
-    elif hotkeys.pressed("anomaly"):
+        st.toast("Marked as edge case", icon="🟡")
+        advance()
+    elif hotkeys.pressed("anomaly", key=HOTKEYS_KEY):
         save_single_label("anomaly")
         save_annotations_to_file()
-        st.error("Marked as anomaly")
-        increase_row_id()
+        st.toast("Marked as anomaly", icon="🔴")
+        advance()
 
 
 def save_single_label(label: Literal["normal", "edge_case", "anomaly"]) -> None:
-    ids = st.session_state.filtered_table.iloc[
-        st.session_state.row_id : st.session_state.row_id + 1
-    ].index
-    st.session_state.filtered_table.loc[ids, "class"] = label
+    key = get_filtered_table().index[st.session_state.row_id]
+    st.session_state.label_deltas[key] = label
+    st.session_state.unlabeled_index.mark_labeled(st.session_state.row_id)
 
 
 def save_annotations_to_file() -> None:
     axis = st.session_state.axis
     measure_direction = st.session_state.measure_direction
     speed = st.session_state.speed
-    annotation_file = (
-        SAVE_PATH / axis / measure_direction / speed / "annotations.csv"
+    annotation_file = get_annotation_file(
+        axis=axis, measure_direction=measure_direction, speed=speed
     )
     annotation_file.parent.mkdir(parents=True, exist_ok=True)
-    # print(st.session_state.filtered_table[["class"]]
-    #         .drop_duplicates())
-    # st.session_state.filtered_table[["class"]].reset_index()\
-    #     .drop_duplicates().sort_values(ANNO_INDEX_VARS)\
-    #     .to_csv(annotation_file, index=False)
-    st.session_state.filtered_table[["class"]].to_csv(annotation_file)
+    # Deltas are applied on top of the labels currently on disk, so labels
+    # saved meanwhile by other sessions on the same slice are kept.
+    labels = get_labels().to_frame()
+    labels.to_csv(annotation_file)
+    record_own_write(annotation_file)
+    st.session_state.label_deltas = {}
+    update_summary_index(
+        labels,
+        axis=axis,
+        measure_direction=measure_direction,
+        speed=speed,
+    )
 
 
 @st.dialog("save_dialog")
@@ -205,9 +801,263 @@ def save_dialog() -> None:
         st.rerun()
 
 
+# The page below the selection is split into fragments, so widgets and
+# hotkeys rerun only their own panel. Only a change of row reruns the whole
+# page, which is what reloads the plots.
+@st.fragment
+def table_panel() -> None:
+    if not st.toggle("Show table"):
+        return
+    filtered_table = get_filtered_table()
+    n_pages = (len(filtered_table) - 1) // TABLE_PAGE_SIZE + 1
+    page = st.number_input(
+        "Page",
+        min_value=1,
+        max_value=n_pages,
+        value=st.session_state.row_id // TABLE_PAGE_SIZE + 1,
+    )
+    start = (page - 1) * TABLE_PAGE_SIZE
+    page_table = filtered_table.iloc[start : start + TABLE_PAGE_SIZE].assign(
+        **{"class": get_labels().iloc[start : start + TABLE_PAGE_SIZE]}
+    )
+    page_table = page_table.reset_index()
+    page_table.index += start
+    st.dataframe(page_table)
+
+
+@st.fragment
+def annotation_panel() -> None:
+    hotkeys.activate(HOTKEYS, key=HOTKEYS_KEY)
+    filtered_table_len = len(get_filtered_table())
+    shown_row_id = st.session_state.row_id
+    take_action_on_hotkey(filtered_table_len=filtered_table_len)
+    if not filtered_table_len == 1:
+        st.session_state.row_id = st.slider(
+            "Select row",
+            min_value=0,
+            max_value=filtered_table_len - 1,
+            value=st.session_state.row_id,
+        )
+    if (
+        st.session_state.row_id != shown_row_id
+        or st.session_state.pending_row_id is not None
+    ):
+        st.rerun()
+    save_session_snapshot()
+
+    if st.session_state.global_queue is not None:
+        global_cols = st.columns([4, 1])
+        global_cols[0].write(
+            f"Global queue: {st.session_state.global_queue_served} rows "
+            f"served, now on {st.session_state.axis} / "
+            f"{st.session_state.measure_direction} / "
+            f"{st.session_state.speed} (press g to skip)"
+        )
+        if global_cols[1].button("Stop global queue"):
+            st.session_state.global_queue = None
+            st.rerun()
+
+    unlabeled_index = st.session_state.unlabeled_index
+    next_unlabeled = unlabeled_index.next_after(st.session_state.row_id)
+    if next_unlabeled is None:
+        next_unlabeled = unlabeled_index.first()
+    st.write(
+        f"## Unlabeled examples: {len(unlabeled_index)} "
+        f"of {filtered_table_len}"
+    )
+    if next_unlabeled is not None:
+        st.write(f"Next unlabeled row: {next_unlabeled}")
+
+    label = get_label(st.session_state.row_id)
+    label = "" if pd.isna(label) else str(label)
+
+    st.write(
+        '<div style="text-align: center; font-size: 48px;">'
+        f"Row: {st.session_state.row_id} - "
+        f'Label: <span style="color: {CLASS2COLOR[label]}">'
+        f"{CLASS2TEXT[label]}</span>"
+        "</div>",
+        unsafe_allow_html=True,
+    )
+    slice_quality = get_slice_quality()
+    if slice_quality is not None:
+        show_quality(slice_quality.iloc[st.session_state.row_id])
+
+
+@st.fragment
+def plot_panel() -> None:
+    row = get_filtered_table().iloc[st.session_state.row_id]
+    with st.expander(
+        "Similar measurements "
+        f"({len(st.session_state.review_queue)} queued, press q)"
+    ):
+        top_k = st.number_input("Top k", min_value=1, max_value=100, value=10)
+        if st.button("Find similar"):
+            st.session_state.similar_rows = find_similar_rows(row, int(top_k))
+        if not st.session_state.similar_rows.empty:
+            st.dataframe(st.session_state.similar_rows, hide_index=True)
+            if st.button("Queue for labeling"):
+                st.session_state.review_queue.extend(
+                    st.session_state.similar_rows["row"].tolist()
+                )
+                st.rerun()
+
+    slice_quality = get_slice_quality()
+    with st.expander("Queue by data quality"):
+        if slice_quality is None:
+            st.info(
+                "No data-quality metrics found. "
+                "Run `python -m src.scripts.compute_quality` first."
+            )
+        else:
+            sort_by = st.selectbox(
+                "Sort by",
+                QUALITY_COLUMNS,
+                index=QUALITY_COLUMNS.index("nan_fraction"),
+            )
+            descending = st.toggle("Descending", value=True)
+            only_unlabeled = st.toggle("Only unlabeled", value=True)
+            if st.button("Queue rows"):
+                positions = (
+                    slice_quality[sort_by]
+                    .sort_values(ascending=not descending, kind="stable")
+                    .index.to_numpy()
+                )
+                if only_unlabeled:
+                    unlabeled = get_labels().isna().to_numpy()
+                    positions = positions[unlabeled[positions]]
+                st.session_state.review_queue = deque(positions.tolist())
+                st.rerun()
+
+    pyramid = None
+    if st.toggle("Downsampled plots"):
+        pyramid_file = get_pyramid_file(
+            str(row.name[0]), st.session_state.mv_avg_window_size_frac
+        )
+        if pyramid_file.is_file():
+            pyramid = load_pyramid(pyramid_file, pyramid_file.stat().st_mtime)
+        else:
+            st.warning(
+                f"No downsampled data found in {pyramid_file}. "
+                "Run `python -m src.scripts.build_pyramids` first."
+            )
+    row_spans = get_slice_span_index().for_measurement(row.name)
+    plot_example(
+        row=row,
+        axis=st.session_state.axis,
+        pyramid=pyramid,
+        spans=row_spans,
+    )
+
+    with st.expander(f"Spans of this row ({len(row_spans)})"):
+        if pyramid is None:
+            st.caption(
+                "Turn on downsampled plots to see the spans on the curves "
+                "and to prefill the range from the sample range slider."
+            )
+        if not row_spans.empty:
+            st.dataframe(
+                row_spans[["time_series", "start", "end", "class"]],
+                hide_index=True,
+            )
+        # ---- FORM 5 ----
+        with st.form("span_form"):
+            span_cols = st.columns(4)
+            span_time_series = span_cols[0].selectbox(
+                "time_series", time_series_possible_values
+            )
+            default_start, default_end = st.session_state.get(
+                get_sample_range_key(
+                    get_pyramid_key(row, st.session_state.axis),
+                    "contour_deviation_1",
+                ),
+                (0, 0),
+            )
+            span_start = span_cols[1].number_input(
+                "start", min_value=0, value=default_start
+            )
+            span_end = span_cols[2].number_input(
+                "end", min_value=0, value=default_end
+            )
+            span_class = span_cols[3].selectbox("class", SPAN_CLASSES)
+            span_submitted = st.form_submit_button("Add span")
+        if span_submitted:
+            if span_end <= span_start:
+                st.error("A span has to end after its start.")
+            else:
+                update_slice_spans(
+                    row.name,
+                    add={
+                        "time_series": span_time_series,
+                        "start": int(span_start),
+                        "end": int(span_end),
+                        "class": span_class,
+                    },
+                )
+                st.rerun()
+        if not row_spans.empty:
+            span_to_remove = st.selectbox(
+                "Span",
+                row_spans[["time_series", "start", "end", "class"]].to_dict(
+                    "records"
+                ),
+                format_func=lambda span: (
+                    f"{span['time_series']} {span['start']}-{span['end']} "
+                    f"{span['class']}"
+                ),
+            )
+            if st.button("Remove span"):
+                update_slice_spans(
+                    row.name, remove=cast(dict[str, object], span_to_remove)
+                )
+                st.rerun()
+
+    with st.expander("Search spans"):
+        search_cols = st.columns(4)
+        search_start = search_cols[0].number_input(
+            "From sample", min_value=0, value=0
+        )
+        search_end = search_cols[1].number_input(
+            "To sample", min_value=1, value=1000
+        )
+        search_class = search_cols[2].selectbox(
+            "Span class", ["any", *SPAN_CLASSES]
+        )
+        all_slices = search_cols[3].toggle("All slices")
+        span_index = get_span_index() if all_slices else get_slice_span_index()
+        hits = span_index.query(
+            int(search_start),
+            int(search_end),
+            **({} if search_class == "any" else {"class": search_class}),
+        )
+        st.write(f"{len(hits)} of {len(span_index)} spans overlap")
+        st.dataframe(hits, hide_index=True)
+
+
 st.set_page_config(layout="wide")
 st.title("Annotator")
 
+st.session_state.user = st.sidebar.text_input(
+    "Annotator",
+    value=st.query_params.get("user", ""),
+    help="Your place is saved under this name and restored when you return.",
+).strip()
+if st.session_state.user:
+    st.query_params["user"] = st.session_state.user
+if (
+    st.session_state.user
+    and not st.session_state.snapshot_restored
+    and st.session_state.content_name == "feature_selection"
+    and not st.session_state.mv_avg_done
+):
+    st.session_state.snapshot_restored = True
+    snapshot = load_snapshot(st.session_state.user)
+    if (
+        snapshot is not None
+        and snapshot.mv_avg_window_size_frac in mv_avg_window_size_fracs
+    ):
+        restore_session(snapshot)
+
 if st.session_state.content_name == "feature_selection":
     # ---- FORM 1 ----
     with st.form("mv_avg_window_size_frac_form"):
@@ -227,37 +1077,20 @@ if st.session_state.content_name == "feature_selection":
 
     # ---- FORM 2 ----
     if st.session_state.mv_avg_done:
-        if (
-            st.session_state.reference_table.empty
-            or st.session_state.selected_mv_avg_window_size_frac
-            != st.session_state.mv_avg_window_size_frac
-        ):
-            st.session_state.selected_mv_avg_window_size_frac = (
-                st.session_state.mv_avg_window_size_frac
-            )
-            st.session_state.reference_table = pd.read_csv(
-                APP_DATA_PATH
-                / st.session_state.mv_avg_window_size_frac
-                / "reference_table.csv",
-                index_col=None,
-            )
+        reference_table = get_reference_table(
+            st.session_state.mv_avg_window_size_frac
+        )
         with st.form("single_selection_form"):
             single_selection_row = st.columns(2)
-            measure_directions = list(
-                sorted(
-                    st.session_state.reference_table[
-                        "measure_direction"
-                    ].unique()
-                )
+            measure_directions = unique_values(
+                reference_table, "measure_direction"
             )
             measure_direction = single_selection_row[0].selectbox(
                 "measure_direction",
                 measure_directions,
                 index=measure_directions.index(DEFAULT_DIRECTION),
             )
-            axes = list(
-                sorted(st.session_state.reference_table["axis"].unique())
-            )
+            axes = unique_values(reference_table, "axis")
             axis = single_selection_row[1].selectbox(
                 "axis",
                 axes,
@@ -272,19 +1105,12 @@ if st.session_state.content_name == "feature_selection":
 
     # ---- FORM 3 ----
     if st.session_state.mv_avg_done and st.session_state.single_done:
-        filtered_table = st.session_state.reference_table[
-            (
-                st.session_state.reference_table["measure_direction"]
-                == st.session_state.selected_measure_direction
-            )
-            & (
-                st.session_state.reference_table["axis"]
-                == st.session_state.selected_axis
-            )
-        ]
         with st.form("speed_selection_form"):
-            speed_possible_values = list(
-                sorted(filtered_table["speed"].unique())
+            speed_possible_values = unique_values(
+                get_reference_table(st.session_state.mv_avg_window_size_frac),
+                "speed",
+                measure_direction=st.session_state.selected_measure_direction,
+                axis=st.session_state.selected_axis,
             )
             if DEFAULT_SPEED in speed_possible_values:
                 default_speed = DEFAULT_SPEED
@@ -302,6 +1128,63 @@ if st.session_state.content_name == "feature_selection":
                 st.session_state.speed_done = True
                 st.session_state.selected_speed = speed
 
+    # ---- FORM 4 ----
+    if st.session_state.mv_avg_done:
+        frac = st.session_state.mv_avg_window_size_frac
+        slices = list_slices(get_reference_table(frac))
+        scores_file = get_scores_dir(frac) / SCORES_FILE_NAME
+        with st.expander("Global queue across slices"):
+            with st.form("global_queue_form"):
+                queue_slices = st.multiselect(
+                    "Slices",
+                    slices,
+                    default=slices,
+                    format_func=" / ".join,
+                )
+                order = st.selectbox("Order", QUEUE_ORDERS)
+                score_options = []
+                if scores_file.is_file():
+                    score_table = load_score_table(
+                        frac, scores_file.stat().st_mtime
+                    )
+                    score_options = list(
+                        score_table[["detector", "time_series", "feature"]]
+                        .drop_duplicates()
+                        .itertuples(index=False, name=None)
+                    )
+                score_option = st.selectbox(
+                    "Score (for order 'score')",
+                    score_options,
+                    format_func=" / ".join,
+                )
+                global_submitted = st.form_submit_button("Start global queue")
+            if global_submitted:
+                if order == "score" and not score_options:
+                    st.error(
+                        f"No scores found in {scores_file}. "
+                        "Run `python -m src.scripts.score` first."
+                    )
+                    st.stop()
+                st.session_state.global_queue = merge_slice_queues(
+                    frac,
+                    queue_slices,
+                    order=order,
+                    scores=(
+                        score_priorities(score_table, *score_option)
+                        if order == "score"
+                        else None
+                    ),
+                )
+                st.session_state.global_queue_served = 0
+                st.session_state.selected_mv_avg_window_size_frac = frac
+                st.session_state.slice_loaded = False
+                advance_global_queue()
+                if st.session_state.global_queue is not None:
+                    st.session_state.single_done = True
+                    st.session_state.speed_done = True
+                    st.session_state.content_name = "plots"
+                    st.rerun()
+
 if st.session_state.content_name == "feature_selection" and (
     st.session_state.mv_avg_done
     and st.session_state.single_done
@@ -322,79 +1205,53 @@ else:
 
 
 if st.session_state.content_name == "plots":
+    # Changes are only consumed here, so files rewritten while the feature
+    # selection is shown still refresh the slice on return.
+    artifact_changes = pop_artifact_changes()
     measure_direction = st.session_state.selected_measure_direction
     axis = st.session_state.selected_axis
     speed = st.session_state.selected_speed
 
-    if st.session_state.filtered_table.empty or (
-        st.session_state.axis != axis
+    if not st.session_state.slice_loaded or (
+        st.session_state.selected_mv_avg_window_size_frac
+        != st.session_state.mv_avg_window_size_frac
+        or st.session_state.axis != axis
         or st.session_state.measure_direction != measure_direction
         or st.session_state.speed != speed
     ):
-        filtered_table = st.session_state.reference_table[
-            (
-                st.session_state.reference_table["measure_direction"]
-                == measure_direction
-            )
-            & (st.session_state.reference_table["axis"] == axis)
-            & (st.session_state.reference_table["speed"] == speed)
-        ]
-        filtered_table = filtered_table.set_index(
-            ANNO_INDEX_VARS,
+        st.session_state.selected_mv_avg_window_size_frac = (
+            st.session_state.mv_avg_window_size_frac
         )
-        filtered_table = set_annotations(
-            axis=axis,
-            measure_direction=measure_direction,
-            filtered_table=filtered_table,
-            speed=speed,
-        )
-        filtered_table = filtered_table.drop_duplicates()
         st.session_state.axis = axis
         st.session_state.measure_direction = measure_direction
         st.session_state.speed = speed
-        st.session_state.filtered_table = filtered_table
+        st.session_state.slice_loaded = True
+        st.session_state.label_deltas = {}
+        st.session_state.unlabeled_index = UnlabeledIndex(
+            pd.isna(get_base_labels())
+        )
         st.session_state.row_id = 0
+        st.session_state.similar_rows = pd.DataFrame()
+        st.session_state.review_queue = deque()
+        if st.session_state.resume_snapshot is not None:
+            st.session_state.row_id = find_resume_row(
+                st.session_state.resume_snapshot
+            )
+            st.session_state.resume_snapshot = None
+            st.toast(f"Resumed at row {st.session_state.row_id}", icon="↩️")
+        if st.session_state.pending_row_id is not None:
+            st.session_state.row_id = st.session_state.pending_row_id
+            st.session_state.pending_row_id = None
+    elif artifact_changes is None or artifact_changes & set(get_slice_files()):
+        # The cached tables follow the files on their own; only the state
+        # derived from them in this session is rebuilt.
+        refresh_slice()
+        st.toast("The data of this slice was updated.")
+    live_updates(get_slice_files())
 
-    if st.session_state.filtered_table.empty:
+    if get_filtered_table().empty:
         st.warning("No data available for the selected options.")
     else:
-        st.dataframe(st.session_state.filtered_table.reset_index())
-        row = st.session_state.filtered_table.iloc[st.session_state.row_id]
-        take_action_on_hotkey(
-            filtered_table_len=len(st.session_state.filtered_table)
-        )
-        row = st.session_state.filtered_table.iloc[st.session_state.row_id]
-        if not len(st.session_state.filtered_table) == 1:
-            st.session_state.row_id = st.slider(
-                "Select row",
-                min_value=0,
-                max_value=len(st.session_state.filtered_table) - 1,
-                value=st.session_state.row_id,
-            )
-        # tmp_table = st.session_state.filtered_table[["class"]].reset_index()\
-        #     .drop_duplicates().
-        ids = st.session_state.filtered_table.reset_index()[
-            st.session_state.filtered_table["class"].isna().values
-        ].index
-        st.write("## Unlabeled examples:")
-        st.write(", ".join(map(str, ids.tolist())))
-
-        label = st.session_state.filtered_table.iloc[st.session_state.row_id][
-            "class"
-        ]
-        if pd.isna(label):
-            label = ""
-
-        st.write(
-            '<div style="text-align: center; font-size: 48px;">'
-            f"Row: {st.session_state.row_id} - "
-            f'Label: <span style="color: {CLASS2COLOR[label]}">'
-            f"{CLASS2TEXT[label]}</span>"
-            "</div>",
-            unsafe_allow_html=True,
-        )
-
-        plot_example(
-            row=st.session_state.filtered_table.iloc[st.session_state.row_id],
-            axis=st.session_state.axis,
-        )
+        table_panel()
+        annotation_panel()
+        plot_panel()
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import streamlit as st
+
+from src.utils.artifact_watcher import WATCH_INTERVAL, ArtifactWatcher
+
+
+@st.cache_resource
+def get_artifact_watcher() -> ArtifactWatcher:
+    watcher = ArtifactWatcher()
+    watcher.start()
+    return watcher
+
+
+def record_own_write(path: Path) -> None:
+    # Files this session wrote itself are not reported back to it.
+    if "own_writes" not in st.session_state:
+        st.session_state.own_writes = {}
+    st.session_state.own_writes[path] = path.stat().st_mtime_ns
+
+
+def _is_own_write(path: Path) -> bool:
+    own_writes = st.session_state.get("own_writes", {})
+    return (
+        path in own_writes
+        and path.is_file()
+        and path.stat().st_mtime_ns == own_writes[path]
+    )
+
+
+def _peek_changes() -> tuple[set[Path] | None, int]:
+    changed, generation = get_artifact_watcher().changes_since(
+        st.session_state.artifact_generation
+    )
+    if changed is not None:
+        changed = {path for path in changed if not _is_own_write(path)}
+    return changed, generation
+
+
+def pop_artifact_changes() -> set[Path] | None:
+    if "artifact_generation" not in st.session_state:
+        st.session_state.artifact_generation = get_artifact_watcher().generation
+        return set()
+    changed, st.session_state.artifact_generation = _peek_changes()
+    return changed
+
+
+@st.fragment(run_every=WATCH_INTERVAL)
+def rerun_on_artifact_changes(watched: list[Path]) -> None:
+    changed, _ = _peek_changes()
+    if changed is None or changed & set(watched):
+        st.rerun()
+
+
+def live_updates(watched: list[Path]) -> None:
+    # Without live updates, changes are still picked up on the next rerun.
+    if st.sidebar.toggle(
+        "Live updates", help="Rerun when the shown data changes on disk."
+    ):
+        rerun_on_artifact_changes(watched)
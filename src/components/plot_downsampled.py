@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+from src.utils.downsampling import Pyramid
+from src.utils.spans import SPAN_CLASSES
+
+DEFAULT_WIDTH = 800
+SPAN_COLORS = ["red", "orange"]
+
+
+@st.cache_resource(max_entries=32)
+def load_pyramid(pyramid_file: Path, mtime: float) -> Pyramid:
+    return Pyramid(pyramid_file)
+
+
+def get_sample_range_key(key: tuple[str, ...], ts_name: str) -> str:
+    return f"sample_range_{ts_name}_{'_'.join(key)}"
+
+
+def plot_downsampled_series(
+    pyramid: Pyramid,
+    key: tuple[str, ...],
+    ts_name: str,
+    width: int = DEFAULT_WIDTH,
+    spans: pd.DataFrame | None = None,
+) -> None:
+    length = pyramid.length(key, ts_name)
+    if length < 2:
+        st.info(f"No samples stored for {ts_name}.")
+        return
+    start, end = st.slider(
+        "Sample range",
+        min_value=0,
+        max_value=length,
+        value=(0, length),
+        key=get_sample_range_key(key, ts_name),
+    )
+    envelope = pyramid.envelope(key, ts_name, start, max(end, start + 1), width)
+    if spans is not None:
+        spans = spans[(spans["start"] < end) & (spans["end"] > start)]
+    if spans is None or spans.empty:
+        st.line_chart(envelope)
+        return
+    spans = spans.assign(
+        start=spans["start"].clip(lower=start),
+        end=spans["end"].clip(upper=end),
+    )
+    band = (
+        alt.Chart(envelope.reset_index())
+        .mark_area(opacity=0.6)
+        .encode(x="sample:Q", y="min:Q", y2="max:Q")
+    )
+    regions = (
+        alt.Chart(spans[["start", "end", "class"]])
+        .mark_rect(opacity=0.25)
+        .encode(
+            x="start:Q",
+            x2="end:Q",
+            color=alt.Color(
+                "class:N",
+                scale=alt.Scale(domain=SPAN_CLASSES, range=SPAN_COLORS),
+            ),
+        )
+    )
+    st.altair_chart(regions + band, width="stretch")
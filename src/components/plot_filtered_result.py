@@ -1,6 +1,7 @@
 import pandas as pd
 import streamlit as st
-import streamlit.components.v1 as components
+
+from src.components.plot_html import iter_plot_panels, show_plot_panel
 
 
 def plot_filtered_result(
@@ -31,7 +32,13 @@ def plot_filtered_result(
                 unsafe_allow_html=True,
             )
 
-    for _, row in filtered_table.iterrows():
+    plot_files = [
+        [row[ts_name] for ts_name in time_series]
+        for _, row in filtered_table.iterrows()
+    ]
+    for (_, row), row_plot_files, panels in zip(
+        filtered_table.iterrows(), plot_files, iter_plot_panels(plot_files)
+    ):
         cols = st.columns([1, *[7] * len(time_series)])
         row_index_str = " | ".join(str(row[var]) for var in row_index_vars)
         with cols[0]:
@@ -53,8 +60,6 @@ def plot_filtered_result(
                 """,
                 unsafe_allow_html=True,
             )
-        for col, ts_name in zip(cols[1:], time_series):
+        for col, plot_file, panel in zip(cols[1:], row_plot_files, panels):
             with col:
-                html_file = open(row[ts_name], encoding="utf-8")
-                source_code = html_file.read()
-                _ = components.html(source_code, height=650)
+                show_plot_panel(panel, plot_file)
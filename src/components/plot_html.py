@@ -0,0 +1,92 @@
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from src.utils.plot_store import (
+    PLOT_INDEX_FILE_NAME,
+    PLOT_STORE_PATH,
+    PlotStore,
+    get_plot_key,
+)
+
+MAX_PARALLEL_READS = 8
+PLOT_HEIGHT = 650
+
+Panel = str | Exception
+
+
+@st.cache_resource(max_entries=1)
+def load_plot_store(store_path: Path, mtime: float) -> PlotStore:
+    return PlotStore(store_path)
+
+
+def get_plot_store(store_path: Path = PLOT_STORE_PATH) -> PlotStore | None:
+    index_file = store_path / PLOT_INDEX_FILE_NAME
+    if not index_file.is_file():
+        return None
+    return load_plot_store(store_path, index_file.stat().st_mtime)
+
+
+def _read_plot_html(plot_file: str | Path, store: PlotStore | None) -> str:
+    # Plots that were not packed yet are still read from their own file.
+    if store is not None:
+        key = get_plot_key(plot_file)
+        if key in store:
+            return store.read(key)
+    with open(plot_file, encoding="utf-8") as html_file:
+        return html_file.read()
+
+
+def read_plot_html(
+    plot_file: str | Path,
+    store_path: Path = PLOT_STORE_PATH,
+) -> str:
+    return _read_plot_html(plot_file, get_plot_store(store_path))
+
+
+def _read_panel(plot_file: str | Path, store: PlotStore | None) -> Panel:
+    try:
+        return _read_plot_html(plot_file, store)
+    except (OSError, TypeError, ValueError, zlib.error) as e:
+        return e
+
+
+def iter_plot_panels(
+    rows: Iterable[list[str]],
+    max_workers: int = MAX_PARALLEL_READS,
+    store_path: Path = PLOT_STORE_PATH,
+) -> Iterator[list[Panel]]:
+    # Reads run ahead of the rendering by at most 2 * max_workers files, so
+    # latency overlaps without holding every page of the table in memory.
+    # Rows come out in input order; failed reads come back as exceptions.
+    store = get_plot_store(store_path)
+    pending: deque[list[Future[Panel]]] = deque()
+    in_flight = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for plot_files in rows:
+            pending.append(
+                [executor.submit(_read_panel, f, store) for f in plot_files]
+            )
+            in_flight += len(plot_files)
+            while pending and in_flight >= 2 * max_workers:
+                futures = pending.popleft()
+                in_flight -= len(futures)
+                yield [future.result() for future in futures]
+        while pending:
+            yield [future.result() for future in pending.popleft()]
+
+
+def show_plot_panel(
+    panel: Panel,
+    plot_file: str,
+    height: int = PLOT_HEIGHT,
+) -> None:
+    if isinstance(panel, Exception):
+        st.error(f"Could not load plot {plot_file}: {panel}")
+        return
+    _ = components.html(panel, height=height)
@@ -5,7 +5,13 @@ import pandas as pd
 import streamlit as st
 
 from src.components.plot_filtered_result import plot_filtered_result
-from src.utils.measurement import Measurement, load_references_file
+from src.utils.measurement import (
+    Measurement,
+    ResolvedMeasurements,
+    load_references_file,
+    resolve_measurements,
+    truncate_measurement_dates,
+)
 
 APP_DATA_PATH = Path("artifacts/app_data/")
 if not APP_DATA_PATH.is_dir():
@@ -25,50 +31,66 @@ time_series_default_values = [
 ]
 
 
-def get_row(
-    df: pd.DataFrame,
-    measurement: Measurement,
-) -> pd.DataFrame:
-    row = df[
-        (df["machine_id"] == measurement.machine_id)
-        & (df["date"] == measurement.date)
-        & (df["speed"] == measurement.speed)
-        & (df["axis"] == measurement.axis)
-        & (df["measure_direction"] == measurement.measure_direction)
-    ]
-    if row.empty:
+ANOMALIES_COMPARISON_PATH = Path("artifacts/anomalies_comparison.json")
+if not ANOMALIES_COMPARISON_PATH.is_file():
+    st.error(f"No example cases found at {ANOMALIES_COMPARISON_PATH}.")
+    st.stop()
+
+CaseIndex = dict[
+    str, dict[Literal["normal", "anomalies"], ResolvedMeasurements]
+]
+
+
+@st.cache_data
+def load_anomaly_cases(
+    json_file: Path,
+    mtime: float,
+) -> dict[str, dict[Literal["normal", "anomalies"], list[Measurement]]]:
+    return load_references_file(json_file=json_file)
+
+
+@st.cache_data
+def compile_case_index(
+    mv_avg_window_size_frac: str,
+    reference_mtime: float,
+    cases_mtime: float,
+) -> CaseIndex:
+    reference_table = pd.read_csv(
+        APP_DATA_PATH / f"{mv_avg_window_size_frac}/reference_table.csv",
+        index_col=None,
+        dtype=str,
+    )
+    reference_table = truncate_measurement_dates(reference_table)
+    anomaly_cases = load_anomaly_cases(ANOMALIES_COMPARISON_PATH, cases_mtime)
+    return {
+        case: {
+            type_: resolve_measurements(reference_table, measurements)
+            for type_, measurements in example.items()
+        }
+        for case, example in anomaly_cases.items()
+    }
+
+
+def plot_time_series(
+    type_: Literal["normal", "anomalies"],
+    resolved: ResolvedMeasurements,
+) -> None:
+    for measurement in resolved.missing:
         st.warning(
             "No matching row found in reference table "
             f"for measurement: {measurement}."
         )
-        return pd.DataFrame()
-    if len(row) > 1:
+    for measurement in resolved.duplicated:
         st.warning(
             "Multiple matching rows found in reference table "
             f"for measurement: {measurement}."
         )
-    return row
-
-
-def plot_time_series(
-    type_: Literal["normal", "anomalies"],
-    reference_table: pd.DataFrame,
-    example: dict[Literal["normal", "anomalies"], list[Measurement]],
-) -> None:
-    rows = [
-        get_row(
-            df=reference_table,
-            measurement=example[type_][i],
-        )
-        for i in range(len(example[type_]))
-    ]
-    if len(rows) == 0:
+    if resolved.rows.empty and len(resolved.missing) == 0:
         st.info(f"No {type_} measurements to display.")
         return
-    df = pd.concat(rows, ignore_index=True)
     st.header(type_.capitalize())
     plot_filtered_result(
-        filtered_table=df.drop_duplicates().reset_index(drop=True),
+        filtered_table=resolved.rows.drop_duplicates().reset_index(drop=True),
         time_series=st.session_state.selected_time_series,
     )
 
@@ -83,10 +105,10 @@ st.title("Labeled Anomalies Viewer")
 # Initialize state
 if "mv_avg_and_example_done" not in st.session_state:
     st.session_state.mv_avg_and_example_done = False
-if "anomaly_cases" not in st.session_state:
-    st.session_state.anomaly_cases = load_references_file(
-        json_file=Path("artifacts/anomalies_comparison.json")
-    )
+
+anomaly_cases = load_anomaly_cases(
+    ANOMALIES_COMPARISON_PATH, ANOMALIES_COMPARISON_PATH.stat().st_mtime
+)
 
 with st.form("mv_avg_and_example_form"):
     mv_avg_window_size_frac = st.selectbox(
@@ -95,7 +117,7 @@ with st.form("mv_avg_and_example_form"):
     )
     selected_case = st.selectbox(
         "Select example case",
-        list(st.session_state.anomaly_cases.keys()),
+        list(anomaly_cases.keys()),
     )
     time_series = st.multiselect(
         "time series",
@@ -110,23 +132,17 @@ with st.form("mv_avg_and_example_form"):
         st.session_state.selected_time_series = time_series
 
 if st.session_state.mv_avg_and_example_done:
-    reference_table = pd.read_csv(
-        APP_DATA_PATH
-        / f"{st.session_state.mv_avg_window_size_frac}/reference_table.csv",
-        index_col=None,
-        dtype=str,
-    )
-    reference_table["date"] = reference_table.apply(
-        lambda row: row["date"][:10], axis=1
-    )
-    example = st.session_state.anomaly_cases[st.session_state.selected_case]
-    plot_time_series(
-        type_="anomalies",
-        reference_table=reference_table,
-        example=example,
-    )
-    plot_time_series(
-        type_="normal",
-        reference_table=reference_table,
-        example=example,
+    case_index = compile_case_index(
+        mv_avg_window_size_frac=st.session_state.mv_avg_window_size_frac,
+        reference_mtime=(
+            APP_DATA_PATH
+            / st.session_state.mv_avg_window_size_frac
+            / "reference_table.csv"
+        )
+        .stat()
+        .st_mtime,
+        cases_mtime=ANOMALIES_COMPARISON_PATH.stat().st_mtime,
     )
+    example = case_index[st.session_state.selected_case]
+    plot_time_series(type_="anomalies", resolved=example["anomalies"])
+    plot_time_series(type_="normal", resolved=example["normal"])
@@ -0,0 +1,210 @@
+from pathlib import Path
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+from src.components.plot_filtered_result import plot_filtered_result
+from src.utils.integrity import drop_broken_rows
+from src.utils.measurement import (
+    MEASUREMENT_KEY_VARS,
+    TIME_SERIES,
+    normalize_measurement_keys,
+)
+from src.utils.reference_table import open_shared_reference_table
+from src.utils.shared_cache import select_rows
+from src.utils.trends import TREND_STATS, get_trends_file, load_trends
+
+APP_DATA_PATH = Path("artifacts/app_data/")
+if not APP_DATA_PATH.is_dir():
+    st.error(f"No data found in {APP_DATA_PATH}. Please run ETL first.")
+    st.stop()
+
+DEFAULT_AXIS = "Y"
+DEFAULT_DIRECTION = "GL"
+DEFAULT_MV_AVG_WINDOW_SIZE_FRAC = "0.05"
+CHART_STATS = ["mean", "std", "q50", "exceedance"]
+
+mv_avg_window_size_fracs = list(
+    sorted(
+        d.name
+        for d in APP_DATA_PATH.iterdir()
+        if d.is_dir() and get_trends_file(d.name).is_file()
+    )
+)
+if len(mv_avg_window_size_fracs) == 0:
+    st.error(
+        f"No trends found in {APP_DATA_PATH}. "
+        "Run `python -m src.scripts.compute_trends` first."
+    )
+    st.stop()
+
+
+# Shared by all sessions of this process; treat the result as read-only.
+@st.cache_resource(max_entries=4)
+def load_trend_table(
+    mv_avg_window_size_frac: str,
+    mtime: float,
+) -> pd.DataFrame:
+    return load_trends(mv_avg_window_size_frac)
+
+
+def get_trend_table(mv_avg_window_size_frac: str) -> pd.DataFrame:
+    trends_file = get_trends_file(mv_avg_window_size_frac)
+    return load_trend_table(
+        mv_avg_window_size_frac, trends_file.stat().st_mtime
+    )
+
+
+def trend_chart(trends: pd.DataFrame, stat: str) -> alt.LayerChart:
+    base = alt.Chart(trends).encode(
+        x=alt.X("date:T", title="date"),
+        color=alt.Color("speed:N"),
+    )
+    layers = []
+    if stat == "q50":
+        layers.append(
+            base.mark_area(opacity=0.2).encode(
+                y=alt.Y("q05:Q", title="q50 (band q05 - q95)"), y2="q95:Q"
+            )
+        )
+    layers.append(
+        base.mark_line(point=True).encode(
+            y=f"{stat}:Q", tooltip=["date", "speed", *TREND_STATS]
+        )
+    )
+    return alt.layer(*layers)
+
+
+def load_measurement_rows(
+    mv_avg_window_size_frac: str,
+    machine_id: str,
+    measure_direction: str,
+    axis: str,
+    points: pd.DataFrame,
+) -> pd.DataFrame:
+    rows = select_rows(
+        open_shared_reference_table(
+            mv_avg_window_size_frac, dtype={"machine_id": str}
+        ),
+        machine_id=machine_id,
+        measure_direction=measure_direction,
+        axis=axis,
+    )
+    keys = normalize_measurement_keys(rows[MEASUREMENT_KEY_VARS])
+    selected = pd.MultiIndex.from_frame(keys[["date", "speed"]]).isin(
+        pd.MultiIndex.from_frame(points[["date", "speed"]])
+    )
+    return drop_broken_rows(
+        rows[selected].sort_values(["date", "speed"]),
+        mv_avg_window_size_frac,
+    )
+
+
+st.set_page_config(layout="wide")
+st.title("Machine Trends")
+
+# Initialize state
+if "mv_avg_done" not in st.session_state:
+    st.session_state.mv_avg_done = False
+if "single_done" not in st.session_state:
+    st.session_state.single_done = False
+
+with st.form("mv_avg_window_size_frac_form"):
+    mv_avg_window_size_frac = st.selectbox(
+        "Select moving average window size fraction",
+        mv_avg_window_size_fracs,
+        index=(
+            mv_avg_window_size_fracs.index(DEFAULT_MV_AVG_WINDOW_SIZE_FRAC)
+            if DEFAULT_MV_AVG_WINDOW_SIZE_FRAC in mv_avg_window_size_fracs
+            else 0
+        ),
+    )
+    mv_avg_submitted = st.form_submit_button("Apply")
+    if mv_avg_submitted:
+        st.session_state.mv_avg_done = True
+        st.session_state.mv_avg_window_size_frac = mv_avg_window_size_frac
+
+if st.session_state.mv_avg_done:
+    frac = st.session_state.mv_avg_window_size_frac
+    trends = get_trend_table(frac)
+    with st.form("single_selection_form"):
+        single_selection_row = st.columns(5)
+        machine_ids = list(sorted(trends["machine_id"].unique(), key=str))
+        machine_id = single_selection_row[0].selectbox(
+            "machine_id", machine_ids
+        )
+        measure_directions = list(sorted(trends["measure_direction"].unique()))
+        measure_direction = single_selection_row[1].selectbox(
+            "measure_direction",
+            measure_directions,
+            index=(
+                measure_directions.index(DEFAULT_DIRECTION)
+                if DEFAULT_DIRECTION in measure_directions
+                else 0
+            ),
+        )
+        axes = list(sorted(trends["axis"].unique()))
+        axis = single_selection_row[2].selectbox(
+            "axis",
+            axes,
+            index=axes.index(DEFAULT_AXIS) if DEFAULT_AXIS in axes else 0,
+        )
+        time_series = single_selection_row[3].selectbox(
+            "time series", TIME_SERIES
+        )
+        stat = single_selection_row[4].selectbox("statistic", CHART_STATS)
+        single_submitted = st.form_submit_button("Apply")
+
+        if single_submitted:
+            st.session_state.single_done = True
+            st.session_state.selected_machine_id = machine_id
+            st.session_state.selected_measure_direction = measure_direction
+            st.session_state.selected_axis = axis
+            st.session_state.selected_time_series = time_series
+            st.session_state.selected_stat = stat
+
+if st.session_state.mv_avg_done and st.session_state.single_done:
+    machine_trends = trends[
+        (trends["machine_id"] == st.session_state.selected_machine_id)
+        & (
+            trends["measure_direction"]
+            == st.session_state.selected_measure_direction
+        )
+        & (trends["axis"] == st.session_state.selected_axis)
+        & (trends["time_series"] == st.session_state.selected_time_series)
+    ]
+    if machine_trends.empty:
+        st.info("No measurements for this selection.")
+        st.stop()
+
+    st.altair_chart(
+        trend_chart(machine_trends, st.session_state.selected_stat),
+        width="stretch",
+    )
+    st.caption("Select rows to open their measurements below.")
+    event = st.dataframe(
+        machine_trends.drop(
+            columns=["machine_id", "measure_direction", "axis", "time_series"]
+        ),
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="multi-row",
+        key="trend_table",
+    )
+    points = machine_trends.iloc[event["selection"]["rows"]]
+    if points.empty:
+        st.stop()
+    measurement_rows = load_measurement_rows(
+        frac,
+        st.session_state.selected_machine_id,
+        st.session_state.selected_measure_direction,
+        st.session_state.selected_axis,
+        points,
+    )
+    plot_filtered_result(
+        filtered_table=measurement_rows,
+        time_series=TIME_SERIES,
+        df_description="Selected measurements",
+        row_index_vars=["date", "speed"],
+    )
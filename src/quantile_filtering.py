@@ -1,9 +1,25 @@
 from pathlib import Path
+from typing import Any
 
 import pandas as pd
 import streamlit as st
 
 from src.components.plot_filtered_result import plot_filtered_result
+from src.utils.integrity import drop_broken_rows
+from src.utils.score_query import (
+    build_query_arrays,
+    compile_query,
+    load_saved_queries,
+    save_queries,
+    select_reference_rows,
+)
+from src.utils.scores import (
+    QUANTILE_FILE_NAME,
+    SCORES_FILE_NAME,
+    get_scores_dir,
+    load_legacy_quantile_scores,
+    load_scores,
+)
 
 APP_DATA_PATH = Path("artifacts/app_data/")
 if not APP_DATA_PATH.is_dir():
@@ -54,6 +70,139 @@ def filter_reference_table(
     return filtered_reference_table
 
 
+@st.cache_resource(max_entries=2)
+def load_query_arrays(
+    mv_avg_window_size_frac: str,
+    quantile_files: tuple[Path, ...],
+    mtime: float,
+) -> tuple[pd.DataFrame, dict[str, Any]]:
+    # Legacy quantile statistics files get the detector
+    # quantile_statistics and their file name as time series.
+    parts = [load_legacy_quantile_scores(f) for f in quantile_files]
+    if (get_scores_dir(mv_avg_window_size_frac) / SCORES_FILE_NAME).is_file():
+        parts.append(load_scores(mv_avg_window_size_frac))
+    return build_query_arrays(pd.concat(parts, ignore_index=True))
+
+
+def get_query_arrays(
+    mv_avg_window_size_frac: str,
+) -> tuple[pd.DataFrame, dict[str, Any]] | None:
+    # The batch scoring command also writes its quantile scores in the
+    # legacy layout for the threshold mode; they come from scores.csv here,
+    # as in collect_scores.
+    quantile_files = tuple(
+        quantile_file
+        for quantile_file in sorted(
+            (QUANTILE_STATISTICS_PATH / mv_avg_window_size_frac).glob("*.csv")
+        )
+        if quantile_file.name != QUANTILE_FILE_NAME
+    )
+    scores_file = get_scores_dir(mv_avg_window_size_frac) / SCORES_FILE_NAME
+    files = list(quantile_files)
+    if scores_file.is_file():
+        files.append(scores_file)
+    if not files:
+        return None
+    return load_query_arrays(
+        mv_avg_window_size_frac,
+        quantile_files,
+        max(f.stat().st_mtime for f in files),
+    )
+
+
+def expression_filter() -> None:
+    query_arrays = get_query_arrays(st.session_state.mv_avg_window_size_frac)
+    if query_arrays is None:
+        st.error(
+            "No quantile statistics or scores found for "
+            f"{st.session_state.mv_avg_window_size_frac}."
+        )
+        st.stop()
+    keys, arrays = query_arrays
+    saved_queries = load_saved_queries()
+    if "query_expression" not in st.session_state:
+        st.session_state.query_expression = ""
+
+    saved_cols = st.columns([3, 1, 1])
+    saved_name = saved_cols[0].selectbox(
+        "Saved expressions", ["", *saved_queries]
+    )
+    if saved_cols[1].button("Load", disabled=not saved_name):
+        st.session_state.query_expression = saved_queries[saved_name]
+    if saved_cols[2].button("Delete", disabled=not saved_name):
+        del saved_queries[saved_name]
+        save_queries(saved_queries)
+        st.rerun()
+
+    with st.expander(f"Columns ({len(arrays)})"):
+        st.caption(
+            "Columns are named detector.time_series.feature and can be "
+            "shortened to any unique suffix, such as "
+            "contour_deviation_1.th_3.0_percentage_over. Combine "
+            "comparisons with and, or, not and parentheses; numbers may "
+            "end with %."
+        )
+        st.write(list(arrays))
+
+    with st.form("expression_form"):
+        expression = st.text_area(
+            "Expression",
+            key="query_expression",
+            placeholder=(
+                "contour_deviation_1.th_3.0_percentage_over >= 2% and "
+                "not current_1.th_3.0_percentage_over >= 2%"
+            ),
+        )
+        time_series = st.multiselect(
+            "time series",
+            time_series_possible_values,
+            default=time_series_default_values,
+        )
+        query_name = st.text_input("Save as")
+        expression_submitted = st.form_submit_button("Apply")
+    if not expression_submitted or not expression.strip():
+        return
+
+    try:
+        query = compile_query(expression, arrays)
+        matched_keys = keys[query.mask(arrays)]
+    except (TypeError, ValueError) as e:
+        st.error(f"Invalid expression: {e}")
+        st.stop()
+    if query_name:
+        saved_queries[query_name] = expression
+        save_queries(saved_queries)
+        st.toast(f"Saved expression {query_name}")
+
+    reference_table = drop_broken_rows(
+        pd.read_csv(
+            f"artifacts/app_data/{st.session_state.mv_avg_window_size_frac}/"
+            "reference_table.csv"
+        ),
+        st.session_state.mv_avg_window_size_frac,
+    )
+    filtered_reference_table = (
+        select_reference_rows(reference_table, matched_keys)
+        .drop_duplicates(subset=MATCHING_COLUMNS)
+        .sort_values(by=["machine_id", "date", "speed"])
+    )
+    st.header("Filtered measurements")
+    st.write(
+        f"{filtered_reference_table.shape[0]} rows found "
+        f"({len(matched_keys)} of {len(keys)} scored measurements)."
+    )
+    plot_filtered_result(
+        filtered_table=filtered_reference_table,
+        time_series=time_series,
+        df_description="Filtered Reference Table",
+        row_index_vars=[
+            "machine_id",
+            "date",
+            "speed",
+        ],
+    )
+
+
 time_series_possible_values = [
     "contour_deviation_1",
     "contour_deviation_2",
@@ -96,6 +245,16 @@ with st.form("mv_avg_window_size_frac_form"):
         st.session_state.mv_avg_done = True
         st.session_state.mv_avg_window_size_frac = mv_avg_window_size_frac
 
+filter_mode = st.radio(
+    "Filter mode",
+    ["Threshold", "Expression"],
+    horizontal=True,
+    help="Expressions combine several quantile and score columns.",
+)
+if st.session_state.mv_avg_done and filter_mode == "Expression":
+    expression_filter()
+    st.stop()
+
 if st.session_state.mv_avg_done:
     available_files = list(
         sorted(
@@ -207,9 +366,12 @@ if (
     and st.session_state.single_done
     and st.session_state.thresholds_and_percentage_done
 ):
-    reference_table = pd.read_csv(
-        f"artifacts/app_data/{st.session_state.mv_avg_window_size_frac}/"
-        "reference_table.csv"
+    reference_table = drop_broken_rows(
+        pd.read_csv(
+            f"artifacts/app_data/{st.session_state.mv_avg_window_size_frac}/"
+            "reference_table.csv"
+        ),
+        st.session_state.mv_avg_window_size_frac,
     )
     filtered_reference_table = filter_reference_table(
         reference_table=reference_table,
@@ -0,0 +1,131 @@
+import json
+
+import pandas as pd
+import streamlit as st
+
+from src.utils.annotation_index import get_summary_index_file
+from src.utils.annotations import load_labeled_annotations
+from src.utils.evaluation import (
+    FEATURE_VARS,
+    build_report,
+    list_score_files,
+    to_report,
+)
+from src.utils.measurement import APP_DATA_PATH
+from src.utils.reference_table import list_window_fractions
+
+if not APP_DATA_PATH.is_dir():
+    st.error(f"No data found in {APP_DATA_PATH}. Please run ETL first.")
+    st.stop()
+
+DEFAULT_MV_AVG_WINDOW_SIZE_FRAC = "0.05"
+
+
+@st.cache_data
+def load_report(
+    mv_avg_window_size_frac: str,
+    include_edge_cases: bool,
+    annotations_mtime: float,
+    scores_mtime: float,
+) -> tuple[pd.DataFrame, dict[tuple[str, str, str], pd.DataFrame]]:
+    return build_report(
+        mv_avg_window_size_frac,
+        load_labeled_annotations(),
+        include_edge_cases=include_edge_cases,
+    )
+
+
+mv_avg_window_size_fracs = list_window_fractions()
+
+st.set_page_config(layout="wide")
+st.title("Score Evaluation")
+
+if "evaluation_done" not in st.session_state:
+    st.session_state.evaluation_done = False
+
+with st.form("evaluation_form"):
+    mv_avg_window_size_frac = st.selectbox(
+        "Select moving average window size fraction",
+        mv_avg_window_size_fracs,
+        index=(
+            mv_avg_window_size_fracs.index(DEFAULT_MV_AVG_WINDOW_SIZE_FRAC)
+            if DEFAULT_MV_AVG_WINDOW_SIZE_FRAC in mv_avg_window_size_fracs
+            else 0
+        ),
+    )
+    include_edge_cases = st.checkbox("Count edge cases as anomalies")
+    evaluation_submitted = st.form_submit_button("Apply")
+    if evaluation_submitted:
+        st.session_state.evaluation_done = True
+        st.session_state.evaluation_frac = mv_avg_window_size_frac
+        st.session_state.include_edge_cases = include_edge_cases
+
+if st.session_state.evaluation_done:
+    # The summary index is rewritten on every save, so its mtime tells when
+    # labels changed.
+    summary_index_file = get_summary_index_file()
+    summary, curves = load_report(
+        st.session_state.evaluation_frac,
+        st.session_state.include_edge_cases,
+        (
+            summary_index_file.stat().st_mtime
+            if summary_index_file.is_file()
+            else 0.0
+        ),
+        max(
+            (
+                score_file.stat().st_mtime
+                for score_file in list_score_files(
+                    st.session_state.evaluation_frac
+                )
+            ),
+            default=0.0,
+        ),
+    )
+    if summary.empty:
+        st.warning(
+            "No scores overlap with labeled measurements. Run scoring "
+            "(python -m src.scripts.score) and label some measurements."
+        )
+        st.stop()
+
+    st.dataframe(summary, hide_index=True)
+    st.download_button(
+        "Download JSON report",
+        json.dumps(
+            to_report(
+                summary,
+                curves,
+                mv_avg_window_size_frac=st.session_state.evaluation_frac,
+                include_edge_cases=st.session_state.include_edge_cases,
+            ),
+            indent=2,
+        ),
+        file_name=f"evaluation_{st.session_state.evaluation_frac}.json",
+        mime="application/json",
+    )
+
+    feature_keys = list(
+        summary[FEATURE_VARS].itertuples(index=False, name=None)
+    )
+    feature_key = st.selectbox(
+        "Feature", feature_keys, format_func=lambda key: " / ".join(key)
+    )
+    curve = curves[feature_key]
+    cols = st.columns(2)
+    with cols[0]:
+        st.subheader("Precision / recall by threshold")
+        st.line_chart(
+            curve.set_index("threshold")[["precision", "recall", "f1"]]
+        )
+    with cols[1]:
+        st.subheader("ROC")
+        st.line_chart(
+            pd.concat(
+                [pd.DataFrame({"fpr": [0.0], "recall": [0.0]}), curve],
+                ignore_index=True,
+            ),
+            x="fpr",
+            y="recall",
+        )
+    st.dataframe(curve, hide_index=True)
@@ -0,0 +1,50 @@
+import argparse
+
+import numpy as np
+
+from src.utils.downsampling import build_pyramid, get_pyramid_file
+from src.utils.measurement import (
+    APP_DATA_PATH,
+    TIME_SERIES,
+    get_preprocessed_file,
+)
+from src.utils.reference_table import list_window_fractions, load_machine_series
+
+
+def build_pyramids(mv_avg_window_size_frac: str) -> None:
+    machine_dirs = sorted(
+        d
+        for d in (APP_DATA_PATH / mv_avg_window_size_frac).iterdir()
+        if d.is_dir()
+    )
+    for machine_dir in machine_dirs:
+        machine_id = machine_dir.name
+        if not get_preprocessed_file(
+            machine_id, mv_avg_window_size_frac
+        ).is_file():
+            continue
+        pyramid_file = get_pyramid_file(machine_id, mv_avg_window_size_frac)
+        series = load_machine_series(
+            mv_avg_window_size_frac=mv_avg_window_size_frac,
+            machine_id=machine_id,
+            time_series=TIME_SERIES,
+        )
+        time_series = [ts for ts in TIME_SERIES if ts in series.columns]
+        np.savez_compressed(pyramid_file, **build_pyramid(series, time_series))
+        print(f"Built {pyramid_file}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build min/max downsampling pyramids for stored series."
+    )
+    parser.add_argument("--mv-avg-window-size-frac", nargs="+", default=None)
+    args = parser.parse_args()
+
+    fracs = args.mv_avg_window_size_frac or list_window_fractions()
+    for frac in fracs:
+        build_pyramids(frac)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import argparse
+
+from src.utils.reference_table import list_window_fractions
+from src.utils.similarity import build_similarity_indexes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build similarity search indexes for every slice."
+    )
+    parser.add_argument("--mv-avg-window-size-frac", nargs="+", default=None)
+    args = parser.parse_args()
+
+    fracs = args.mv_avg_window_size_frac or list_window_fractions()
+    for frac in fracs:
+        for index_file in build_similarity_indexes(frac):
+            print(f"Built {index_file}")
+
+
+if __name__ == "__main__":
+    main()
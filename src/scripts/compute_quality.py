@@ -0,0 +1,23 @@
+import argparse
+
+from src.utils.quality import compute_quality, get_quality_file
+from src.utils.reference_table import list_window_fractions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compute data-quality metrics for every measurement."
+    )
+    parser.add_argument("--mv-avg-window-size-frac", nargs="+", default=None)
+    args = parser.parse_args()
+
+    fracs = args.mv_avg_window_size_frac or list_window_fractions()
+    for frac in fracs:
+        quality = compute_quality(frac)
+        quality_file = get_quality_file(frac)
+        quality.to_csv(quality_file, index=False)
+        print(f"Wrote {len(quality)} rows to {quality_file}")
+
+
+if __name__ == "__main__":
+    main()
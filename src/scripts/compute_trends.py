@@ -0,0 +1,50 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.utils.measurement import APP_DATA_PATH, get_preprocessed_file
+from src.utils.reference_table import list_window_fractions
+from src.utils.trends import TREND_COLUMNS, compute_machine_trends, save_trends
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Roll up every measurement into trend statistics per machine, "
+            "axis, direction, speed and date."
+        )
+    )
+    parser.add_argument("--mv-avg-window-size-frac", nargs="+", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    fracs = args.mv_avg_window_size_frac or list_window_fractions()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for frac in fracs:
+            machine_ids = sorted(
+                d.name
+                for d in (APP_DATA_PATH / frac).iterdir()
+                if d.is_dir() and get_preprocessed_file(d.name, frac).is_file()
+            )
+            parts = list(
+                executor.map(
+                    compute_machine_trends,
+                    [frac] * len(machine_ids),
+                    machine_ids,
+                )
+            )
+            trends = (
+                pd.concat(parts, ignore_index=True)
+                if parts
+                else pd.DataFrame(columns=TREND_COLUMNS)
+            )
+            trends_file = save_trends(trends, frac)
+            print(
+                f"[{frac}] wrote {len(trends)} rows of {len(machine_ids)} "
+                f"machines to {trends_file}"
+            )
+
+
+if __name__ == "__main__":
+    main()
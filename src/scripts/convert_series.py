@@ -0,0 +1,147 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils.measurement import (
+    APP_DATA_PATH,
+    PREPROCESSED_FILE_NAME,
+    TIME_SERIES,
+)
+from src.utils.reference_table import list_window_fractions
+from src.utils.series_store import (
+    SERIES_STORE_FILE_NAME,
+    read_series_store,
+    write_series_store,
+)
+
+
+def _cell_lengths(
+    values: pd.Series,  # type: ignore[type-arg]
+) -> pd.Series:  # type: ignore[type-arg]
+    # Samples per cell, -1 for a cell without a series.
+    return values.map(lambda v: int(np.size(v)) if np.ndim(v) > 0 else -1)
+
+
+def _matches(original: pd.DataFrame, restored: pd.DataFrame) -> bool:
+    if list(restored.columns) != list(original.columns):
+        return False
+    if len(restored) != len(original):
+        return False
+    return all(
+        np.array_equal(
+            _cell_lengths(original[ts_name]).to_numpy(),
+            _cell_lengths(restored[ts_name]).to_numpy(),
+        )
+        for ts_name in TIME_SERIES
+        if ts_name in original.columns
+    )
+
+
+def _max_abs_error(original: pd.DataFrame, restored: pd.DataFrame) -> float:
+    error = 0.0
+    for ts_name in TIME_SERIES:
+        if ts_name not in original.columns:
+            continue
+        for a, b in zip(original[ts_name], restored[ts_name]):
+            if np.ndim(a) > 0 and np.size(a) > 0:
+                diff = np.abs(np.asarray(a, dtype=np.float64).ravel() - b)
+                error = max(error, float(np.nanmax(diff, initial=0.0)))
+    return error
+
+
+def convert_machine(
+    machine_dir: Path,
+    remove_pickle: bool = False,
+) -> dict[str, object]:
+    pickle_file = machine_dir / PREPROCESSED_FILE_NAME
+    store_file = machine_dir / SERIES_STORE_FILE_NAME
+
+    start = time.perf_counter()
+    original: pd.DataFrame = pd.read_pickle(pickle_file)
+    pickle_seconds = time.perf_counter() - start
+    write_series_store(original, store_file, TIME_SERIES)
+    start = time.perf_counter()
+    restored = read_series_store(store_file)
+    store_seconds = time.perf_counter() - start
+
+    if not _matches(original, restored):
+        store_file.unlink()
+        raise ValueError(f"Converted {pickle_file} does not match, removed")
+    report = {
+        "machine": str(machine_dir),
+        "pickle_mb": pickle_file.stat().st_size / 2**20,
+        "store_mb": store_file.stat().st_size / 2**20,
+        "pickle_read_s": pickle_seconds,
+        "store_read_s": store_seconds,
+        "max_abs_error": _max_abs_error(original, restored),
+    }
+    if remove_pickle:
+        pickle_file.unlink()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Convert preprocessed_df.pkl files to compressed, chunked "
+            "float32 series stores and report size and read time."
+        )
+    )
+    parser.add_argument("--mv-avg-window-size-frac", nargs="+", default=None)
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Convert machines that already have an up-to-date store.",
+    )
+    parser.add_argument(
+        "--remove-pickle",
+        action="store_true",
+        help="Delete each pickle once its store was written and verified.",
+    )
+    args = parser.parse_args()
+
+    reports = []
+    for frac in args.mv_avg_window_size_frac or list_window_fractions():
+        for machine_dir in sorted((APP_DATA_PATH / frac).iterdir()):
+            pickle_file = machine_dir / PREPROCESSED_FILE_NAME
+            store_file = machine_dir / SERIES_STORE_FILE_NAME
+            if not pickle_file.is_file():
+                continue
+            if (
+                not args.force
+                and store_file.is_file()
+                and store_file.stat().st_mtime >= pickle_file.stat().st_mtime
+            ):
+                continue
+            report = convert_machine(machine_dir, args.remove_pickle)
+            reports.append(report)
+            print(
+                f"{report['machine']}: "
+                f"{report['pickle_mb']:.1f} MB -> {report['store_mb']:.1f} MB"
+            )
+
+    if not reports:
+        print("Nothing to convert")
+        return
+    summary = pd.DataFrame(reports)
+    pickle_mb = summary["pickle_mb"].sum()
+    store_mb = summary["store_mb"].sum()
+    print(
+        f"Converted {len(summary)} machines: "
+        f"{pickle_mb:.1f} MB -> {store_mb:.1f} MB "
+        f"({pickle_mb / max(store_mb, 1e-9):.1f}x smaller)"
+    )
+    print(
+        f"Read throughput: pickle "
+        f"{pickle_mb / max(summary['pickle_read_s'].sum(), 1e-9):.0f} MB/s, "
+        f"store {pickle_mb / max(summary['store_read_s'].sum(), 1e-9):.0f} "
+        "MB/s of pickle-equivalent data"
+    )
+    print(f"Largest float32 rounding error: {summary['max_abs_error'].max():g}")
+
+
+if __name__ == "__main__":
+    main()
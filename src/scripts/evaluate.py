@@ -0,0 +1,44 @@
+import argparse
+import json
+from pathlib import Path
+
+from src.utils.annotations import load_labeled_annotations
+from src.utils.evaluation import build_report, to_report
+from src.utils.reference_table import list_window_fractions
+
+EVALUATION_PATH = Path("artifacts/evaluation/")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Evaluate how well scores separate labeled anomalies."
+    )
+    parser.add_argument("--mv-avg-window-size-frac", nargs="+", default=None)
+    parser.add_argument("--include-edge-cases", action="store_true")
+    parser.add_argument("--output-dir", type=Path, default=EVALUATION_PATH)
+    args = parser.parse_args()
+
+    labeled = load_labeled_annotations()
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    fracs = args.mv_avg_window_size_frac or list_window_fractions()
+    for frac in fracs:
+        summary, curves = build_report(
+            frac, labeled, include_edge_cases=args.include_edge_cases
+        )
+        report_file = args.output_dir / f"{frac}.json"
+        with open(report_file, "w") as f:
+            json.dump(
+                to_report(
+                    summary,
+                    curves,
+                    mv_avg_window_size_frac=frac,
+                    include_edge_cases=args.include_edge_cases,
+                ),
+                f,
+                indent=2,
+            )
+        print(f"Wrote {len(summary)} feature evaluations to {report_file}")
+
+
+if __name__ == "__main__":
+    main()
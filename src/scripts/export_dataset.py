@@ -0,0 +1,194 @@
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Iterator, Literal
+
+import numpy as np
+import pandas as pd
+
+from src.utils.annotations import SAVE_PATH, load_labeled_annotations
+from src.utils.measurement import (
+    APP_DATA_PATH,
+    MEASUREMENT_KEY_VARS,
+    TIME_SERIES,
+    get_preprocessed_file,
+    normalize_measurement_keys,
+    read_preprocessed_file,
+)
+
+DEFAULT_SHARD_SIZE = 1024
+ExportFormat = Literal["npz", "parquet"]
+
+
+def iter_labeled_measurements(
+    labeled: pd.DataFrame,
+    mv_avg_window_size_frac: str,
+    time_series: list[str],
+    app_data_path: Path = APP_DATA_PATH,
+) -> Iterator[pd.DataFrame]:
+    labeled = normalize_measurement_keys(labeled)
+    for machine_id, machine_labels in labeled.groupby("machine_id", sort=True):
+        preprocessed_file = get_preprocessed_file(
+            machine_id=str(machine_id),
+            mv_avg_window_size_frac=mv_avg_window_size_frac,
+            app_data_path=app_data_path,
+        )
+        if not preprocessed_file.is_file():
+            print(f"Skipping machine {machine_id}: {preprocessed_file} missing")
+            continue
+        df = read_preprocessed_file(
+            preprocessed_file, columns=[*MEASUREMENT_KEY_VARS, *time_series]
+        )
+        df = normalize_measurement_keys(
+            df[[*MEASUREMENT_KEY_VARS, *time_series]]
+        )
+        # Labels are stored under the full reference keys; a measurement
+        # written twice is exported once.
+        df = df.drop_duplicates(subset=MEASUREMENT_KEY_VARS)
+        keys = df[MEASUREMENT_KEY_VARS].assign(_position=range(len(df)))
+        # Walk the machine slice by slice so only one slice is joined at once.
+        for _, slice_labels in machine_labels.groupby(
+            ["axis", "measure_direction", "speed"], sort=True
+        ):
+            matched = slice_labels[[*MEASUREMENT_KEY_VARS, "class"]].merge(
+                keys, on=MEASUREMENT_KEY_VARS, how="inner"
+            )
+            rows = df.iloc[matched["_position"]].reset_index(drop=True)
+            rows.insert(
+                len(MEASUREMENT_KEY_VARS), "class", matched["class"].to_numpy()
+            )
+            yield rows
+        del df, keys
+
+
+def _pack_series(
+    values: pd.Series,  # type: ignore[type-arg]
+) -> tuple[np.ndarray, np.ndarray]:  # type: ignore[type-arg]
+    arrays = [np.asarray(v, dtype=np.float64).ravel() for v in values]
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(a) for a in arrays])
+    if len(arrays) == 0:
+        return np.empty(0, dtype=np.float64), offsets
+    return np.concatenate(arrays), offsets
+
+
+def write_shard(
+    shard: pd.DataFrame,
+    shard_file: Path,
+    time_series: list[str],
+    export_format: ExportFormat,
+) -> None:
+    if export_format == "parquet":
+        shard = shard.copy()
+        for ts_name in time_series:
+            shard[ts_name] = [
+                np.asarray(v, dtype=np.float64).ravel() for v in shard[ts_name]
+            ]
+        shard.to_parquet(shard_file, index=False)
+        return
+
+    arrays: dict[str, Any] = {
+        var: shard[var].to_numpy(dtype=str)
+        for var in [*MEASUREMENT_KEY_VARS, "class"]
+    }
+    for ts_name in time_series:
+        values, offsets = _pack_series(shard[ts_name])
+        arrays[f"{ts_name}_values"] = values
+        arrays[f"{ts_name}_offsets"] = offsets
+    np.savez_compressed(shard_file, **arrays)
+
+
+def export_dataset(
+    mv_avg_window_size_frac: str,
+    output_dir: Path,
+    time_series: list[str] = TIME_SERIES,
+    classes: list[str] | None = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    export_format: ExportFormat = "parquet",
+    app_data_path: Path = APP_DATA_PATH,
+    save_path: Path = SAVE_PATH,
+) -> dict[str, Any]:
+    labeled = load_labeled_annotations(save_path)
+    if classes is not None:
+        labeled = labeled[labeled["class"].isin(classes)]
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    shards: list[dict[str, Any]] = []
+    buffer: list[pd.DataFrame] = []
+    buffered_rows = 0
+
+    def flush(rows: int) -> None:
+        nonlocal buffer, buffered_rows
+        shard = pd.concat(buffer, ignore_index=True)
+        to_write, rest = shard.iloc[:rows], shard.iloc[rows:]
+        shard_file = output_dir / f"shard-{len(shards):05d}.{export_format}"
+        write_shard(to_write, shard_file, time_series, export_format)
+        shards.append(
+            {
+                "file": shard_file.name,
+                "rows": len(to_write),
+                "classes": to_write["class"].value_counts().to_dict(),
+            }
+        )
+        buffer = [rest] if len(rest) > 0 else []
+        buffered_rows = len(rest)
+
+    for chunk in iter_labeled_measurements(
+        labeled=labeled,
+        mv_avg_window_size_frac=mv_avg_window_size_frac,
+        time_series=time_series,
+        app_data_path=app_data_path,
+    ):
+        buffer.append(chunk)
+        buffered_rows += len(chunk)
+        while buffered_rows >= shard_size:
+            flush(shard_size)
+    if buffered_rows > 0:
+        flush(buffered_rows)
+
+    manifest = {
+        "mv_avg_window_size_frac": mv_avg_window_size_frac,
+        "format": export_format,
+        "key_vars": MEASUREMENT_KEY_VARS,
+        "label_var": "class",
+        "time_series": time_series,
+        "rows": sum(shard["rows"] for shard in shards),
+        "shards": shards,
+    }
+    with open(output_dir / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Export labeled measurements as training shards."
+    )
+    parser.add_argument("--mv-avg-window-size-frac", default="0.05")
+    parser.add_argument("--output-dir", type=Path, required=True)
+    parser.add_argument(
+        "--time-series", nargs="+", choices=TIME_SERIES, default=TIME_SERIES
+    )
+    parser.add_argument("--classes", nargs="+", default=None)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument(
+        "--format", choices=["npz", "parquet"], default="parquet"
+    )
+    args = parser.parse_args()
+
+    manifest = export_dataset(
+        mv_avg_window_size_frac=args.mv_avg_window_size_frac,
+        output_dir=args.output_dir,
+        time_series=args.time_series,
+        classes=args.classes,
+        shard_size=args.shard_size,
+        export_format=args.format,
+    )
+    print(
+        f"Exported {manifest['rows']} measurements "
+        f"in {len(manifest['shards'])} shards to {args.output_dir}"
+    )
+
+
+if __name__ == "__main__":
+    main()
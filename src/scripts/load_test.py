@@ -0,0 +1,420 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Delta_pb2 import Delta
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import WebSocketClientConnection, websocket_connect
+
+from src.utils.measurement import TIME_SERIES
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+ANNOTATOR_PAGE = REPO_ROOT / "src" / "annotator.py"
+HOTKEYS_COMPONENT = "manager"
+# Relative frequency of the keys an annotator presses while labeling.
+KEY_WEIGHTS = {
+    "normal": 0.6,
+    "edge_case": 0.05,
+    "anomaly": 0.05,
+    "next": 0.15,
+    "previous": 0.05,
+    "next_unlabeled": 0.1,
+}
+MONITOR_INTERVAL = 0.5
+SYNTHETIC_FRAC = "0.05"
+SYNTHETIC_SHARED_SCRIPT_SIZE = 256 * 1024
+
+
+def build_synthetic_tree(
+    root: Path,
+    n_machines: int = 4,
+    n_dates: int = 20,
+    length: int = 2000,
+    seed: int = 0,
+) -> None:
+    # One window fraction with the default slice of the annotator (Y, GL,
+    # F2000) and plot pages that embed a large shared script like the
+    # real ones.
+    rng = np.random.default_rng(seed)
+    app_data = root / "artifacts" / "app_data" / SYNTHETIC_FRAC
+    shared_script = "x" * SYNTHETIC_SHARED_SCRIPT_SIZE
+    rows = []
+    for machine_id in range(1, n_machines + 1):
+        machine_dir = app_data / str(machine_id)
+        series = []
+        for axis in ["X", "Y"]:
+            for measure_direction in ["GL", "GR"]:
+                for speed in ["F1000", "F2000"]:
+                    for day in range(n_dates):
+                        date = str(np.datetime64("2024-01-01") + day)
+                        keys = {
+                            "machine_id": machine_id,
+                            "date": date,
+                            "speed": speed,
+                            "axis": axis,
+                            "measure_direction": measure_direction,
+                        }
+                        plot_dir = (
+                            machine_dir
+                            / "plots"
+                            / f"{axis}_{measure_direction}_{speed}_{date}"
+                        )
+                        plot_dir.mkdir(parents=True, exist_ok=True)
+                        row = {**keys, "file_path": f"raw/{machine_id}.csv"}
+                        measurement = dict(keys)
+                        for ts_name in TIME_SERIES:
+                            values = rng.normal(size=length).cumsum()
+                            plot_file = plot_dir / f"{ts_name}.html"
+                            plot_file.write_text(
+                                f"<html><body><script>{shared_script}"
+                                f"</script><script>{values[:200].tolist()}"
+                                "</script></body></html>",
+                                encoding="utf-8",
+                            )
+                            row[ts_name] = str(plot_file.relative_to(root))
+                            measurement[ts_name] = values
+                        rows.append(row)
+                        series.append(measurement)
+        pd.DataFrame(series).to_pickle(machine_dir / "preprocessed_df.pkl")
+    pd.DataFrame(rows).to_csv(app_data / "reference_table.csv", index=False)
+
+
+def read_rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def count_open_fds(pid: int) -> int:
+    try:
+        return len(os.listdir(f"/proc/{pid}/fd"))
+    except OSError:
+        return 0
+
+
+@dataclass
+class LoadTestResult:
+    sessions: int
+    reruns: int = 0
+    errors: int = 0
+    latencies: list[float] = field(default_factory=list)
+    rss: list[int] = field(default_factory=list)
+    fds: list[int] = field(default_factory=list)
+    error_messages: list[str] = field(default_factory=list)
+
+    def summary(self) -> dict[str, object]:
+        latencies = np.asarray(self.latencies)
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            latency_max = latencies.max()
+        else:
+            p50 = p95 = p99 = latency_max = np.nan
+        return {
+            "sessions": self.sessions,
+            "reruns": self.reruns,
+            "errors": self.errors,
+            "latency_p50_s": float(p50),
+            "latency_p95_s": float(p95),
+            "latency_p99_s": float(p99),
+            "latency_max_s": float(latency_max),
+            "rss_start_mb": self.rss[0] / 2**20 if self.rss else None,
+            "rss_peak_mb": max(self.rss) / 2**20 if self.rss else None,
+            "rss_end_mb": self.rss[-1] / 2**20 if self.rss else None,
+            "fds_start": self.fds[0] if self.fds else None,
+            "fds_peak": max(self.fds) if self.fds else None,
+            "fds_end": self.fds[-1] if self.fds else None,
+            "first_errors": self.error_messages[:5],
+        }
+
+
+class Session:
+    # One annotator, talking to the server over the websocket protocol of the
+    # browser: every rerun request carries the values of the widgets the
+    # session has touched, and a press of a hot key only reruns the fragment
+    # the hot keys live in.
+    def __init__(self, session_id: int, url: str, timeout: float) -> None:
+        self.session_id = session_id
+        self.url = url
+        self.timeout = timeout
+        self.latencies: list[float] = []
+        self.errors: list[str] = []
+        self.widget_states: dict[str, WidgetState] = {}
+        self.buttons: dict[str, str] = {}
+        self.hotkeys_id: str | None = None
+        self.hotkeys_fragment_id = ""
+        self.connection: WebSocketClientConnection | None = None
+
+    async def connect(self) -> None:
+        self.connection = await websocket_connect(
+            self.url, max_message_size=2**30
+        )
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+
+    async def rerun(
+        self, trigger: WidgetState | None = None, fragment_id: str = ""
+    ) -> None:
+        assert self.connection is not None
+        message = BackMsg()
+        message.rerun_script.page_script_hash = ""
+        message.rerun_script.fragment_id = fragment_id
+        message.rerun_script.widget_states.widgets.extend(
+            self.widget_states.values()
+        )
+        if trigger is not None:
+            message.rerun_script.widget_states.widgets.append(trigger)
+        if not fragment_id:
+            self.buttons = {}
+        start = time.perf_counter()
+        await self.connection.write_message(
+            message.SerializeToString(), binary=True
+        )
+        await asyncio.wait_for(self.read_until_finished(), self.timeout)
+        self.latencies.append(time.perf_counter() - start)
+
+    async def read_until_finished(self) -> None:
+        assert self.connection is not None
+        while True:
+            data = await self.connection.read_message()
+            if data is None:
+                raise RuntimeError("Server closed the connection")
+            message = ForwardMsg()
+            message.ParseFromString(data)
+            kind = message.WhichOneof("type")
+            if kind == "delta":
+                self.read_delta(message.delta)
+            elif kind == "script_finished":
+                status = message.script_finished
+                if status == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    self.errors.append(
+                        f"session {self.session_id}: compile error"
+                    )
+                # A script stopped by st.rerun() is followed by the rerun.
+                if status != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return
+
+    def read_delta(self, delta: Delta) -> None:
+        if delta.WhichOneof("type") != "new_element":
+            return
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind == "button":
+            self.buttons[element.button.label] = element.button.id
+        elif kind == "component_instance":
+            if element.component_instance.component_name.endswith(
+                HOTKEYS_COMPONENT
+            ):
+                self.hotkeys_id = element.component_instance.id
+                self.hotkeys_fragment_id = delta.fragment_id
+        elif kind == "exception":
+            self.errors.append(
+                f"session {self.session_id}: {element.exception.message}"
+            )
+
+    async def click(self, label: str) -> None:
+        if label not in self.buttons:
+            raise RuntimeError(f"Button {label!r} not found")
+        await self.rerun(
+            WidgetState(id=self.buttons[label], trigger_value=True)
+        )
+
+    async def press(self, key: str, seq: int) -> None:
+        if self.hotkeys_id is None:
+            raise RuntimeError("Hot keys not found")
+        state = WidgetState(
+            id=self.hotkeys_id, json_value=json.dumps({"id": key, "seq": seq})
+        )
+        self.widget_states[state.id] = state
+        await self.rerun(fragment_id=self.hotkeys_fragment_id)
+
+
+async def run_session(
+    session: Session, presses: int, press_interval: float
+) -> None:
+    rng = random.Random(session.session_id)
+    keys = list(KEY_WEIGHTS)
+    weights = list(KEY_WEIGHTS.values())
+    try:
+        await session.connect()
+        await session.rerun()
+        # The three selection forms and the switch to the annotation view.
+        for label in ["Apply", "Apply", "Apply", "To Annotations"]:
+            await session.click(label)
+        for seq in range(1, presses + 1):
+            await asyncio.sleep(rng.expovariate(1 / press_interval))
+            await session.press(rng.choices(keys, weights)[0], seq)
+    except Exception as e:
+        session.errors.append(f"session {session.session_id}: {e!r}")
+    finally:
+        session.close()
+
+
+def find_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        port: int = sock.getsockname()[1]
+    return port
+
+
+def start_server(
+    root: Path, port: int, timeout: float
+) -> "subprocess.Popen[bytes]":
+    # The pages resolve artifacts/ against the working directory and import
+    # the src package from the repository.
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "streamlit",
+            "run",
+            str(ANNOTATOR_PAGE),
+            "--server.headless=true",
+            f"--server.port={port}",
+            "--server.fileWatcherType=none",
+            "--browser.gatherUsageStats=false",
+        ],
+        cwd=root,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            with urllib.request.urlopen(
+                f"http://localhost:{port}/_stcore/health", timeout=1
+            ) as response:
+                if response.read() == b"ok":
+                    return server
+        except OSError:
+            time.sleep(MONITOR_INTERVAL)
+    server.terminate()
+    raise RuntimeError("Server did not become healthy")
+
+
+async def drive_server(
+    server_pid: int,
+    port: int,
+    result: LoadTestResult,
+    presses: int,
+    press_interval: float,
+    timeout: float,
+) -> None:
+    url = f"ws://localhost:{port}/_stcore/stream"
+    sessions = [Session(i, url, timeout) for i in range(result.sessions)]
+    runs = asyncio.gather(
+        *(run_session(s, presses, press_interval) for s in sessions)
+    )
+    # Memory and descriptors of the one server process all sessions share.
+    while not runs.done():
+        result.rss.append(read_rss_bytes(server_pid))
+        result.fds.append(count_open_fds(server_pid))
+        await asyncio.wait([runs], timeout=MONITOR_INTERVAL)
+    result.rss.append(read_rss_bytes(server_pid))
+    result.fds.append(count_open_fds(server_pid))
+    for session in sessions:
+        result.reruns += len(session.latencies)
+        result.latencies.extend(session.latencies)
+        result.errors += len(session.errors)
+        result.error_messages.extend(session.errors)
+
+
+def run_load_test(
+    root: Path,
+    sessions: int,
+    presses: int,
+    press_interval: float,
+    timeout: float = 60.0,
+) -> LoadTestResult:
+    # A fresh server per session count, so the memory at the start is that
+    # of an idle server.
+    result = LoadTestResult(sessions=sessions)
+    port = find_free_port()
+    server = start_server(root, port, timeout)
+    try:
+        asyncio.run(
+            drive_server(
+                server.pid, port, result, presses, press_interval, timeout
+            )
+        )
+    finally:
+        server.terminate()
+        server.wait()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Simulate concurrent annotators as websocket clients of one "
+            "streamlit run server, and report rerun latency and the "
+            "server's memory and open file descriptors."
+        )
+    )
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--presses", type=int, default=30)
+    parser.add_argument(
+        "--press-interval",
+        type=float,
+        default=1.0,
+        help="Mean seconds between two key presses of one session.",
+    )
+    parser.add_argument(
+        "--root",
+        type=Path,
+        default=None,
+        help=(
+            "Directory containing artifacts/; labels pressed during the test "
+            "are saved there, so point it at a copy. A synthetic tree is "
+            "built in a temporary directory when omitted."
+        ),
+    )
+    parser.add_argument("--machines", type=int, default=4)
+    parser.add_argument("--dates", type=int, default=20)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = args.root
+        if root is None:
+            root = Path(tmp_dir)
+            build_synthetic_tree(root, args.machines, args.dates)
+            print(f"Built synthetic artifacts in {root}")
+
+        summaries = []
+        for sessions in args.sessions:
+            summary = run_load_test(
+                root.resolve(), sessions, args.presses, args.press_interval
+            ).summary()
+            summaries.append(summary)
+            print(json.dumps(summary, indent=2))
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(summaries, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+from pathlib import Path
+
+from src.utils.measurement import TIME_SERIES
+from src.utils.plot_store import (
+    PLOT_STORE_PATH,
+    PlotStore,
+    PlotStoreWriter,
+    get_plot_key,
+)
+from src.utils.reference_table import (
+    list_window_fractions,
+    load_reference_table,
+)
+
+
+def list_plot_files(mv_avg_window_size_frac: str) -> list[str]:
+    reference_table = load_reference_table(mv_avg_window_size_frac)
+    time_series = [ts for ts in TIME_SERIES if ts in reference_table.columns]
+    return list(
+        sorted(
+            {
+                plot_file
+                for ts_name in time_series
+                for plot_file in reference_table[ts_name].dropna()
+            }
+        )
+    )
+
+
+def pack_plots(
+    plot_files: list[str],
+    store_path: Path = PLOT_STORE_PATH,
+    force: bool = False,
+) -> list[str]:
+    packed = []
+    with PlotStoreWriter(store_path) as writer:
+        existing = set() if force else writer.keys
+        for plot_file in plot_files:
+            key = get_plot_key(plot_file)
+            if key in existing or not Path(plot_file).is_file():
+                continue
+            with open(plot_file, encoding="utf-8") as html_file:
+                writer.add(key, html_file.read())
+            packed.append(plot_file)
+    return packed
+
+
+def remove_packed_html(
+    plot_files: list[str],
+    store_path: Path = PLOT_STORE_PATH,
+) -> int:
+    store = PlotStore(store_path)
+    removed = 0
+    for plot_file in plot_files:
+        key = get_plot_key(plot_file)
+        if key not in store or not Path(plot_file).is_file():
+            continue
+        # Only files that reassemble byte for byte are removed.
+        with open(plot_file, encoding="utf-8") as html_file:
+            if store.read(key) != html_file.read():
+                print(f"Keeping {plot_file}: packed copy differs")
+                continue
+        Path(plot_file).unlink()
+        removed += 1
+    return removed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Pack the HTML plots into content-addressed blobs and a few "
+            "indexed archive files."
+        )
+    )
+    parser.add_argument("--mv-avg-window-size-frac", nargs="+", default=None)
+    parser.add_argument("--store-path", type=Path, default=PLOT_STORE_PATH)
+    parser.add_argument(
+        "--force", action="store_true", help="Repack plots already stored."
+    )
+    parser.add_argument(
+        "--remove-html",
+        action="store_true",
+        help="Delete the HTML files once they are verified in the store.",
+    )
+    args = parser.parse_args()
+
+    fracs = args.mv_avg_window_size_frac or list_window_fractions()
+    plot_files = [
+        plot_file for frac in fracs for plot_file in list_plot_files(frac)
+    ]
+    packed = pack_plots(plot_files, args.store_path, args.force)
+    print(f"Packed {len(packed)} of {len(plot_files)} plots")
+    if args.remove_html:
+        removed = remove_packed_html(plot_files, args.store_path)
+        print(f"Removed {removed} HTML files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import cast
+
+import pandas as pd
+
+from src.utils.detectors import QUANTILE_THRESHOLDS, RESIDUALS_STD, score_series
+from src.utils.measurement import (
+    APP_DATA_PATH,
+    MEASUREMENT_KEY_VARS,
+    TIME_SERIES,
+    get_preprocessed_file,
+)
+from src.utils.reference_table import (
+    list_window_fractions,
+    load_machine_series,
+    read_reference_table,
+)
+from src.utils.scores import (
+    SCORE_COLUMNS,
+    SCORES_FILE_NAME,
+    SCORES_PATH,
+    STRABURZYNSKI_FILE_NAME,
+    get_quantile_statistics_file,
+    get_scores_dir,
+    to_quantile_table,
+    to_straburzynski_table,
+)
+
+PARTS_DIR_NAME = "parts"
+
+
+def score_machine(
+    mv_avg_window_size_frac: str,
+    machine_id: str,
+    part_file: Path,
+    residuals_std: float = RESIDUALS_STD,
+    thresholds: list[float] = QUANTILE_THRESHOLDS,
+) -> Path:
+    series = load_machine_series(
+        mv_avg_window_size_frac=mv_avg_window_size_frac,
+        machine_id=machine_id,
+        time_series=TIME_SERIES,
+    )
+    window_frac = float(mv_avg_window_size_frac)
+    records = []
+    for index, row in series.iterrows():
+        key = cast(tuple[str, ...], index)
+        for ts_name in series.columns:
+            scores = score_series(
+                row[ts_name],
+                window_frac=window_frac,
+                residuals_std=residuals_std,
+                thresholds=thresholds,
+            )
+            for detector, features in scores.items():
+                for feature, score in features.items():
+                    records.append((*key, ts_name, detector, feature, score))
+
+    # Parts are written atomically so an interrupted run never leaves a
+    # truncated checkpoint behind.
+    tmp_file = part_file.with_suffix(".tmp")
+    pd.DataFrame.from_records(records, columns=SCORE_COLUMNS).to_csv(
+        tmp_file, index=False
+    )
+    os.replace(tmp_file, part_file)
+    return part_file
+
+
+def _is_up_to_date(part_file: Path, preprocessed_file: Path) -> bool:
+    return (
+        part_file.is_file()
+        and part_file.stat().st_mtime >= preprocessed_file.stat().st_mtime
+    )
+
+
+def score_window_fraction(
+    mv_avg_window_size_frac: str,
+    max_workers: int | None = None,
+    residuals_std: float = RESIDUALS_STD,
+    thresholds: list[float] = QUANTILE_THRESHOLDS,
+    force: bool = False,
+    scores_path: Path = SCORES_PATH,
+) -> pd.DataFrame:
+    scores_dir = get_scores_dir(mv_avg_window_size_frac, scores_path)
+    parts_dir = scores_dir / PARTS_DIR_NAME
+    parts_dir.mkdir(parents=True, exist_ok=True)
+
+    machine_ids = sorted(
+        d.name
+        for d in (APP_DATA_PATH / mv_avg_window_size_frac).iterdir()
+        if get_preprocessed_file(d.name, mv_avg_window_size_frac).is_file()
+    )
+    part_files = [parts_dir / f"{machine_id}.csv" for machine_id in machine_ids]
+    pending = [
+        (machine_id, part_file)
+        for machine_id, part_file in zip(machine_ids, part_files)
+        if force
+        or not _is_up_to_date(
+            part_file,
+            get_preprocessed_file(machine_id, mv_avg_window_size_frac),
+        )
+    ]
+    print(
+        f"[{mv_avg_window_size_frac}] {len(machine_ids) - len(pending)} "
+        f"machines already scored, {len(pending)} to go"
+    )
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                score_machine,
+                mv_avg_window_size_frac,
+                machine_id,
+                part_file,
+                residuals_std,
+                thresholds,
+            ): machine_id
+            for machine_id, part_file in pending
+        }
+        for i, future in enumerate(as_completed(futures), start=1):
+            future.result()
+            print(
+                f"[{mv_avg_window_size_frac}] scored machine "
+                f"{futures[future]} ({i}/{len(pending)})"
+            )
+
+    scores = pd.concat(
+        [
+            pd.read_csv(
+                part_file,
+                index_col=None,
+                dtype={var: str for var in MEASUREMENT_KEY_VARS},
+            )
+            for part_file in part_files
+        ],
+        ignore_index=True,
+    )
+    scores.to_csv(scores_dir / SCORES_FILE_NAME, index=False)
+
+    reference_table = read_reference_table(mv_avg_window_size_frac)
+    to_straburzynski_table(scores, reference_table).to_csv(
+        scores_dir / STRABURZYNSKI_FILE_NAME, index=False
+    )
+    quantile_file = get_quantile_statistics_file(
+        mv_avg_window_size_frac, residuals_std
+    )
+    quantile_file.parent.mkdir(parents=True, exist_ok=True)
+    to_quantile_table(scores, reference_table).to_csv(
+        quantile_file, index=False
+    )
+    return scores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Score every measurement with the anomaly detectors."
+    )
+    parser.add_argument("--mv-avg-window-size-frac", nargs="+", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--residuals-std", type=float, default=RESIDUALS_STD)
+    parser.add_argument(
+        "--thresholds", type=float, nargs="+", default=QUANTILE_THRESHOLDS
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rescore machines that already have a checkpoint.",
+    )
+    args = parser.parse_args()
+
+    fracs = args.mv_avg_window_size_frac or list_window_fractions()
+    for frac in fracs:
+        scores = score_window_fraction(
+            frac,
+            max_workers=args.workers,
+            residuals_std=args.residuals_std,
+            thresholds=args.thresholds,
+            force=args.force,
+        )
+        print(f"[{frac}] wrote {len(scores)} scores")
+
+
+if __name__ == "__main__":
+    main()
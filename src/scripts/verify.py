@@ -0,0 +1,98 @@
+import argparse
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import pandas as pd
+
+from src.utils.integrity import (
+    HIDDEN_CHECKS,
+    INTEGRITY_COLUMNS,
+    REPORTED_CHECKS,
+    check_plots,
+    check_preprocessed_rows,
+    check_reference_rows,
+    check_scores,
+    count_preprocessed_rows,
+    save_integrity_report,
+)
+from src.utils.measurement import MEASUREMENT_KEY_VARS
+from src.utils.plot_store import load_plot_index
+from src.utils.reference_table import (
+    list_window_fractions,
+    load_for_all_fractions,
+    load_reference_table,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Check that every reference row has its plots and exactly one "
+            "preprocessed row, and cross-check the score keys."
+        )
+    )
+    parser.add_argument("--mv-avg-window-size-frac", nargs="+", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    fracs = args.mv_avg_window_size_frac or list_window_fractions()
+    reference_tables = load_for_all_fractions(load_reference_table, fracs)
+    packed_keys = set(load_plot_index()["key"])
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        # Machine files of all window fractions are read in worker
+        # processes while the plot directories are listed here.
+        futures: dict[str, dict[str, Future[pd.DataFrame | None]]] = {
+            frac: {
+                machine_id: executor.submit(
+                    count_preprocessed_rows, frac, machine_id
+                )
+                for machine_id in reference_table["machine_id"].unique()
+            }
+            for frac, reference_table in reference_tables.items()
+        }
+        issues = {
+            frac: [
+                check_reference_rows(reference_table),
+                check_plots(reference_table, packed_keys),
+                check_scores(frac, reference_table),
+            ]
+            for frac, reference_table in reference_tables.items()
+        }
+        for frac, reference_table in reference_tables.items():
+            machine_counts = {
+                machine_id: future.result()
+                for machine_id, future in futures[frac].items()
+            }
+            issues[frac].append(
+                check_preprocessed_rows(reference_table, machine_counts)
+            )
+
+    n_hidden = 0
+    for frac, reference_table in reference_tables.items():
+        frac_issues = pd.concat(issues[frac], ignore_index=True)[
+            INTEGRITY_COLUMNS
+        ]
+        integrity_file = save_integrity_report(frac_issues, frac)
+        counts = frac_issues["check"].value_counts()
+        hidden = frac_issues[frac_issues["check"].isin(HIDDEN_CHECKS)]
+        n_hidden += len(hidden)
+        print(
+            f"[{frac}] {len(reference_table)} reference rows, "
+            f"{len(hidden.drop_duplicates(subset=MEASUREMENT_KEY_VARS))} "
+            f"hidden, report in {integrity_file}"
+        )
+        for check in [*HIDDEN_CHECKS, *REPORTED_CHECKS]:
+            if counts.get(check, 0) > 0:
+                print(f"  {check}: {counts[check]}")
+    print(
+        f"Verified {len(fracs)} window fractions in "
+        f"{time.perf_counter() - start:.1f} s"
+    )
+    if n_hidden > 0:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+
+from src.utils.global_queue import list_slices
+from src.utils.reference_table import (
+    SHARED_REFERENCE_TABLE_DTYPES,
+    list_window_fractions,
+    open_shared_reference_table,
+    open_shared_slice_table,
+)
+from src.utils.shared_cache import prune_cache
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Build the shared Arrow cache before starting several app "
+            "workers, so they do not all parse the CSV files at once."
+        )
+    )
+    parser.add_argument("--mv-avg-window-size-frac", nargs="+", default=None)
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Remove existing cache files before rebuilding.",
+    )
+    args = parser.parse_args()
+
+    if args.prune:
+        # Running workers keep their memory maps of removed files valid.
+        print(f"Removed {prune_cache()} cache files")
+    fracs = args.mv_avg_window_size_frac or list_window_fractions()
+    for frac in fracs:
+        for dtype in SHARED_REFERENCE_TABLE_DTYPES:
+            table = open_shared_reference_table(frac, dtype=dtype)
+            print(f"Cached reference table for {frac}: {table.num_rows} rows")
+        table = open_shared_reference_table(frac)
+        slices = list_slices(table)
+        for axis, measure_direction, speed in slices:
+            open_shared_slice_table(
+                frac,
+                axis=axis,
+                measure_direction=measure_direction,
+                speed=speed,
+            )
+        print(f"Cached {len(slices)} annotation slices for {frac}")
+
+
+if __name__ == "__main__":
+    main()
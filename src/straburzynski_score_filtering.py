@@ -1,8 +1,19 @@
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
-import streamlit.components.v1 as components
+
+from src.components.artifact_updates import live_updates, pop_artifact_changes
+from src.components.plot_html import iter_plot_panels, show_plot_panel
+from src.utils.integrity import drop_broken_rows
+from src.utils.reference_table import open_shared_reference_table
+from src.utils.scores import (
+    SCORES_PATH,
+    STRABURZYNSKI_FILE_NAME,
+    get_scores_dir,
+)
+from src.utils.shared_cache import select_rows, unique_values
 
 APP_DATA_PATH = Path("artifacts/app_data/")
 if not APP_DATA_PATH.is_dir():
@@ -11,8 +22,13 @@ if not APP_DATA_PATH.is_dir():
 
 
 SCORE_PATH = Path("artifacts/straburzynski_score.csv")
-if not SCORE_PATH.is_file():
-    st.error(f"No score file found at {SCORE_PATH}. Please run scoring first.")
+if not SCORE_PATH.is_file() and not any(
+    SCORES_PATH.glob(f"*/{STRABURZYNSKI_FILE_NAME}")
+):
+    st.error(
+        f"No score file found at {SCORE_PATH} or in {SCORES_PATH}. "
+        "Please run scoring first (python -m src.scripts.score)."
+    )
     st.stop()
 
 HISTOGRAM_DIR = Path("artifacts/plots/straburzynski_score_histograms/")
@@ -41,8 +57,6 @@ if "mv_avg_done" not in st.session_state:
     st.session_state.mv_avg_done = False
 if "single_done" not in st.session_state:
     st.session_state.single_done = False
-if "reference_table" not in st.session_state:
-    st.session_state.reference_table = pd.DataFrame()
 if "selected_mv_avg_window_size_frac" not in st.session_state:
     st.session_state.selected_mv_avg_window_size_frac = (
         DEFAULT_MV_AVG_WINDOW_SIZE_FRAC
@@ -53,21 +67,8 @@ if "measure_direction" not in st.session_state:
     st.session_state.measure_direction = DEFAULT_DIRECTION
 if "speed" not in st.session_state:
     st.session_state.speed = DEFAULT_SPEED
-if "score_table" not in st.session_state:
-    score_table = pd.read_csv(SCORE_PATH, index_col=None)
-    score_table = score_table.astype(
-        {
-            "axis": str,
-            "speed": str,
-            "measure_direction": str,
-            "machine_id": str,
-        }
-    )
-    st.session_state.score_table = score_table.pivot(
-        index=["axis", "speed", "measure_direction", "machine_id", "date"],
-        columns="feature",
-        values="score",
-    )
+if "score_path" not in st.session_state:
+    st.session_state.score_path = None
 if "selected_score_table" not in st.session_state:
     st.session_state.selected_score_table = pd.DataFrame()
 if "filtered_score_table" not in st.session_state:
@@ -84,6 +85,53 @@ if "single_changed" not in st.session_state:
     st.session_state.single_changed = False
 
 
+def get_score_path(mv_avg_window_size_frac: str) -> Path:
+    batch_score_path = (
+        get_scores_dir(mv_avg_window_size_frac) / STRABURZYNSKI_FILE_NAME
+    )
+    if batch_score_path.is_file():
+        return batch_score_path
+    return SCORE_PATH
+
+
+# Shared by all sessions of this process; treat the result as read-only.
+@st.cache_resource(max_entries=4)
+def load_reference_table(
+    mv_avg_window_size_frac: str,
+    mtime: float,
+) -> pa.Table:
+    return open_shared_reference_table(
+        mv_avg_window_size_frac, dtype={"machine_id": str}
+    )
+
+
+def get_reference_table(mv_avg_window_size_frac: str) -> pa.Table:
+    reference_file = (
+        APP_DATA_PATH / mv_avg_window_size_frac / "reference_table.csv"
+    )
+    return load_reference_table(
+        mv_avg_window_size_frac, reference_file.stat().st_mtime
+    )
+
+
+@st.cache_resource(max_entries=4)
+def load_score_table(score_path: Path, mtime: float) -> pd.DataFrame:
+    score_table = pd.read_csv(score_path, index_col=None)
+    score_table = score_table.astype(
+        {
+            "axis": str,
+            "speed": str,
+            "measure_direction": str,
+            "machine_id": str,
+        }
+    )
+    return score_table.pivot_table(
+        index=["axis", "speed", "measure_direction", "machine_id", "date"],
+        columns="feature",
+        values="score",
+    )
+
+
 def plot_example(
     row: pd.Series,  # type: ignore[type-arg]
     axis: str,
@@ -106,12 +154,12 @@ def plot_example(
                 unsafe_allow_html=True,
             )
 
+    plot_files = [row[ts_name] for ts_name in time_series]
+    (panels,) = iter_plot_panels([plot_files])
     cols = st.columns([7] * len(time_series))
-    for col, ts_name in zip(cols, time_series):
+    for col, plot_file, panel in zip(cols, plot_files, panels):
         with col:
-            html_file = open(row[ts_name], encoding="utf-8")
-            source_code = html_file.read()
-            _ = components.html(source_code, height=650)
+            show_plot_panel(panel, plot_file)
 
 
 st.set_page_config(layout="wide")
@@ -132,42 +180,44 @@ with st.form("mv_avg_window_size_frac_form"):
 
 
 if st.session_state.mv_avg_done:
+    st.session_state.mv_avg_window_size_frac = (
+        st.session_state.selected_mv_avg_window_size_frac
+    )
+    reference_table = get_reference_table(
+        st.session_state.mv_avg_window_size_frac
+    )
+    score_path = get_score_path(st.session_state.mv_avg_window_size_frac)
+    if not score_path.is_file():
+        st.error(f"No score file found at {score_path}.")
+        st.stop()
+    score_table = load_score_table(score_path, score_path.stat().st_mtime)
+    artifact_changes = pop_artifact_changes()
     if (
-        st.session_state.reference_table.empty
-        or st.session_state.mv_avg_window_size_frac
-        != st.session_state.selected_mv_avg_window_size_frac
+        score_path != st.session_state.score_path
+        or artifact_changes is None
+        or score_path in artifact_changes
     ):
-        st.session_state.mv_avg_window_size_frac = (
-            st.session_state.selected_mv_avg_window_size_frac
-        )
-        st.session_state.reference_table = pd.read_csv(
-            APP_DATA_PATH
-            / st.session_state.mv_avg_window_size_frac
-            / "reference_table.csv",
-            index_col=None,
-        ).astype({"machine_id": str})
+        # Selection and filter results are recomputed from the new scores.
+        st.session_state.score_path = score_path
+        st.session_state.selected_score_table = pd.DataFrame()
+        st.session_state.single_changed = True
+    live_updates([score_path])
     with st.form("single_selection_form"):
         single_selection_row = st.columns(2)
-        measure_directions = list(
-            sorted(
-                st.session_state.reference_table["measure_direction"].unique()
-            )
-        )
+        measure_directions = unique_values(reference_table, "measure_direction")
         measure_direction = single_selection_row[0].selectbox(
             "measure_direction",
             measure_directions,
             index=measure_directions.index(DEFAULT_DIRECTION),
         )
-        axes = list(sorted(st.session_state.reference_table["axis"].unique()))
+        axes = unique_values(reference_table, "axis")
         axis = single_selection_row[1].selectbox(
             "axis",
             axes,
             index=axes.index(DEFAULT_AXIS),
         )
 
-        speed_possible_values = list(
-            sorted(st.session_state.reference_table["speed"].unique())
-        )
+        speed_possible_values = unique_values(reference_table, "speed")
         if DEFAULT_SPEED in speed_possible_values:
             default_speed = DEFAULT_SPEED
         else:
@@ -204,26 +254,22 @@ if st.session_state.single_done:
         st.session_state.measure_direction = measure_direction
         st.session_state.speed = speed
 
-        st.session_state.selected_score_table = (
-            st.session_state.score_table.loc[
-                (axis, speed, measure_direction, slice(None), slice(None)), :
-            ]
-        )
+        st.session_state.selected_score_table = score_table.loc[
+            (axis, speed, measure_direction, slice(None), slice(None)), :
+        ]
 
         selected_histogram_dir = HISTOGRAM_DIR / axis / speed
-        if not selected_histogram_dir.is_dir():
-            st.error(
-                f"No histograms found for axis {axis} and speed {speed} "
-                f"in {selected_histogram_dir}."
-            )
-            st.stop()
-        features = list(
-            sorted(
-                d.stem
-                for d in selected_histogram_dir.iterdir()
-                if d.is_file() and d.suffix == ".png"
+        if selected_histogram_dir.is_dir():
+            features = list(
+                sorted(
+                    d.stem
+                    for d in selected_histogram_dir.iterdir()
+                    if d.is_file() and d.suffix == ".png"
+                )
             )
-        )
+        else:
+            # Scores from the batch scoring command come without histograms.
+            features = list(sorted(score_table.columns))
         st.session_state.features = features
 
     selected_histogram_dir = HISTOGRAM_DIR / axis / speed
@@ -233,7 +279,8 @@ if st.session_state.single_done:
             selected_histogram_dir / f"{st.session_state.features[i]}.png"
         )
         cols[i].subheader(st.session_state.features[i])
-        cols[i].image(str(image_path))
+        if image_path.is_file():
+            cols[i].image(str(image_path))
 
     with st.form("thresholds_form"):
         thresholds = {}
@@ -283,15 +330,22 @@ if st.session_state.thresholds_selected:
 
     for idx, score_row in st.session_state.filtered_score_table.iterrows():
         st.markdown(f"### Machine ID: {idx[3]}, Date: {idx[4]}")
-        row = st.session_state.reference_table[
-            (st.session_state.reference_table["machine_id"] == idx[3])
-            & (st.session_state.reference_table["date"] == idx[4])
-            & (st.session_state.reference_table["axis"] == idx[0])
-            & (st.session_state.reference_table["speed"] == idx[1])
-            & (st.session_state.reference_table["measure_direction"] == idx[2])
-        ].iloc[0]
+        rows = drop_broken_rows(
+            select_rows(
+                get_reference_table(st.session_state.mv_avg_window_size_frac),
+                machine_id=idx[3],
+                date=idx[4],
+                axis=idx[0],
+                speed=idx[1],
+                measure_direction=idx[2],
+            ),
+            st.session_state.mv_avg_window_size_frac,
+        )
+        if rows.empty:
+            st.warning("Hidden: this measurement failed the integrity check.")
+            continue
         plot_example(
-            row=row,
+            row=rows.iloc[0],
             axis=st.session_state.selected_axis,
             scores=score_row.to_dict(),
         )
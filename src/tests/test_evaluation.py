@@ -0,0 +1,28 @@
+import pandas as pd
+
+from src.utils.evaluation import label_scores
+
+DATES = ["2024-01-01 08:00:00", "2024-01-01 17:30:00"]
+KEYS = {"machine_id": 1, "measure_direction": "GL", "axis": "Y"}
+
+
+def test_same_day_measurements_keep_their_labels() -> None:
+    scores = pd.DataFrame(
+        [
+            {**KEYS, "speed": "F2000", "date": date, "score": score}
+            for date, score in zip(DATES, [0.9, 0.1])
+        ]
+    ).astype({"machine_id": str})
+    labeled = pd.DataFrame(
+        [
+            {**KEYS, "speed": "F2000", "date": date, "class": label}
+            for date, label in zip(DATES, ["anomaly", "normal"])
+        ]
+    )
+
+    labeled_scores = label_scores(scores, labeled)
+
+    assert labeled_scores[["score", "is_anomaly"]].values.tolist() == [
+        [0.9, True],
+        [0.1, False],
+    ]
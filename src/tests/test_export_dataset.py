@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.scripts.export_dataset import export_dataset
+from src.utils.annotations import get_annotation_file
+
+
+def test_same_day_measurements_keep_their_labels(tmp_path: Path) -> None:
+    app_data_path = tmp_path / "app_data"
+    save_path = tmp_path / "annotator_data"
+    machine_dir = app_data_path / "0.05" / "1"
+    machine_dir.mkdir(parents=True)
+    keys = {"machine_id": 1, "measure_direction": "GL", "axis": "Y"}
+    pd.DataFrame(
+        [
+            {
+                **keys,
+                "speed": "F2000",
+                "date": "2024-01-01 08:00:00",
+                "current_1": np.zeros(4),
+            },
+            {
+                **keys,
+                "speed": "F2000",
+                "date": "2024-01-01 17:30:00",
+                "current_1": np.ones(4),
+            },
+        ]
+    ).to_pickle(machine_dir / "preprocessed_df.pkl")
+    annotation_file = get_annotation_file("Y", "GL", "F2000", save_path)
+    annotation_file.parent.mkdir(parents=True)
+    pd.DataFrame(
+        {
+            "machine_id": [1, 1],
+            "date": ["2024-01-01 08:00:00", "2024-01-01 17:30:00"],
+            "speed": ["F2000", "F2000"],
+            "class": ["anomaly", "normal"],
+        }
+    ).to_csv(annotation_file, index=False)
+
+    manifest = export_dataset(
+        "0.05",
+        tmp_path / "export",
+        time_series=["current_1"],
+        app_data_path=app_data_path,
+        save_path=save_path,
+    )
+
+    assert manifest["rows"] == 2
+    assert manifest["shards"][0]["classes"] == {"anomaly": 1, "normal": 1}
+    shard = pd.read_parquet(tmp_path / "export" / manifest["shards"][0]["file"])
+    labels = dict(zip(shard["date"], shard["class"]))
+    assert labels == {
+        "2024-01-01 08:00:00": "anomaly",
+        "2024-01-01 17:30:00": "normal",
+    }
+    first = shard[shard["date"] == "2024-01-01 08:00:00"]["current_1"].iloc[0]
+    assert np.all(first == 0)
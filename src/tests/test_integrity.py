@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils.integrity import (
+    check_preprocessed_rows,
+    check_reference_rows,
+    count_preprocessed_rows,
+    drop_broken_rows,
+    save_integrity_report,
+)
+from src.utils.measurement import normalize_measurement_keys
+
+KEYS = {"machine_id": 1, "measure_direction": "GL", "axis": "Y"}
+DATES = ["2024-01-01 08:00:00", "2024-01-01 17:30:00", "2024-01-02 08:00:00"]
+
+
+def test_same_day_measurements_are_kept(tmp_path: Path) -> None:
+    machine_dir = tmp_path / "0.05" / "1"
+    machine_dir.mkdir(parents=True)
+    # Only the last measurement is missing from the preprocessed file.
+    pd.DataFrame(
+        [
+            {**KEYS, "speed": "F2000", "date": date, "current_1": np.ones(4)}
+            for date in DATES[:2]
+        ]
+    ).to_pickle(machine_dir / "preprocessed_df.pkl")
+    reference_table = normalize_measurement_keys(
+        pd.DataFrame([{**KEYS, "speed": "F2000", "date": d} for d in DATES])
+    )
+
+    counts = count_preprocessed_rows("0.05", "1", app_data_path=tmp_path)
+    issues = pd.concat(
+        [
+            check_preprocessed_rows(reference_table, {"1": counts}),
+            check_reference_rows(reference_table),
+        ],
+        ignore_index=True,
+    )
+    assert issues[["date", "check"]].values.tolist() == [
+        [DATES[2], "missing_preprocessed_row"]
+    ]
+
+    save_integrity_report(issues, "0.05", app_data_path=tmp_path)
+    kept = drop_broken_rows(reference_table, "0.05", app_data_path=tmp_path)
+    assert kept["date"].tolist() == DATES[:2]
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils.quality import compute_quality
+
+DATES = ["2024-01-01 08:00:00", "2024-01-01 17:30:00"]
+KEYS = {"machine_id": 1, "measure_direction": "GL", "axis": "Y"}
+
+
+def test_same_day_measurements_get_own_quality_rows(tmp_path: Path) -> None:
+    machine_dir = tmp_path / "0.05" / "1"
+    machine_dir.mkdir(parents=True)
+    pd.DataFrame(
+        [
+            {
+                **KEYS,
+                "speed": "F2000",
+                "date": date,
+                "contour_deviation_1": np.arange(length, dtype=float),
+            }
+            for date, length in zip(DATES, [40, 60])
+        ]
+    ).to_pickle(machine_dir / "preprocessed_df.pkl")
+
+    quality = compute_quality("0.05", app_data_path=tmp_path)
+
+    assert quality[["date", "length"]].values.tolist() == [
+        [DATES[0], 40],
+        [DATES[1], 60],
+    ]
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils.trends import compute_machine_trends
+
+DATES = ["2024-01-01 08:00:00", "2024-01-01 17:30:00"]
+KEYS = {"machine_id": 1, "measure_direction": "GL", "axis": "Y"}
+
+
+def test_same_day_measurements_are_rolled_up(tmp_path: Path) -> None:
+    machine_dir = tmp_path / "0.05" / "1"
+    machine_dir.mkdir(parents=True)
+    pd.DataFrame(
+        [
+            {
+                **KEYS,
+                "speed": "F2000",
+                "date": date,
+                "current_1": np.full(50, level),
+            }
+            for date, level in zip(DATES, [1.0, 3.0])
+        ]
+    ).to_pickle(machine_dir / "preprocessed_df.pkl")
+
+    trends = compute_machine_trends("0.05", "1", app_data_path=tmp_path)
+
+    assert trends[["date", "mean"]].values.tolist() == [
+        [DATES[0], 1.0],
+        [DATES[1], 3.0],
+    ]
@@ -0,0 +1,121 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from src.utils.annotations import (
+    SAVE_PATH,
+    SLICE_VARS,
+    iter_annotation_files,
+    load_slice_annotations,
+)
+
+SUMMARY_INDEX_FILE_NAME = "summary_index.csv"
+CLASSES = ["normal", "edge_case", "anomaly"]
+SUMMARY_INDEX_VARS = [*SLICE_VARS, "machine_id"]
+SUMMARY_INDEX_COLUMNS = [*SUMMARY_INDEX_VARS, *CLASSES, "labeled"]
+
+
+def get_summary_index_file(save_path: Path = SAVE_PATH) -> Path:
+    return save_path / SUMMARY_INDEX_FILE_NAME
+
+
+def summarize_slice(
+    annotations: pd.DataFrame,
+    axis: str,
+    measure_direction: str,
+    speed: str,
+) -> pd.DataFrame:
+    annotations = annotations.reset_index()
+    annotations = annotations[annotations["class"].isin(CLASSES)]
+    if annotations.empty:
+        return pd.DataFrame(columns=SUMMARY_INDEX_COLUMNS)
+    counts = (
+        annotations.astype({"machine_id": str})
+        .groupby(["machine_id", "class"])
+        .size()
+        .unstack("class", fill_value=0)
+        .reindex(columns=CLASSES, fill_value=0)
+        .reset_index()
+    )
+    counts["labeled"] = counts[CLASSES].sum(axis=1)
+    counts = counts.assign(
+        axis=axis, measure_direction=measure_direction, speed=speed
+    )
+    return counts[SUMMARY_INDEX_COLUMNS]
+
+
+def _write_summary_index(summary_index: pd.DataFrame, save_path: Path) -> None:
+    index_file = get_summary_index_file(save_path)
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = index_file.with_suffix(".tmp")
+    summary_index.sort_values(SUMMARY_INDEX_VARS).to_csv(tmp_file, index=False)
+    os.replace(tmp_file, index_file)
+
+
+def rebuild_summary_index(save_path: Path = SAVE_PATH) -> pd.DataFrame:
+    slices = [
+        summarize_slice(
+            load_slice_annotations(
+                axis=axis,
+                measure_direction=measure_direction,
+                speed=speed,
+                save_path=save_path,
+            ),
+            axis=axis,
+            measure_direction=measure_direction,
+            speed=speed,
+        )
+        for axis, measure_direction, speed, _ in iter_annotation_files(
+            save_path
+        )
+    ]
+    summary_index = (
+        pd.concat(slices, ignore_index=True)
+        if len(slices) > 0
+        else pd.DataFrame(columns=SUMMARY_INDEX_COLUMNS)
+    )
+    _write_summary_index(summary_index, save_path)
+    return summary_index
+
+
+def load_summary_index(save_path: Path = SAVE_PATH) -> pd.DataFrame:
+    index_file = get_summary_index_file(save_path)
+    if not index_file.is_file():
+        return rebuild_summary_index(save_path)
+    return pd.read_csv(
+        index_file,
+        index_col=None,
+        dtype={var: str for var in SUMMARY_INDEX_VARS},
+    )
+
+
+def update_summary_index(
+    annotations: pd.DataFrame,
+    axis: str,
+    measure_direction: str,
+    speed: str,
+    save_path: Path = SAVE_PATH,
+) -> pd.DataFrame:
+    summary_index = load_summary_index(save_path)
+    summary_index = summary_index[
+        ~(
+            (summary_index["axis"] == axis)
+            & (summary_index["measure_direction"] == measure_direction)
+            & (summary_index["speed"] == speed)
+        )
+    ]
+    summary_index = pd.concat(
+        [
+            summary_index,
+            summarize_slice(
+                annotations,
+                axis=axis,
+                measure_direction=measure_direction,
+                speed=speed,
+            ),
+        ],
+        ignore_index=True,
+    )
+    _write_summary_index(summary_index, save_path)
+    return summary_index
@@ -0,0 +1,94 @@
+from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+
+SAVE_PATH = Path("artifacts/annotator_data/")
+ANNOTATIONS_FILE_NAME = "annotations.csv"
+ANNO_INDEX_VARS = ["machine_id", "date", "speed"]
+SLICE_VARS = ["axis", "measure_direction", "speed"]
+
+
+def get_annotation_file(
+    axis: str,
+    measure_direction: str,
+    speed: str,
+    save_path: Path = SAVE_PATH,
+) -> Path:
+    return save_path / axis / measure_direction / speed / ANNOTATIONS_FILE_NAME
+
+
+def iter_annotation_files(
+    save_path: Path = SAVE_PATH,
+) -> Iterator[tuple[str, str, str, Path]]:
+    for annotation_file in sorted(
+        save_path.glob(f"*/*/*/{ANNOTATIONS_FILE_NAME}")
+    ):
+        speed_dir = annotation_file.parent
+        yield (
+            speed_dir.parent.parent.name,
+            speed_dir.parent.name,
+            speed_dir.name,
+            annotation_file,
+        )
+
+
+def load_slice_annotations(
+    axis: str,
+    measure_direction: str,
+    speed: str,
+    save_path: Path = SAVE_PATH,
+) -> pd.DataFrame:
+    annotation_file = get_annotation_file(
+        axis=axis,
+        measure_direction=measure_direction,
+        speed=speed,
+        save_path=save_path,
+    )
+    if not annotation_file.is_file():
+        return pd.DataFrame(columns=[*ANNO_INDEX_VARS, "class"])
+    annotations = pd.read_csv(annotation_file, index_col=None)
+    return annotations[annotations["speed"] == speed]
+
+
+def lookup_slice_labels(
+    index: pd.MultiIndex,
+    axis: str,
+    measure_direction: str,
+    speed: str,
+    save_path: Path = SAVE_PATH,
+) -> pd.Series:  # type: ignore[type-arg]
+    # Labels of the rows of a slice table, in its order; NaN is unlabeled.
+    annotations = load_slice_annotations(
+        axis=axis,
+        measure_direction=measure_direction,
+        speed=speed,
+        save_path=save_path,
+    )
+    annotations = annotations.drop_duplicates(
+        subset=ANNO_INDEX_VARS, keep="last"
+    ).set_index(ANNO_INDEX_VARS)
+    return annotations["class"].reindex(index)
+
+
+def load_labeled_annotations(save_path: Path = SAVE_PATH) -> pd.DataFrame:
+    slices = []
+    for axis, measure_direction, speed, _ in iter_annotation_files(save_path):
+        annotations = load_slice_annotations(
+            axis=axis,
+            measure_direction=measure_direction,
+            speed=speed,
+            save_path=save_path,
+        )
+        annotations = annotations[annotations["class"].notna()]
+        slices.append(
+            annotations.assign(axis=axis, measure_direction=measure_direction)
+        )
+    if len(slices) == 0:
+        return pd.DataFrame(
+            columns=[*ANNO_INDEX_VARS, "axis", "measure_direction", "class"]
+        )
+    labeled = pd.concat(slices, ignore_index=True)
+    return labeled.drop_duplicates(
+        subset=[*ANNO_INDEX_VARS, "axis", "measure_direction"], keep="last"
+    )
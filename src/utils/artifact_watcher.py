@@ -0,0 +1,107 @@
+import threading
+from collections import deque
+from pathlib import Path
+
+ARTIFACTS_PATH = Path("artifacts/")
+WATCH_INTERVAL = 2.0
+WATCH_HISTORY = 1024
+WATCHED_PATTERNS = [
+    "app_data/*/reference_table.csv",
+    "app_data/*/integrity.csv",
+    "annotator_data/*/*/*/annotations.csv",
+    "annotator_data/*/*/*/spans.csv",
+    "annotator_data/summary_index.csv",
+    "scores/*/*.csv",
+    "quantile_statistics/*/*/*.csv",
+    "straburzynski_score.csv",
+    "anomalies_comparison.json",
+]
+
+Snapshot = dict[Path, tuple[int, int]]
+
+
+def take_snapshot(
+    root: Path = ARTIFACTS_PATH,
+    patterns: list[str] = WATCHED_PATTERNS,
+) -> Snapshot:
+    snapshot = {}
+    for pattern in patterns:
+        for path in root.glob(pattern):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> set[Path]:
+    return {
+        path
+        for path in old.keys() | new.keys()
+        if old.get(path) != new.get(path)
+    }
+
+
+class ArtifactWatcher:
+    """Polls the artifacts tree and numbers every batch of changed files.
+
+    Polling works on network filesystems, where inotify events do not
+    arrive, and costs a few hundred stat calls per interval.
+    """
+
+    def __init__(
+        self,
+        root: Path = ARTIFACTS_PATH,
+        patterns: list[str] = WATCHED_PATTERNS,
+        interval: float = WATCH_INTERVAL,
+    ) -> None:
+        self.root = root
+        self.patterns = patterns
+        self.interval = interval
+        self.generation = 0
+        self._snapshot = take_snapshot(root, patterns)
+        self._history: deque[tuple[int, set[Path]]] = deque(
+            maxlen=WATCH_HISTORY
+        )
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="artifact-watcher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.poll()
+
+    def poll(self) -> set[Path]:
+        snapshot = take_snapshot(self.root, self.patterns)
+        with self._lock:
+            changed = diff_snapshots(self._snapshot, snapshot)
+            self._snapshot = snapshot
+            if changed:
+                self.generation += 1
+                self._history.append((self.generation, changed))
+        return changed
+
+    def changes_since(self, generation: int) -> tuple[set[Path] | None, int]:
+        # None means the history no longer reaches back that far and the
+        # caller has to assume that everything changed.
+        with self._lock:
+            if generation == self.generation:
+                return set(), self.generation
+            if not self._history or self._history[0][0] > generation + 1:
+                return None, self.generation
+            changed: set[Path] = set()
+            for change_generation, paths in self._history:
+                if change_generation > generation:
+                    changed |= paths
+            return changed, self.generation
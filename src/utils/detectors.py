@@ -0,0 +1,90 @@
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+RESIDUALS_STD = 0.064
+QUANTILE_THRESHOLDS = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+STRABURZYNSKI_MAD_FACTOR = 3.0
+ROLLING_Z_WINDOW_FRAC = 0.05
+
+FloatArray = npt.NDArray[np.float64]
+
+
+def get_threshold_column(th: float) -> str:
+    return f"th_{float(th)}_percentage_over"
+
+
+def get_window_size(length: int, window_frac: float) -> int:
+    return max(int(round(length * window_frac)), 1)
+
+
+def compute_residuals(values: FloatArray, window_frac: float) -> FloatArray:
+    window = get_window_size(len(values), window_frac)
+    moving_average: FloatArray = (
+        pd.Series(values)
+        .rolling(window, center=True, min_periods=1)
+        .mean()
+        .to_numpy()
+    )
+    return values - moving_average
+
+
+def quantile_exceedance(
+    residuals: FloatArray,
+    residuals_std: float = RESIDUALS_STD,
+    thresholds: list[float] = QUANTILE_THRESHOLDS,
+) -> dict[str, float]:
+    abs_residuals = np.abs(residuals[np.isfinite(residuals)])
+    if len(abs_residuals) == 0:
+        return {get_threshold_column(th): np.nan for th in thresholds}
+    # One sort answers every threshold with a binary search.
+    abs_residuals.sort()
+    over = len(abs_residuals) - np.searchsorted(
+        abs_residuals, np.asarray(thresholds) * residuals_std, side="right"
+    )
+    return {
+        get_threshold_column(th): n / len(abs_residuals)
+        for th, n in zip(thresholds, over)
+    }
+
+
+def straburzynski_score(
+    residuals: FloatArray,
+    mad_factor: float = STRABURZYNSKI_MAD_FACTOR,
+) -> float:
+    residuals = residuals[np.isfinite(residuals)]
+    if len(residuals) == 0:
+        return np.nan
+    deviation = np.abs(residuals - np.median(residuals))
+    sigma = 1.4826 * np.median(deviation)
+    if sigma == 0:
+        return 0.0
+    return float(np.mean(deviation > mad_factor * sigma))
+
+
+def rolling_z_max(
+    values: FloatArray,
+    window_frac: float = ROLLING_Z_WINDOW_FRAC,
+) -> float:
+    series = pd.Series(values)
+    rolling = series.rolling(
+        get_window_size(len(values), window_frac), center=True, min_periods=2
+    )
+    z = (series - rolling.mean()) / rolling.std()
+    z = z.replace([np.inf, -np.inf], np.nan).abs()
+    return float(z.max()) if z.notna().any() else np.nan
+
+
+def score_series(
+    values: object,
+    window_frac: float,
+    residuals_std: float = RESIDUALS_STD,
+    thresholds: list[float] = QUANTILE_THRESHOLDS,
+) -> dict[str, dict[str, float]]:
+    array = np.asarray(values, dtype=np.float64).ravel()
+    residuals = compute_residuals(array, window_frac)
+    return {
+        "quantile": quantile_exceedance(residuals, residuals_std, thresholds),
+        "straburzynski": {"score": straburzynski_score(residuals)},
+        "rolling_z": {"max": rolling_z_max(array)},
+    }
@@ -0,0 +1,138 @@
+import threading
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from src.utils.measurement import APP_DATA_PATH, MEASUREMENT_KEY_VARS
+
+PYRAMID_FILE_NAME = "pyramid.npz"
+BASE_BUCKETS = 256
+LEVEL_FACTOR = 4
+
+FloatArray = npt.NDArray[np.float64]
+
+
+def get_pyramid_file(
+    machine_id: str,
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> Path:
+    return (
+        app_data_path
+        / mv_avg_window_size_frac
+        / str(machine_id)
+        / PYRAMID_FILE_NAME
+    )
+
+
+def get_level_buckets(length: int) -> list[int]:
+    # The finest level always reaches full resolution for deep zooms.
+    levels = [BASE_BUCKETS]
+    while levels[-1] < length:
+        levels.append(levels[-1] * LEVEL_FACTOR)
+    return levels
+
+
+def minmax_envelope(
+    values: FloatArray, buckets: int
+) -> tuple[FloatArray, FloatArray]:
+    edges = np.linspace(0, len(values), buckets + 1).astype(np.int64)[:-1]
+    return np.fmin.reduceat(values, edges), np.fmax.reduceat(values, edges)
+
+
+def get_tile_name(position: int, ts_name: str, level: int) -> str:
+    return f"{position}/{ts_name}/{level}"
+
+
+def build_pyramid(
+    series: pd.DataFrame,
+    time_series: list[str],
+) -> dict[str, Any]:
+    # Every series and level is its own npz member of stacked min and max
+    # rows, so drawing a measurement only decompresses the tile it shows.
+    series = series.reset_index()
+    arrays: dict[str, Any] = {
+        "keys": series[MEASUREMENT_KEY_VARS].to_numpy(dtype=str),
+        "time_series": np.array(time_series, dtype=str),
+    }
+    lengths = np.zeros((len(series), len(time_series)), dtype=np.int64)
+    for column, ts_name in enumerate(time_series):
+        for position, v in enumerate(series[ts_name]):
+            values = np.asarray(v, dtype=np.float64).ravel()
+            lengths[position, column] = len(values)
+            for level, buckets in enumerate(get_level_buckets(len(values))):
+                if buckets < len(values):
+                    v_min, v_max = minmax_envelope(values, buckets)
+                else:
+                    # The finest level of a series is its full resolution.
+                    v_min, v_max = values, values
+                arrays[get_tile_name(position, ts_name, level)] = np.stack(
+                    [v_min, v_max]
+                )
+    arrays["lengths"] = lengths
+    arrays["levels"] = np.array(
+        get_level_buckets(int(lengths.max(initial=0))), dtype=np.int64
+    )
+    return arrays
+
+
+class Pyramid:
+    """Lazily read min/max envelopes of one machine's series.
+
+    Tiles are decompressed from the npz archive when a view needs them and
+    are not kept, so a long-lived pyramid only holds its keys and lengths.
+    """
+
+    def __init__(self, pyramid_file: Path) -> None:
+        self._npz = np.load(pyramid_file)
+        self.levels: list[int] = self._npz["levels"].tolist()
+        self._positions = {
+            tuple(key): i for i, key in enumerate(self._npz["keys"].tolist())
+        }
+        self._columns = {
+            ts_name: i
+            for i, ts_name in enumerate(self._npz["time_series"].tolist())
+        }
+        self._lengths = self._npz["lengths"]
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: tuple[str, ...]) -> bool:
+        return key in self._positions
+
+    def length(self, key: tuple[str, ...], ts_name: str) -> int:
+        if ts_name not in self._columns:
+            return 0
+        return int(self._lengths[self._positions[key], self._columns[ts_name]])
+
+    def select_level(self, length: int, visible: int, width: int) -> int:
+        levels = get_level_buckets(length)
+        for level, buckets in enumerate(levels):
+            if min(buckets, length) * visible / max(length, 1) >= width:
+                return level
+        return len(levels) - 1
+
+    def envelope(
+        self,
+        key: tuple[str, ...],
+        ts_name: str,
+        start: int,
+        end: int,
+        width: int,
+    ) -> pd.DataFrame:
+        length = self.length(key, ts_name)
+        level = self.select_level(length, end - start, width)
+        with self._lock:
+            tile = self._npz[
+                get_tile_name(self._positions[key], ts_name, level)
+            ]
+        buckets = tile.shape[1]
+        first = start * buckets // max(length, 1)
+        last = -(-end * buckets // max(length, 1))
+        sample = np.arange(first, last) * length / max(buckets, 1)
+        return pd.DataFrame(
+            {"min": tile[0, first:last], "max": tile[1, first:last]},
+            index=pd.Index(sample.astype(np.int64), name="sample"),
+        )
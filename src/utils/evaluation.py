@@ -0,0 +1,208 @@
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from src.utils.measurement import (
+    MEASUREMENT_KEY_VARS,
+    normalize_measurement_keys,
+)
+from src.utils.scores import (
+    LEGACY_STRABURZYNSKI_PATH,
+    QUANTILE_FILE_NAME,
+    QUANTILE_STATISTICS_ROOT,
+    SCORE_COLUMNS,
+    SCORES_FILE_NAME,
+    SCORES_PATH,
+    get_scores_dir,
+    load_legacy_quantile_scores,
+    load_legacy_straburzynski_scores,
+    load_scores,
+)
+
+FEATURE_VARS = ["time_series", "detector", "feature"]
+
+
+def collect_scores(
+    mv_avg_window_size_frac: str,
+    scores_path: Path = SCORES_PATH,
+    quantile_statistics_root: Path = QUANTILE_STATISTICS_ROOT,
+    legacy_straburzynski_path: Path = LEGACY_STRABURZYNSKI_PATH,
+) -> pd.DataFrame:
+    scores = []
+    if (
+        get_scores_dir(mv_avg_window_size_frac, scores_path) / SCORES_FILE_NAME
+    ).is_file():
+        scores.append(load_scores(mv_avg_window_size_frac, scores_path))
+    for quantile_file in sorted(
+        quantile_statistics_root.glob(f"*/{mv_avg_window_size_frac}/*.csv")
+    ):
+        if quantile_file.name != QUANTILE_FILE_NAME:
+            scores.append(load_legacy_quantile_scores(quantile_file))
+    if legacy_straburzynski_path.is_file():
+        scores.append(
+            load_legacy_straburzynski_scores(legacy_straburzynski_path)
+        )
+    if len(scores) == 0:
+        return pd.DataFrame(columns=SCORE_COLUMNS)
+    return pd.concat(scores, ignore_index=True)
+
+
+def list_score_files(
+    mv_avg_window_size_frac: str,
+    scores_path: Path = SCORES_PATH,
+    quantile_statistics_root: Path = QUANTILE_STATISTICS_ROOT,
+    legacy_straburzynski_path: Path = LEGACY_STRABURZYNSKI_PATH,
+) -> list[Path]:
+    # The files collect_scores reads, for telling when scores changed.
+    score_files = [
+        get_scores_dir(mv_avg_window_size_frac, scores_path) / SCORES_FILE_NAME,
+        *(
+            quantile_file
+            for quantile_file in sorted(
+                quantile_statistics_root.glob(
+                    f"*/{mv_avg_window_size_frac}/*.csv"
+                )
+            )
+            if quantile_file.name != QUANTILE_FILE_NAME
+        ),
+        legacy_straburzynski_path,
+    ]
+    return [score_file for score_file in score_files if score_file.is_file()]
+
+
+def label_scores(
+    scores: pd.DataFrame,
+    labeled: pd.DataFrame,
+    include_edge_cases: bool = False,
+) -> pd.DataFrame:
+    labeled = normalize_measurement_keys(labeled)
+    positive_classes = ["anomaly"]
+    if include_edge_cases:
+        positive_classes.append("edge_case")
+    labeled = labeled[labeled["class"].isin([*positive_classes, "normal"])]
+    labeled = labeled.assign(is_anomaly=labeled["class"].isin(positive_classes))
+    return scores.merge(
+        labeled[[*MEASUREMENT_KEY_VARS, "is_anomaly"]],
+        on=MEASUREMENT_KEY_VARS,
+        how="inner",
+    )
+
+
+def threshold_curve(
+    scores: npt.NDArray[np.float64],
+    is_anomaly: npt.NDArray[np.bool_],
+) -> pd.DataFrame:
+    # A measurement is flagged when score >= threshold, so sorting scores in
+    # descending order turns every candidate threshold into a prefix.
+    valid = np.isfinite(scores)
+    scores, is_anomaly = scores[valid], is_anomaly[valid]
+    order = np.argsort(-scores, kind="stable")
+    scores, is_anomaly = scores[order], is_anomaly[order]
+    tp = np.cumsum(is_anomaly)
+    fp = np.cumsum(~is_anomaly)
+    # Keep the last position of every distinct score value.
+    last = np.empty(0, dtype=np.int64)
+    if len(scores) > 0:
+        last = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+    positives, negatives = int(is_anomaly.sum()), int((~is_anomaly).sum())
+    tp, fp = tp[last], fp[last]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = tp / (tp + fp)
+        recall = tp / positives if positives > 0 else np.full(len(tp), np.nan)
+        fpr = fp / negatives if negatives > 0 else np.full(len(fp), np.nan)
+        f1 = 2 * precision * recall / (precision + recall)
+    return pd.DataFrame(
+        {
+            "threshold": scores[last],
+            "tp": tp,
+            "fp": fp,
+            "fn": positives - tp,
+            "tn": negatives - fp,
+            "precision": precision,
+            "recall": recall,
+            "fpr": fpr,
+            "f1": f1,
+        }
+    )
+
+
+def roc_auc(curve: pd.DataFrame) -> float:
+    if curve.empty or curve["recall"].isna().all() or curve["fpr"].isna().all():
+        return np.nan
+    fpr = np.r_[0.0, curve["fpr"].to_numpy()]
+    tpr = np.r_[0.0, curve["recall"].to_numpy()]
+    return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+
+def evaluate_scores(
+    labeled_scores: pd.DataFrame,
+) -> tuple[pd.DataFrame, dict[tuple[str, str, str], pd.DataFrame]]:
+    summaries, curves = [], {}
+    for feature_key, feature_scores in labeled_scores.groupby(FEATURE_VARS):
+        curve = threshold_curve(
+            feature_scores["score"].to_numpy(dtype=np.float64),
+            feature_scores["is_anomaly"].to_numpy(dtype=bool),
+        )
+        curves[feature_key] = curve
+        best = curve["f1"].idxmax() if curve["f1"].notna().any() else None
+        summaries.append(
+            {
+                **dict(zip(FEATURE_VARS, feature_key)),
+                "measurements": len(feature_scores),
+                "anomalies": int(feature_scores["is_anomaly"].sum()),
+                "roc_auc": roc_auc(curve),
+                "best_threshold": (
+                    curve.at[best, "threshold"] if best is not None else np.nan
+                ),
+                "best_f1": curve.at[best, "f1"] if best is not None else np.nan,
+                "best_precision": (
+                    curve.at[best, "precision"] if best is not None else np.nan
+                ),
+                "best_recall": (
+                    curve.at[best, "recall"] if best is not None else np.nan
+                ),
+            }
+        )
+    summary = pd.DataFrame(summaries, columns=[*FEATURE_VARS, "measurements"])
+    if len(summaries) > 0:
+        summary = pd.DataFrame(summaries).sort_values(
+            "roc_auc", ascending=False
+        )
+    return summary, curves
+
+
+def to_report(
+    summary: pd.DataFrame,
+    curves: dict[tuple[str, str, str], pd.DataFrame],
+    **metadata: Any,
+) -> dict[str, Any]:
+    summary = summary.astype(object).where(summary.notna(), None)
+    return {
+        **metadata,
+        "features": [
+            {
+                **row,
+                "curve": curves[tuple(row[var] for var in FEATURE_VARS)]
+                .astype(object)
+                .where(lambda df: df.notna(), None)
+                .to_dict(orient="list"),
+            }
+            for row in summary.to_dict(orient="records")
+        ],
+    }
+
+
+def build_report(
+    mv_avg_window_size_frac: str,
+    labeled: pd.DataFrame,
+    include_edge_cases: bool = False,
+) -> tuple[pd.DataFrame, dict[tuple[str, str, str], pd.DataFrame]]:
+    labeled_scores = label_scores(
+        collect_scores(mv_avg_window_size_frac),
+        labeled,
+        include_edge_cases=include_edge_cases,
+    )
+    return evaluate_scores(labeled_scores)
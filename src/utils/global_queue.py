@@ -0,0 +1,166 @@
+import heapq
+from pathlib import Path
+from typing import Any, Iterator, cast
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.utils.annotations import SAVE_PATH, lookup_slice_labels
+from src.utils.measurement import (
+    APP_DATA_PATH,
+    MEASUREMENT_KEY_VARS,
+    normalize_measurement_keys,
+)
+from src.utils.reference_table import open_shared_slice_table
+from src.utils.shared_cache import unique_values
+
+QUEUE_ORDERS = ["machine", "date", "score"]
+
+# axis, measure_direction, speed
+Slice = tuple[str, str, str]
+# machine_id, date, speed as in the slice table index
+RowKey = tuple[Any, ...]
+QueueItem = tuple[tuple[Any, ...], Slice, RowKey]
+
+
+def list_slices(reference_table: pa.Table) -> list[Slice]:
+    slices = []
+    for axis in unique_values(reference_table, "axis"):
+        for measure_direction in unique_values(
+            reference_table, "measure_direction", axis=axis
+        ):
+            for speed in unique_values(
+                reference_table,
+                "speed",
+                axis=axis,
+                measure_direction=measure_direction,
+            ):
+                slices.append((axis, measure_direction, speed))
+    return slices
+
+
+def _slice_scores(
+    index: pd.MultiIndex,
+    slice_: Slice,
+    scores: pd.Series,  # type: ignore[type-arg]
+) -> pd.Series:  # type: ignore[type-arg]
+    axis, measure_direction, _ = slice_
+    keys = index.to_frame(index=False).astype(str)
+    keys = keys.assign(
+        date=keys["date"].str.slice(0, 10),
+        axis=axis,
+        measure_direction=measure_direction,
+    )
+    return scores.reindex(
+        pd.MultiIndex.from_frame(keys[MEASUREMENT_KEY_VARS])
+    ).reset_index(drop=True)
+
+
+def iter_slice_queue(
+    mv_avg_window_size_frac: str,
+    slice_: Slice,
+    order: str = "machine",
+    scores: pd.Series | None = None,  # type: ignore[type-arg]
+    app_data_path: Path = APP_DATA_PATH,
+    save_path: Path = SAVE_PATH,
+) -> Iterator[QueueItem]:
+    # Nothing is read until the first item is requested. The slice table is
+    # dropped once the unlabeled rows are sorted; only their keys and sort
+    # keys are kept while the queue is consumed.
+    axis, measure_direction, speed = slice_
+    index = cast(
+        pd.MultiIndex,
+        open_shared_slice_table(
+            mv_avg_window_size_frac,
+            axis=axis,
+            measure_direction=measure_direction,
+            speed=speed,
+            app_data_path=app_data_path,
+        ).index,
+    )
+    labels = lookup_slice_labels(
+        index,
+        axis=axis,
+        measure_direction=measure_direction,
+        speed=speed,
+        save_path=save_path,
+    )
+    positions = np.flatnonzero(labels.isna().to_numpy())
+    row_keys: list[RowKey] = index[positions].tolist()
+    machine_ids = index.get_level_values("machine_id")[positions].tolist()
+    dates = index.get_level_values("date")[positions].tolist()
+    priorities: list[tuple[Any, ...]]
+    if order == "machine":
+        priorities = list(zip(machine_ids, dates))
+    elif order == "date":
+        priorities = list(zip(dates, machine_ids))
+    elif order == "score":
+        if scores is None:
+            raise ValueError("Order 'score' needs scores")
+        # Highest score first; rows without a score come last.
+        slice_scores = _slice_scores(index, slice_, scores).to_numpy()
+        negated = np.nan_to_num(-slice_scores[positions], nan=np.inf)
+        priorities = list(zip(negated.tolist(), machine_ids, dates))
+    else:
+        raise ValueError(f"Unknown queue order: {order}")
+    del index, labels, positions
+    for i in sorted(range(len(row_keys)), key=priorities.__getitem__):
+        yield priorities[i], slice_, row_keys[i]
+
+
+def merge_slice_queues(
+    mv_avg_window_size_frac: str,
+    slices: list[Slice],
+    order: str = "machine",
+    scores: pd.Series | None = None,  # type: ignore[type-arg]
+    app_data_path: Path = APP_DATA_PATH,
+    save_path: Path = SAVE_PATH,
+) -> Iterator[tuple[Slice, RowKey]]:
+    # k-way merge of the per-slice queues: every slice is sorted on its
+    # own and the heap only ever holds one pending row per slice. Rows are
+    # named by key, so a reloaded slice table still resolves them.
+    merged = heapq.merge(
+        *(
+            iter_slice_queue(
+                mv_avg_window_size_frac,
+                slice_,
+                order,
+                scores,
+                app_data_path,
+                save_path,
+            )
+            for slice_ in slices
+        )
+    )
+    for _, slice_, row_key in merged:
+        yield slice_, row_key
+
+
+def find_row_position(index: pd.MultiIndex, row_key: RowKey) -> int | None:
+    # First row with this key, or None once it left the slice table.
+    try:
+        location = index.get_loc(row_key)
+    except KeyError:
+        return None
+    if isinstance(location, slice):
+        return int(location.start or 0)
+    if isinstance(location, np.ndarray):
+        return int(np.flatnonzero(location)[0])
+    return int(location)
+
+
+def score_priorities(
+    scores: pd.DataFrame,
+    detector: str,
+    time_series: str,
+    feature: str,
+) -> pd.Series:  # type: ignore[type-arg]
+    selected = normalize_measurement_keys(
+        scores[
+            (scores["detector"] == detector)
+            & (scores["time_series"] == time_series)
+            & (scores["feature"] == feature)
+        ]
+    )
+    return selected.groupby(MEASUREMENT_KEY_VARS)["score"].max()
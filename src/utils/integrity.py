@@ -0,0 +1,238 @@
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from src.utils.evaluation import collect_scores
+from src.utils.measurement import (
+    APP_DATA_PATH,
+    MEASUREMENT_KEY_VARS,
+    TIME_SERIES,
+    get_preprocessed_file,
+    normalize_measurement_keys,
+    read_preprocessed_file,
+)
+from src.utils.plot_store import get_plot_key
+
+INTEGRITY_FILE_NAME = "integrity.csv"
+INTEGRITY_COLUMNS = [*MEASUREMENT_KEY_VARS, "check", "detail"]
+# Reference rows failing these checks cannot be shown, so the pages hide
+# them. The other checks are only reported.
+HIDDEN_CHECKS = [
+    "missing_plot",
+    "missing_preprocessed_file",
+    "missing_preprocessed_row",
+    "duplicated_preprocessed_row",
+]
+REPORTED_CHECKS = [
+    "duplicated_reference_row",
+    "unscored",
+    "orphan_score",
+]
+MAX_LISTING_WORKERS = 32
+
+BoolArray = npt.NDArray[np.bool_]
+
+
+def get_integrity_file(
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> Path:
+    return app_data_path / mv_avg_window_size_frac / INTEGRITY_FILE_NAME
+
+
+def _issues(
+    keys: pd.DataFrame,
+    check: str,
+    detail: object = "",
+) -> pd.DataFrame:
+    return keys[MEASUREMENT_KEY_VARS].assign(check=check, detail=detail)
+
+
+def _isin(keys: pd.DataFrame, other: pd.DataFrame) -> BoolArray:
+    return pd.MultiIndex.from_frame(keys[MEASUREMENT_KEY_VARS]).isin(
+        pd.MultiIndex.from_frame(other[MEASUREMENT_KEY_VARS])
+    )
+
+
+def _list_files(directory: str) -> set[str] | None:
+    # One directory read answers the existence of all its plots; on most
+    # file systems the entry types come with the listing, without a stat.
+    try:
+        with os.scandir(directory or ".") as entries:
+            return {entry.name for entry in entries if entry.is_file()}
+    except OSError:
+        return None
+
+
+def find_missing_files(
+    paths: pd.Series,  # type: ignore[type-arg]
+    packed_keys: set[str],
+    max_workers: int = MAX_LISTING_WORKERS,
+) -> BoolArray:
+    # Plots in the plot store count as present even when their HTML file
+    # was removed.
+    paths = paths.fillna("").astype(str)
+    missing = np.ones(len(paths), dtype=bool)
+    present = paths.ne("").to_numpy()
+    if packed_keys:
+        packed = paths.map(get_plot_key).isin(packed_keys).to_numpy()
+        missing[packed] = False
+        present &= ~packed
+    directories = paths[present].map(os.path.dirname)
+    names = paths[present].map(os.path.basename)
+    unique_directories = directories.unique()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        listings = dict(
+            zip(
+                unique_directories,
+                executor.map(_list_files, unique_directories),
+            )
+        )
+    missing[present] = [
+        listing is None or name not in listing
+        for listing, name in zip(directories.map(listings), names)
+    ]
+    return missing
+
+
+def check_plots(
+    reference_table: pd.DataFrame,
+    packed_keys: set[str],
+    max_workers: int = MAX_LISTING_WORKERS,
+) -> pd.DataFrame:
+    time_series = [
+        ts_name for ts_name in TIME_SERIES if ts_name in reference_table
+    ]
+    plot_files = reference_table.melt(
+        id_vars=MEASUREMENT_KEY_VARS,
+        value_vars=time_series,
+        var_name="detail",
+        value_name="plot_file",
+    )
+    unique_files = plot_files["plot_file"].drop_duplicates()
+    missing_files = unique_files[
+        find_missing_files(unique_files, packed_keys, max_workers)
+    ]
+    missing = plot_files[
+        plot_files["plot_file"].isin(missing_files)
+        | plot_files["plot_file"].isna()
+    ]
+    return _issues(missing, "missing_plot", missing["detail"])
+
+
+def count_preprocessed_rows(
+    mv_avg_window_size_frac: str,
+    machine_id: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> pd.DataFrame | None:
+    preprocessed_file = get_preprocessed_file(
+        machine_id, mv_avg_window_size_frac, app_data_path
+    )
+    if not preprocessed_file.is_file():
+        return None
+    keys = normalize_measurement_keys(
+        read_preprocessed_file(preprocessed_file, columns=MEASUREMENT_KEY_VARS)
+    )
+    return keys.value_counts().rename("count").reset_index()
+
+
+def check_preprocessed_rows(
+    reference_table: pd.DataFrame,
+    machine_counts: dict[str, pd.DataFrame | None],
+) -> pd.DataFrame:
+    # Every reference row must resolve to exactly one preprocessed row, as
+    # loading a single measurement requires.
+    issues = []
+    for machine_id, counts in machine_counts.items():
+        keys = reference_table[reference_table["machine_id"] == machine_id]
+        if counts is None:
+            issues.append(_issues(keys, "missing_preprocessed_file"))
+            continue
+        matched = keys[MEASUREMENT_KEY_VARS].merge(
+            counts, on=MEASUREMENT_KEY_VARS, how="left"
+        )
+        missing = matched[matched["count"].isna()]
+        issues.append(_issues(missing, "missing_preprocessed_row"))
+        duplicated = matched[matched["count"] > 1]
+        issues.append(
+            _issues(
+                duplicated,
+                "duplicated_preprocessed_row",
+                duplicated["count"].astype(int),
+            )
+        )
+    if len(issues) == 0:
+        return pd.DataFrame(columns=INTEGRITY_COLUMNS)
+    return pd.concat(issues, ignore_index=True)
+
+
+def check_reference_rows(reference_table: pd.DataFrame) -> pd.DataFrame:
+    duplicated = reference_table[
+        reference_table.duplicated(subset=MEASUREMENT_KEY_VARS, keep="first")
+    ]
+    return _issues(duplicated, "duplicated_reference_row")
+
+
+def check_scores(
+    mv_avg_window_size_frac: str,
+    reference_table: pd.DataFrame,
+) -> pd.DataFrame:
+    scores = collect_scores(mv_avg_window_size_frac)
+    if scores.empty:
+        return pd.DataFrame(columns=INTEGRITY_COLUMNS)
+    score_keys = normalize_measurement_keys(
+        scores[MEASUREMENT_KEY_VARS]
+    ).drop_duplicates()
+    reference_keys = reference_table[MEASUREMENT_KEY_VARS].drop_duplicates()
+    return pd.concat(
+        [
+            _issues(
+                reference_keys[~_isin(reference_keys, score_keys)], "unscored"
+            ),
+            _issues(
+                score_keys[~_isin(score_keys, reference_keys)], "orphan_score"
+            ),
+        ],
+        ignore_index=True,
+    )
+
+
+def save_integrity_report(
+    issues: pd.DataFrame,
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> Path:
+    integrity_file = get_integrity_file(mv_avg_window_size_frac, app_data_path)
+    tmp_file = integrity_file.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    issues[INTEGRITY_COLUMNS].to_csv(tmp_file, index=False)
+    os.replace(tmp_file, integrity_file)
+    return integrity_file
+
+
+def load_hidden_keys(
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> pd.DataFrame:
+    integrity_file = get_integrity_file(mv_avg_window_size_frac, app_data_path)
+    if not integrity_file.is_file():
+        return pd.DataFrame(columns=MEASUREMENT_KEY_VARS)
+    issues = pd.read_csv(integrity_file, index_col=None, dtype=str)
+    hidden = issues[issues["check"].isin(HIDDEN_CHECKS)]
+    return hidden[MEASUREMENT_KEY_VARS].drop_duplicates()
+
+
+def drop_broken_rows(
+    table: pd.DataFrame,
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> pd.DataFrame:
+    hidden = load_hidden_keys(mv_avg_window_size_frac, app_data_path)
+    if hidden.empty or table.empty:
+        return table
+    keys = normalize_measurement_keys(table[MEASUREMENT_KEY_VARS])
+    return table[~_isin(keys, hidden)]
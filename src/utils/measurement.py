@@ -1,12 +1,36 @@
 import json
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Literal
+from typing import Any, Iterator, Literal
 
 import pandas as pd
 
+from src.utils.series_store import SERIES_STORE_FILE_NAME, read_series_store
 
-@dataclass
+APP_DATA_PATH = Path("artifacts/app_data/")
+PREPROCESSED_FILE_NAME = "preprocessed_df.pkl"
+MEASUREMENT_KEY_VARS = [
+    "machine_id",
+    "measure_direction",
+    "axis",
+    "speed",
+    "date",
+]
+TIME_SERIES = [
+    "contour_deviation_1",
+    "contour_deviation_2",
+    "current_1",
+    "current_2",
+]
+
+
+# A top-level value crossing a chunk boundary is decoded again once the
+# next chunk was read, so chunks are kept much larger than one machine.
+JSON_CHUNK_SIZE = 1 << 24
+
+
+@dataclass(frozen=True, slots=True)
 class Measurement:
     machine_id: str
     date: str
@@ -14,49 +38,210 @@ class Measurement:
     axis: str
     measure_direction: str
 
+    def __post_init__(self) -> None:
+        # Key values repeat across millions of entries, so share one string
+        # object per distinct value.
+        for var in MEASUREMENT_KEY_VARS:
+            object.__setattr__(self, var, sys.intern(str(getattr(self, var))))
 
-def load_references_file(
+    def __reduce__(self) -> tuple[type["Measurement"], tuple[str, ...]]:
+        # Frozen slotted dataclasses do not unpickle on Python 3.10.
+        return (
+            Measurement,
+            (
+                self.machine_id,
+                self.date,
+                self.speed,
+                self.axis,
+                self.measure_direction,
+            ),
+        )
+
+
+@dataclass
+class ResolvedMeasurements:
+    rows: pd.DataFrame
+    missing: list[Measurement] = field(default_factory=list)
+    duplicated: list[Measurement] = field(default_factory=list)
+
+
+def _parse_measurement(m: dict[str, Any]) -> Measurement:
+    return Measurement(
+        machine_id=m["machine_id"],
+        date=m["date"],
+        speed=m["speed"],
+        axis=m["axis"],
+        measure_direction=m["measure_direction"],
+    )
+
+
+def iter_references_file(
     json_file: Path,
-) -> dict[str, dict[Literal["normal", "anomalies"], list[Measurement]]]:
+    chunk_size: int = JSON_CHUNK_SIZE,
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    decoder = json.JSONDecoder()
     with open(json_file) as f:
-        data = json.load(f)
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def next_token() -> str:
+            nonlocal buffer, pos, eof
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                if eof:
+                    raise ValueError(f"Unexpected end of file: {json_file}")
+                buffer, pos = f.read(chunk_size), 0
+                eof = len(buffer) == 0
 
+        def decode_value(delimiters: str) -> Any:
+            nonlocal buffer, pos, eof
+            next_token()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # A value is complete once the delimiter after it was
+                    # read; until then a number may continue in the next
+                    # chunk.
+                    stop = end
+                    while stop < len(buffer) and buffer[stop].isspace():
+                        stop += 1
+                    if eof or (
+                        stop < len(buffer) and buffer[stop] in delimiters
+                    ):
+                        pos = end
+                        return value
+                chunk = f.read(max(chunk_size, len(buffer) - pos))
+                eof = len(chunk) == 0
+                buffer, pos = buffer[pos:] + chunk, 0
+
+        if next_token() != "{":
+            raise ValueError(f"Expected a JSON object in {json_file}")
+        pos += 1
+        if next_token() == "}":
+            return
+        while True:
+            key = decode_value(":")
+            if next_token() != ":":
+                raise ValueError(f"Malformed JSON object in {json_file}")
+            pos += 1
+            yield key, decode_value(",}")
+            token = next_token()
+            pos += 1
+            if token == "}":
+                return
+            if token != ",":
+                raise ValueError(f"Malformed JSON object in {json_file}")
+
+
+def load_references_file(
+    json_file: Path,
+) -> dict[str, dict[Literal["normal", "anomalies"], list[Measurement]]]:
     measurements_dict: dict[
         str, dict[Literal["normal", "anomalies"], list[Measurement]]
     ] = {}
-    for machine_id, measurements in data.items():
+    for machine_id, measurements in iter_references_file(json_file):
         measurements_dict[machine_id] = {
-            "normal": [
-                Measurement(
-                    machine_id=m["machine_id"],
-                    date=m["date"],
-                    speed=m["speed"],
-                    axis=m["axis"],
-                    measure_direction=m["measure_direction"],
-                )
-                for m in measurements["normal"]
-            ],
+            "normal": [_parse_measurement(m) for m in measurements["normal"]],
             "anomalies": [
-                Measurement(
-                    machine_id=m["machine_id"],
-                    date=m["date"],
-                    speed=m["speed"],
-                    axis=m["axis"],
-                    measure_direction=m["measure_direction"],
-                )
-                for m in measurements["anomalies"]
+                _parse_measurement(m) for m in measurements["anomalies"]
             ],
         }
 
     return measurements_dict
 
 
+def get_preprocessed_file(
+    machine_id: str,
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> Path:
+    machine_dir = app_data_path / mv_avg_window_size_frac / str(machine_id)
+    pickle_file = machine_dir / PREPROCESSED_FILE_NAME
+    store_file = machine_dir / SERIES_STORE_FILE_NAME
+    # The compressed store is used unless the pickle was rewritten after
+    # the conversion.
+    if store_file.is_file() and (
+        not pickle_file.is_file()
+        or store_file.stat().st_mtime >= pickle_file.stat().st_mtime
+    ):
+        return store_file
+    return pickle_file
+
+
+def read_preprocessed_file(
+    preprocessed_file: Path,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    if preprocessed_file.name == SERIES_STORE_FILE_NAME:
+        return read_series_store(preprocessed_file, columns)
+    df: pd.DataFrame = pd.read_pickle(preprocessed_file)
+    if columns is None:
+        return df
+    return df[[column for column in columns if column in df.columns]]
+
+
+def normalize_measurement_keys(df: pd.DataFrame) -> pd.DataFrame:
+    # Keys as written in the reference table; the time of day is kept, so
+    # measurements of the same day stay apart.
+    return df.astype({var: str for var in MEASUREMENT_KEY_VARS})
+
+
+def truncate_measurement_dates(df: pd.DataFrame) -> pd.DataFrame:
+    # The reference JSON names measurements by day only.
+    df = normalize_measurement_keys(df)
+    df["date"] = df["date"].str.slice(0, 10)
+    return df
+
+
+def measurements_to_frame(measurements: list[Measurement]) -> pd.DataFrame:
+    return pd.DataFrame.from_records(
+        [
+            tuple(getattr(m, var) for var in MEASUREMENT_KEY_VARS)
+            for m in measurements
+        ],
+        columns=MEASUREMENT_KEY_VARS,
+    )
+
+
+def resolve_measurements(
+    reference_table: pd.DataFrame,
+    measurements: list[Measurement],
+) -> ResolvedMeasurements:
+    if len(measurements) == 0:
+        return ResolvedMeasurements(rows=reference_table.iloc[0:0])
+    keys = truncate_measurement_dates(measurements_to_frame(measurements))
+    keys["_position"] = range(len(keys))
+    matched = keys.merge(
+        reference_table, on=MEASUREMENT_KEY_VARS, how="left", indicator=True
+    )
+    missing_mask = matched["_merge"] == "left_only"
+    match_counts = matched.loc[~missing_mask, "_position"].value_counts()
+    rows = matched[~missing_mask].drop(columns=["_position", "_merge"])
+    return ResolvedMeasurements(
+        rows=rows.reset_index(drop=True),
+        missing=[
+            measurements[i] for i in matched.loc[missing_mask, "_position"]
+        ],
+        duplicated=[
+            measurements[i]
+            for i in sorted(match_counts[match_counts > 1].index)
+        ],
+    )
+
+
 def _load_measurement(
     measurement: Measurement, mv_avg_window_size: float = 0.05
 ) -> pd.DataFrame:
-    df: pd.DataFrame = pd.read_pickle(
-        f"artifacts/app_data/{mv_avg_window_size}/{measurement.machine_id}/"
-        "preprocessed_df.pkl",
+    df = read_preprocessed_file(
+        get_preprocessed_file(measurement.machine_id, str(mv_avg_window_size))
     )
     df = df[
         (df["machine_id"] == int(measurement.machine_id))
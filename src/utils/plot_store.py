@@ -0,0 +1,230 @@
+import hashlib
+import os
+import re
+import threading
+import uuid
+import zlib
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO, Callable
+
+import pandas as pd
+
+PLOT_STORE_PATH = Path("artifacts/plot_store/")
+PLOT_INDEX_FILE_NAME = "index.csv"
+BLOB_DIR_NAME = "blobs"
+PACK_FILE_NAME = "pack-{:05d}.bin"
+PLOT_INDEX_COLUMNS = ["key", "pack", "offset", "length", "zdict"]
+SHARED_SCRIPT_MIN_SIZE = 16 * 1024
+PACK_MAX_SIZE = 512 * 1024 * 1024
+ZDICT_SIZE = 32 * 1024
+BLOB_CACHE_ENTRIES = 16
+
+_SCRIPT_PATTERN = re.compile(
+    r"(<script[^>]*>)(.*?)(</script>)", re.DOTALL | re.IGNORECASE
+)
+_PLACEHOLDER_PATTERN = re.compile(r"<!--plot-store:([0-9a-f]{64})-->")
+
+
+def get_plot_key(plot_file: str | Path) -> str:
+    return Path(plot_file).as_posix()
+
+
+def split_html(
+    html: str,
+    is_shared: Callable[[str], bool],
+    min_size: int = SHARED_SCRIPT_MIN_SIZE,
+) -> tuple[str, dict[str, str]]:
+    # Large inline scripts that other pages contain too (the embedded
+    # plotting library) are replaced by a placeholder naming their digest;
+    # the others stay in the page.
+    shared: dict[str, str] = {}
+
+    def replace(match: re.Match[str]) -> str:
+        body = match.group(2)
+        if len(body) < min_size:
+            return match.group(0)
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        if not is_shared(digest):
+            return match.group(0)
+        shared[digest] = body
+        return f"{match.group(1)}<!--plot-store:{digest}-->{match.group(3)}"
+
+    return _SCRIPT_PATTERN.sub(replace, html), shared
+
+
+def join_html(template: str, get_blob: Callable[[str], str]) -> str:
+    return _PLACEHOLDER_PATTERN.sub(lambda m: get_blob(m.group(1)), template)
+
+
+def _write_atomic(target: Path, data: bytes) -> None:
+    tmp_file = target.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    tmp_file.write_bytes(data)
+    os.replace(tmp_file, target)
+
+
+def load_plot_index(store_path: Path = PLOT_STORE_PATH) -> pd.DataFrame:
+    index_file = store_path / PLOT_INDEX_FILE_NAME
+    if not index_file.is_file():
+        return pd.DataFrame(columns=PLOT_INDEX_COLUMNS)
+    return pd.read_csv(
+        index_file,
+        index_col=None,
+        dtype={"key": str, "pack": str, "zdict": str},
+    )
+
+
+class PlotStoreWriter:
+    """Appends pages to new pack files; existing packs are never modified."""
+
+    def __init__(
+        self,
+        store_path: Path = PLOT_STORE_PATH,
+        pack_max_size: int = PACK_MAX_SIZE,
+    ) -> None:
+        self.store_path = store_path
+        self.pack_max_size = pack_max_size
+        (store_path / BLOB_DIR_NAME).mkdir(parents=True, exist_ok=True)
+        self._index = load_plot_index(store_path)
+        self._rows: list[dict[str, object]] = []
+        self._pack_id = len(list(store_path.glob("pack-*.bin")))
+        self._pack: BinaryIO | None = None
+        self._pack_name = ""
+        self._zdict = b""
+        self._zdict_digest = ""
+        # Scripts become blobs once a second page contains them; existing
+        # blobs are reused.
+        self._shared = {
+            blob_file.name
+            for blob_file in (store_path / BLOB_DIR_NAME).iterdir()
+        }
+        self._seen: set[str] = set()
+
+    def __enter__(self) -> "PlotStoreWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    @property
+    def keys(self) -> set[str]:
+        return set(self._index["key"]) | {str(row["key"]) for row in self._rows}
+
+    def _put_blob(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        blob_file = self.store_path / BLOB_DIR_NAME / digest
+        if not blob_file.is_file():
+            _write_atomic(blob_file, data)
+        return digest
+
+    def _is_shared(self, digest: str) -> bool:
+        if digest in self._seen:
+            self._shared.add(digest)
+        self._seen.add(digest)
+        return digest in self._shared
+
+    def _open_pack(self) -> BinaryIO:
+        if self._pack is not None and self._pack.tell() < self.pack_max_size:
+            return self._pack
+        if self._pack is not None:
+            self._pack.close()
+        while True:
+            self._pack_name = PACK_FILE_NAME.format(self._pack_id)
+            self._pack_id += 1
+            if not (self.store_path / self._pack_name).exists():
+                break
+        self._pack = open(self.store_path / self._pack_name, "wb")
+        return self._pack
+
+    def add(self, key: str, html: str) -> None:
+        template, shared = split_html(html, self._is_shared)
+        for body in shared.values():
+            self._put_blob(body.encode("utf-8"))
+        data = template.encode("utf-8")
+        if not self._zdict_digest:
+            # The layout boilerplate repeats between pages; the first page
+            # with all its large scripts taken out serves as preset
+            # dictionary for all of them. The library is only a blob from
+            # its second page on and would otherwise fill the dictionary.
+            layout, _ = split_html(html, lambda digest: True)
+            self._zdict = layout.encode("utf-8")[:ZDICT_SIZE]
+            self._zdict_digest = self._put_blob(self._zdict)
+        compressor = zlib.compressobj(level=9, zdict=self._zdict)
+        compressed = compressor.compress(data) + compressor.flush()
+        pack = self._open_pack()
+        self._rows.append(
+            {
+                "key": key,
+                "pack": self._pack_name,
+                "offset": pack.tell(),
+                "length": len(compressed),
+                "zdict": self._zdict_digest,
+            }
+        )
+        pack.write(compressed)
+
+    def close(self) -> None:
+        if self._pack is not None:
+            self._pack.close()
+            self._pack = None
+        if not self._rows:
+            return
+        index = pd.concat(
+            [self._index, pd.DataFrame(self._rows, columns=PLOT_INDEX_COLUMNS)]
+        ).drop_duplicates(subset="key", keep="last")
+        tmp_file = self.store_path / f"{PLOT_INDEX_FILE_NAME}.tmp"
+        index.to_csv(tmp_file, index=False)
+        os.replace(tmp_file, self.store_path / PLOT_INDEX_FILE_NAME)
+        self._index = index
+        self._rows = []
+
+
+class PlotStore:
+    """Reassembles pages from pack files and content-addressed blobs."""
+
+    def __init__(self, store_path: Path = PLOT_STORE_PATH) -> None:
+        self.store_path = store_path
+        index = load_plot_index(store_path)
+        self._entries = {
+            key: (pack, int(offset), int(length), zdict)
+            for key, pack, offset, length, zdict in index[
+                PLOT_INDEX_COLUMNS
+            ].itertuples(index=False)
+        }
+        self._blobs: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _blob(self, digest: str) -> bytes:
+        # Blobs are shared by many pages; the most recently used ones stay
+        # in memory, oldest first in the dict.
+        with self._lock:
+            blob = self._blobs.pop(digest, None)
+            if blob is None:
+                blob = (self.store_path / BLOB_DIR_NAME / digest).read_bytes()
+            self._blobs[digest] = blob
+            if len(self._blobs) > BLOB_CACHE_ENTRIES:
+                del self._blobs[next(iter(self._blobs))]
+            return blob
+
+    def read(self, key: str) -> str:
+        pack, offset, length, zdict = self._entries[key]
+        with open(self.store_path / pack, "rb") as f:
+            f.seek(offset)
+            compressed = f.read(length)
+        decompressor = zlib.decompressobj(zdict=self._blob(zdict))
+        template = decompressor.decompress(compressed) + decompressor.flush()
+        return join_html(
+            template.decode("utf-8"),
+            lambda digest: self._blob(digest).decode("utf-8"),
+        )
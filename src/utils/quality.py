@@ -0,0 +1,193 @@
+import warnings
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from src.utils.detectors import get_window_size
+from src.utils.measurement import (
+    APP_DATA_PATH,
+    MEASUREMENT_KEY_VARS,
+    TIME_SERIES,
+    get_preprocessed_file,
+)
+from src.utils.reference_table import load_machine_series
+
+QUALITY_FILE_NAME = "quality.csv"
+QUALITY_COLUMNS = [
+    "length",
+    "nan_fraction",
+    "flatline_fraction",
+    "peak_residual",
+    "contour_rms",
+    "current_correlation",
+]
+CONTOUR_SERIES = "contour_deviation_1"
+CURRENT_SERIES = ("current_1", "current_2")
+
+FloatArray = npt.NDArray[np.float64]
+
+
+def get_quality_file(
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> Path:
+    return app_data_path / mv_avg_window_size_frac / QUALITY_FILE_NAME
+
+
+def series_lengths(
+    values: pd.Series,  # type: ignore[type-arg]
+) -> pd.Series:  # type: ignore[type-arg]
+    # Any array-like cell counts its samples; scalars (NaN for a missing
+    # series) have none.
+    return values.map(lambda v: int(np.size(v)) if np.ndim(v) > 0 else 0)
+
+
+def iter_length_groups(
+    series: pd.DataFrame,
+    lengths: pd.Series,  # type: ignore[type-arg]
+) -> Iterator[tuple[int, pd.DataFrame]]:
+    # Rows of equal length are stacked into one matrix, so every metric is
+    # a handful of numpy calls per group instead of a loop over rows.
+    for length, group in series.groupby(lengths, sort=False):
+        if length > 0:
+            yield int(length), group
+
+
+def stack_series(
+    values: pd.Series,  # type: ignore[type-arg]
+    length: int,
+) -> FloatArray:
+    stacked = np.full((len(values), length), np.nan)
+    for i, v in enumerate(values):
+        if np.ndim(v) > 0:
+            v = np.asarray(v, dtype=np.float64).ravel()[:length]
+            stacked[i, : len(v)] = v
+    return stacked
+
+
+def centered_moving_average(values: FloatArray, window: int) -> FloatArray:
+    # Row-wise equivalent of rolling(window, center=True, min_periods=1)
+    # that skips NaNs, computed from cumulative sums.
+    finite = np.isfinite(values)
+    sums = np.cumsum(np.where(finite, values, 0.0), axis=1)
+    counts = np.cumsum(finite, axis=1)
+    sums = np.pad(sums, ((0, 0), (1, 0)))
+    counts = np.pad(counts, ((0, 0), (1, 0)))
+    positions = np.arange(values.shape[1])
+    start = np.clip(positions - window // 2, 0, values.shape[1])
+    end = np.clip(positions + (window - 1) // 2 + 1, 0, values.shape[1])
+    window_counts = counts[:, end] - counts[:, start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averages: FloatArray = (sums[:, end] - sums[:, start]) / window_counts
+    return averages
+
+
+def _nan_fraction(values: FloatArray) -> FloatArray:
+    fractions: FloatArray = np.mean(np.isnan(values), axis=1)
+    return fractions
+
+
+def _flatline_fraction(values: FloatArray) -> FloatArray:
+    steps = np.diff(values, axis=1)
+    flat = np.sum(steps == 0, axis=1)
+    valid = np.sum(np.isfinite(steps), axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fractions: FloatArray = flat / valid
+    return fractions
+
+
+def _correlation(a: FloatArray, b: FloatArray) -> FloatArray:
+    valid = np.isfinite(a) & np.isfinite(b)
+    n = valid.sum(axis=1)
+    a = np.where(valid, a, 0.0)
+    b = np.where(valid, b, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        a = np.where(valid, a - (a.sum(axis=1) / n)[:, None], 0.0)
+        b = np.where(valid, b - (b.sum(axis=1) / n)[:, None], 0.0)
+        correlations: FloatArray = (a * b).sum(axis=1) / np.sqrt(
+            (a * a).sum(axis=1) * (b * b).sum(axis=1)
+        )
+    return correlations
+
+
+def quality_metrics(
+    series: pd.DataFrame,
+    window_frac: float,
+) -> pd.DataFrame:
+    lengths = series_lengths(series[CONTOUR_SERIES])
+    metrics = pd.DataFrame(index=series.index, columns=QUALITY_COLUMNS)
+    metrics["length"] = lengths
+    for length, group in iter_length_groups(series, lengths):
+        matrices = {
+            ts_name: stack_series(group[ts_name], length)
+            for ts_name in TIME_SERIES
+            if ts_name in group.columns
+        }
+        contour = matrices[CONTOUR_SERIES]
+        residuals = contour - centered_moving_average(
+            contour, get_window_size(length, window_frac)
+        )
+        # Rows without any valid sample give NaN metrics, not warnings.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            group_metrics = {
+                "nan_fraction": np.max(
+                    [_nan_fraction(m) for m in matrices.values()], axis=0
+                ),
+                "flatline_fraction": np.nanmax(
+                    [_flatline_fraction(m) for m in matrices.values()], axis=0
+                ),
+                "peak_residual": np.nanmax(np.abs(residuals), axis=1),
+                "contour_rms": np.sqrt(np.nanmean(contour**2, axis=1)),
+            }
+        if all(ts_name in matrices for ts_name in CURRENT_SERIES):
+            group_metrics["current_correlation"] = _correlation(
+                *(matrices[ts_name] for ts_name in CURRENT_SERIES)
+            )
+        for column, values in group_metrics.items():
+            metrics.loc[group.index, column] = values
+    return metrics.astype(float).astype({"length": int})
+
+
+def compute_quality(
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> pd.DataFrame:
+    machine_dirs = sorted(
+        d
+        for d in (app_data_path / mv_avg_window_size_frac).iterdir()
+        if d.is_dir()
+    )
+    parts = []
+    for machine_dir in machine_dirs:
+        if not get_preprocessed_file(
+            machine_dir.name, mv_avg_window_size_frac, app_data_path
+        ).is_file():
+            continue
+        series = load_machine_series(
+            mv_avg_window_size_frac=mv_avg_window_size_frac,
+            machine_id=machine_dir.name,
+            time_series=TIME_SERIES,
+            app_data_path=app_data_path,
+        )
+        if CONTOUR_SERIES not in series.columns:
+            continue
+        parts.append(quality_metrics(series, float(mv_avg_window_size_frac)))
+    if not parts:
+        return pd.DataFrame(columns=[*MEASUREMENT_KEY_VARS, *QUALITY_COLUMNS])
+    return pd.concat(parts).reset_index()
+
+
+def load_quality(
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> pd.DataFrame:
+    quality = pd.read_csv(
+        get_quality_file(mv_avg_window_size_frac, app_data_path),
+        index_col=None,
+        dtype={var: str for var in MEASUREMENT_KEY_VARS},
+    )
+    return quality.set_index(MEASUREMENT_KEY_VARS)
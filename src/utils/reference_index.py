@@ -0,0 +1,91 @@
+import datetime
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+IntArray = npt.NDArray[np.int64]
+
+
+class ReferenceIndex:
+    """Reference rows sorted by machine and date.
+
+    The rows of one machine are contiguous and ordered by date, so selecting
+    machines and a date range is one binary search per machine; the other
+    filters only see the rows of that slice.
+    """
+
+    def __init__(self, reference_table: pd.DataFrame) -> None:
+        dates = pd.to_datetime(
+            reference_table["date"].astype(str).str.slice(0, 10)
+        ).to_numpy(dtype="datetime64[D]")
+        machine_ids = reference_table["machine_id"].to_numpy()
+        order = np.lexsort((dates, machine_ids))
+        self.table = reference_table.iloc[order].reset_index(drop=True)
+        self._dates = dates[order]
+        unique_ids, starts = np.unique(machine_ids[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        self.machine_ids: list[object] = unique_ids.tolist()
+        self._blocks: dict[object, tuple[int, int]] = {
+            machine_id: (int(start), int(end))
+            for machine_id, start, end in zip(self.machine_ids, starts, ends)
+        }
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def date_bounds(
+        self,
+        machine_ids: list[object],
+    ) -> tuple[datetime.date, datetime.date] | None:
+        blocks = [self._blocks[m] for m in machine_ids if m in self._blocks]
+        if len(blocks) == 0:
+            return None
+        first = min(self._dates[start] for start, _ in blocks)
+        last = max(self._dates[end - 1] for _, end in blocks)
+        return first.astype(datetime.date), last.astype(datetime.date)
+
+    def positions(
+        self,
+        machine_ids: list[object],
+        start: datetime.date,
+        end: datetime.date,
+    ) -> IntArray:
+        start_day = np.datetime64(start, "D")
+        end_day = np.datetime64(end, "D")
+        ranges = []
+        for machine_id in machine_ids:
+            block = self._blocks.get(machine_id)
+            if block is None:
+                continue
+            lo, hi = block
+            dates = self._dates[lo:hi]
+            ranges.append(
+                np.arange(
+                    lo + np.searchsorted(dates, start_day, side="left"),
+                    lo + np.searchsorted(dates, end_day, side="right"),
+                )
+            )
+        if len(ranges) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(ranges)
+
+    def query(
+        self,
+        machine_ids: list[object],
+        start: datetime.date,
+        end: datetime.date,
+        measure_direction: str | None = None,
+        axis: str | None = None,
+        speeds: list[str] | None = None,
+    ) -> pd.DataFrame:
+        rows: pd.DataFrame = self.table.iloc[
+            self.positions(machine_ids, start, end)
+        ]
+        if measure_direction is not None:
+            rows = rows[rows["measure_direction"] == measure_direction]
+        if axis is not None:
+            rows = rows[rows["axis"] == axis]
+        if speeds is not None:
+            rows = rows[rows["speed"].isin(speeds)]
+        return rows
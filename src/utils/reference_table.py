@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, TypeVar
+
+import pandas as pd
+import pyarrow as pa
+
+from src.utils.annotations import ANNO_INDEX_VARS
+from src.utils.integrity import drop_broken_rows, get_integrity_file
+from src.utils.measurement import (
+    APP_DATA_PATH,
+    MEASUREMENT_KEY_VARS,
+    get_preprocessed_file,
+    normalize_measurement_keys,
+    read_preprocessed_file,
+)
+from src.utils.shared_cache import (
+    get_cache_file,
+    open_shared_csv,
+    select_rows,
+    write_cache_file,
+)
+
+REFERENCE_TABLE_FILE_NAME = "reference_table.csv"
+# Column dtypes the pages read the shared reference table with: the annotator
+# keeps pandas' inferred types to match the annotation files, the score
+# filtering page reads machine ids as strings to match the score tables.
+SHARED_REFERENCE_TABLE_DTYPES: list[dict[str, type] | None] = [
+    None,
+    {"machine_id": str},
+]
+
+T = TypeVar("T")
+
+
+def get_reference_table_file(
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> Path:
+    return app_data_path / mv_avg_window_size_frac / REFERENCE_TABLE_FILE_NAME
+
+
+def list_window_fractions(app_data_path: Path = APP_DATA_PATH) -> list[str]:
+    return list(sorted(d.name for d in app_data_path.iterdir() if d.is_dir()))
+
+
+def read_reference_table(
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> pd.DataFrame:
+    # Keys as written in reference_table.csv, e.g. dates with their time.
+    return pd.read_csv(
+        get_reference_table_file(mv_avg_window_size_frac, app_data_path),
+        index_col=None,
+        dtype=str,
+    )
+
+
+def load_reference_table(
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> pd.DataFrame:
+    return normalize_measurement_keys(
+        read_reference_table(mv_avg_window_size_frac, app_data_path)
+    )
+
+
+def open_shared_reference_table(
+    mv_avg_window_size_frac: str,
+    dtype: dict[str, type] | None = None,
+    app_data_path: Path = APP_DATA_PATH,
+) -> pa.Table:
+    return open_shared_csv(
+        get_reference_table_file(mv_avg_window_size_frac, app_data_path),
+        index_col=None,
+        dtype=dtype,
+    )
+
+
+def open_shared_slice_table(
+    mv_avg_window_size_frac: str,
+    axis: str,
+    measure_direction: str,
+    speed: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> pd.DataFrame:
+    # The filtered and deduplicated rows of one annotation slice are cached
+    # on their own, so opening a slice does not scan the whole table. Rows
+    # flagged by the integrity report are left out.
+    reference_table_file = get_reference_table_file(
+        mv_avg_window_size_frac, app_data_path
+    )
+    integrity_file = get_integrity_file(mv_avg_window_size_frac, app_data_path)
+    integrity_mtime = (
+        integrity_file.stat().st_mtime_ns if integrity_file.is_file() else 0
+    )
+    cache_file = get_cache_file(
+        reference_table_file,
+        variant=f"slice:{axis}:{measure_direction}:{speed}:{integrity_mtime}",
+    )
+    if cache_file.is_file():
+        cached: pd.DataFrame = pa.ipc.open_file(
+            pa.memory_map(str(cache_file), "r")
+        ).read_pandas()
+        return cached.set_index(ANNO_INDEX_VARS)
+    slice_table = drop_broken_rows(
+        select_rows(
+            open_shared_reference_table(
+                mv_avg_window_size_frac, app_data_path=app_data_path
+            ),
+            measure_direction=measure_direction,
+            axis=axis,
+            speed=speed,
+        ),
+        mv_avg_window_size_frac,
+        app_data_path,
+    )
+    slice_table = slice_table.set_index(ANNO_INDEX_VARS).drop_duplicates()
+    write_cache_file(slice_table.reset_index(), cache_file)
+    return slice_table
+
+
+def load_machine_series(
+    mv_avg_window_size_frac: str,
+    machine_id: str,
+    time_series: list[str],
+    app_data_path: Path = APP_DATA_PATH,
+) -> pd.DataFrame:
+    df = read_preprocessed_file(
+        get_preprocessed_file(
+            machine_id=machine_id,
+            mv_avg_window_size_frac=mv_avg_window_size_frac,
+            app_data_path=app_data_path,
+        ),
+        columns=[*MEASUREMENT_KEY_VARS, *time_series],
+    )
+    time_series = [ts_name for ts_name in time_series if ts_name in df.columns]
+    # Indexed by the full reference keys; only a measurement written twice
+    # is dropped, never another measurement of the same day.
+    df = normalize_measurement_keys(df[[*MEASUREMENT_KEY_VARS, *time_series]])
+    return df.drop_duplicates(subset=MEASUREMENT_KEY_VARS).set_index(
+        MEASUREMENT_KEY_VARS
+    )
+
+
+def load_for_all_fractions(
+    load: Callable[[str], T],
+    mv_avg_window_size_fracs: list[str],
+    max_workers: int = 8,
+) -> dict[str, T]:
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(
+            zip(
+                mv_avg_window_size_fracs,
+                executor.map(load, mv_avg_window_size_fracs),
+            )
+        )
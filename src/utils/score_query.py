@@ -0,0 +1,295 @@
+import json
+import operator
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from src.utils.measurement import (
+    MEASUREMENT_KEY_VARS,
+    normalize_measurement_keys,
+)
+
+SAVED_QUERIES_FILE = Path("artifacts/saved_queries.json")
+
+TOKEN_PATTERN = re.compile(
+    r"\s*(?:"
+    r"(?P<number>\d+(?:\.\d+)?(?:[eE][-+]?\d+)?%?)"
+    r"|(?P<string>\"[^\"]*\"|'[^']*')"
+    r"|(?P<op>>=|<=|==|!=|>|<|\(|\))"
+    r"|(?P<name>[A-Za-z_][A-Za-z0-9_.\-]*)"
+    r")"
+)
+COMPARISONS: dict[str, Callable[[Any, Any], Any]] = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "<=": operator.le,
+    "<": operator.lt,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+KEYWORDS = {"and", "or", "not"}
+
+BoolArray = npt.NDArray[np.bool_]
+Arrays = dict[str, npt.NDArray[Any]]
+Evaluate = Callable[[Arrays], Any]
+
+
+def get_column_name(detector: str, time_series: str, feature: str) -> str:
+    return f"{detector}.{time_series}.{feature}"
+
+
+def build_query_arrays(scores: pd.DataFrame) -> tuple[pd.DataFrame, Arrays]:
+    # Long score rows (SCORE_COLUMNS) become one float array per
+    # detector/time series/feature, aligned on the measurement keys.
+    scores = normalize_measurement_keys(scores)
+    wide = scores.assign(
+        column=scores["detector"]
+        + "."
+        + scores["time_series"]
+        + "."
+        + scores["feature"]
+    ).pivot_table(
+        index=MEASUREMENT_KEY_VARS,
+        columns="column",
+        values="score",
+        aggfunc="max",
+    )
+    keys = wide.index.to_frame(index=False)
+    arrays: Arrays = {
+        var: keys[var].to_numpy(dtype=object) for var in MEASUREMENT_KEY_VARS
+    }
+    for column in wide.columns:
+        arrays[column] = wide[column].to_numpy(dtype=np.float64)
+    return keys, arrays
+
+
+def tokenize(expression: str) -> list[tuple[str, str]]:
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if match is None or match.end() == position:
+            raise ValueError(
+                f"Unexpected character at {position}: "
+                f"{expression[position:position + 10]!r}"
+            )
+        kind = match.lastgroup
+        assert kind is not None
+        value = match.group(kind)
+        if kind == "name" and value.lower() in KEYWORDS:
+            kind = value.lower()
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+def resolve_column(name: str, columns: Iterable[str]) -> str:
+    # A column can be named by any unique dotted suffix, such as
+    # contour_deviation_1.th_3.0_percentage_over.
+    columns = list(columns)
+    if name in columns:
+        return name
+    matches = [column for column in columns if column.endswith(f".{name}")]
+    if len(matches) == 1:
+        return matches[0]
+    if len(matches) == 0:
+        raise ValueError(f"Unknown column: {name}")
+    raise ValueError(f"Ambiguous column {name}: {', '.join(matches)}")
+
+
+@dataclass
+class _Operand:
+    evaluate: Evaluate
+    # "number" for score columns and numbers, "text" for the measurement
+    # key columns and strings.
+    kind: str
+    token: str
+    is_literal: bool
+
+
+@dataclass
+class CompiledQuery:
+    expression: str
+    columns: list[str]
+    _evaluate: Evaluate
+
+    def mask(self, arrays: Arrays) -> BoolArray:
+        mask = self._evaluate(arrays)
+        n_rows = len(next(iter(arrays.values()))) if arrays else 0
+        return np.broadcast_to(np.asarray(mask, dtype=bool), (n_rows,))
+
+
+class _Parser:
+    """Recursive descent parser that builds the evaluation closures.
+
+    expression := term ("or" term)*
+    term       := factor ("and" factor)*
+    factor     := "not" factor | "(" expression ")" | operand op operand
+    operand    := column | number | number% | "string"
+    """
+
+    def __init__(self, expression: str, columns: Iterable[str]) -> None:
+        self.tokens = tokenize(expression)
+        self.position = 0
+        self.columns = list(columns)
+        self.used: list[str] = []
+
+    def peek(self) -> str | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][0]
+        return None
+
+    def take(self, kind: str | None = None) -> str:
+        if self.position >= len(self.tokens):
+            raise ValueError("Unexpected end of expression")
+        token_kind, value = self.tokens[self.position]
+        if kind is not None and token_kind != kind and value != kind:
+            raise ValueError(f"Expected {kind}, found {value!r}")
+        self.position += 1
+        return value
+
+    def parse(self) -> Evaluate:
+        evaluate = self.expression()
+        if self.position != len(self.tokens):
+            raise ValueError(
+                f"Unexpected {self.tokens[self.position][1]!r} at the end"
+            )
+        return evaluate
+
+    def expression(self) -> Evaluate:
+        terms = [self.term()]
+        while self.peek() == "or":
+            self.take()
+            terms.append(self.term())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda arrays: np.logical_or.reduce([t(arrays) for t in terms])
+
+    def term(self) -> Evaluate:
+        factors = [self.factor()]
+        while self.peek() == "and":
+            self.take()
+            factors.append(self.factor())
+        if len(factors) == 1:
+            return factors[0]
+        return lambda arrays: np.logical_and.reduce(
+            [f(arrays) for f in factors]
+        )
+
+    def factor(self) -> Evaluate:
+        if self.peek() == "not":
+            self.take()
+            negated = self.factor()
+            return lambda arrays: np.logical_not(negated(arrays))
+        if self.peek() == "op" and self.tokens[self.position][1] == "(":
+            self.take()
+            inner = self.expression()
+            self.take(")")
+            return inner
+        left = self.operand()
+        op = self.take("op")
+        if op not in COMPARISONS:
+            raise ValueError(f"Expected a comparison, found {op!r}")
+        right = self.operand()
+        if left.kind != right.kind:
+            left, right = self.coerce(left, op, right)
+        compare = COMPARISONS[op]
+        evaluate_left, evaluate_right = left.evaluate, right.evaluate
+        return lambda arrays: compare(
+            evaluate_left(arrays), evaluate_right(arrays)
+        )
+
+    def coerce(
+        self, left: _Operand, op: str, right: _Operand
+    ) -> tuple[_Operand, _Operand]:
+        # Key columns hold strings, so a plain number tested for equality
+        # against one is read as written, as in machine_id == 1. Ordering
+        # a key column against a number has no meaning and is rejected.
+        number = left if left.kind == "number" else right
+        if (
+            op in ("==", "!=")
+            and number.is_literal
+            and not number.token.endswith("%")
+        ):
+            text = number.token
+            coerced = _Operand(lambda arrays: text, "text", text, True)
+            return (coerced, right) if number is left else (left, coerced)
+        raise ValueError(
+            f"Cannot compare {left.token} {op} {right.token}: "
+            "a key column only compares to a string, or to a plain number "
+            "with == or !="
+        )
+
+    def operand(self) -> _Operand:
+        kind = self.peek()
+        value = self.take()
+        if kind == "number":
+            number = (
+                float(value[:-1]) / 100 if value.endswith("%") else float(value)
+            )
+            return _Operand(lambda arrays: number, "number", value, True)
+        if kind == "string":
+            text = value[1:-1]
+            return _Operand(lambda arrays: text, "text", value, True)
+        if kind == "name":
+            column = resolve_column(value, self.columns)
+            self.used.append(column)
+            return _Operand(
+                lambda arrays: arrays[column],
+                "text" if column in MEASUREMENT_KEY_VARS else "number",
+                column,
+                False,
+            )
+        raise ValueError(f"Expected a column or a value, found {value!r}")
+
+
+def compile_query(expression: str, columns: Iterable[str]) -> CompiledQuery:
+    parser = _Parser(expression, columns)
+    evaluate = parser.parse()
+    return CompiledQuery(
+        expression=expression,
+        columns=list(dict.fromkeys(parser.used)),
+        _evaluate=evaluate,
+    )
+
+
+def select_reference_rows(
+    reference_table: pd.DataFrame,
+    keys: pd.DataFrame,
+) -> pd.DataFrame:
+    normalized = normalize_measurement_keys(
+        reference_table[MEASUREMENT_KEY_VARS]
+    )
+    selected = pd.MultiIndex.from_frame(normalized).isin(
+        pd.MultiIndex.from_frame(keys[MEASUREMENT_KEY_VARS])
+    )
+    return reference_table[selected]
+
+
+def load_saved_queries(
+    saved_queries_file: Path = SAVED_QUERIES_FILE,
+) -> dict[str, str]:
+    if not saved_queries_file.is_file():
+        return {}
+    with open(saved_queries_file, encoding="utf-8") as f:
+        saved_queries: dict[str, str] = json.load(f)
+    return saved_queries
+
+
+def save_queries(
+    saved_queries: dict[str, str],
+    saved_queries_file: Path = SAVED_QUERIES_FILE,
+) -> None:
+    saved_queries_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = saved_queries_file.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(saved_queries.items())), f, indent=2)
+    os.replace(tmp_file, saved_queries_file)
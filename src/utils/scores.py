@@ -0,0 +1,132 @@
+from pathlib import Path
+
+import pandas as pd
+
+from src.utils.measurement import (
+    MEASUREMENT_KEY_VARS,
+    normalize_measurement_keys,
+)
+
+SCORES_PATH = Path("artifacts/scores/")
+SCORES_FILE_NAME = "scores.csv"
+LEGACY_STRABURZYNSKI_PATH = Path("artifacts/straburzynski_score.csv")
+STRABURZYNSKI_FILE_NAME = "straburzynski_score.csv"
+QUANTILE_STATISTICS_ROOT = Path("artifacts/quantile_statistics/")
+QUANTILE_FILE_NAME = "batch_scores.csv"
+QUANTILE_TIME_SERIES = "contour_deviation_1"
+SCORE_COLUMNS = [
+    *MEASUREMENT_KEY_VARS,
+    "time_series",
+    "detector",
+    "feature",
+    "score",
+]
+
+
+def get_scores_dir(
+    mv_avg_window_size_frac: str,
+    scores_path: Path = SCORES_PATH,
+) -> Path:
+    return scores_path / mv_avg_window_size_frac
+
+
+def get_quantile_statistics_file(
+    mv_avg_window_size_frac: str,
+    residuals_std: float,
+    quantile_statistics_root: Path = QUANTILE_STATISTICS_ROOT,
+) -> Path:
+    return (
+        quantile_statistics_root
+        / f"residuals_std-{residuals_std}"
+        / mv_avg_window_size_frac
+        / QUANTILE_FILE_NAME
+    )
+
+
+def load_scores(
+    mv_avg_window_size_frac: str,
+    scores_path: Path = SCORES_PATH,
+) -> pd.DataFrame:
+    return pd.read_csv(
+        get_scores_dir(mv_avg_window_size_frac, scores_path) / SCORES_FILE_NAME,
+        index_col=None,
+        dtype={var: str for var in MEASUREMENT_KEY_VARS},
+    )
+
+
+def _with_reference_keys(
+    scores: pd.DataFrame,
+    reference_table: pd.DataFrame,
+    extra_columns: tuple[str, ...] = (),
+) -> pd.DataFrame:
+    # Views keep the reference table's own key formatting so the pages can
+    # match them against reference_table.csv without normalizing; the
+    # reference table must be passed as read, not normalized.
+    reference_keys = reference_table[
+        [*MEASUREMENT_KEY_VARS, *extra_columns]
+    ].drop_duplicates(subset=MEASUREMENT_KEY_VARS)
+    normalized = normalize_measurement_keys(reference_keys)
+    normalized = normalized[MEASUREMENT_KEY_VARS].join(
+        reference_keys[MEASUREMENT_KEY_VARS].add_prefix("reference_")
+    )
+    normalized = normalized.join(reference_keys[list(extra_columns)])
+    merged = scores.merge(normalized, on=MEASUREMENT_KEY_VARS, how="inner")
+    for var in MEASUREMENT_KEY_VARS:
+        merged[var] = merged.pop(f"reference_{var}")
+    return merged
+
+
+def to_quantile_table(
+    scores: pd.DataFrame,
+    reference_table: pd.DataFrame,
+    time_series: str = QUANTILE_TIME_SERIES,
+) -> pd.DataFrame:
+    quantile_scores = scores[
+        (scores["detector"] == "quantile")
+        & (scores["time_series"] == time_series)
+    ]
+    wide = (
+        quantile_scores.pivot_table(
+            index=MEASUREMENT_KEY_VARS, columns="feature", values="score"
+        )
+        .rename_axis(columns=None)
+        .reset_index()
+    )
+    return _with_reference_keys(wide, reference_table, ("file_path",))
+
+
+def to_straburzynski_table(
+    scores: pd.DataFrame,
+    reference_table: pd.DataFrame,
+) -> pd.DataFrame:
+    straburzynski_scores = scores[scores["detector"] == "straburzynski"]
+    straburzynski_scores = straburzynski_scores.drop(
+        columns=["detector", "feature"]
+    ).rename(columns={"time_series": "feature"})
+    return _with_reference_keys(straburzynski_scores, reference_table)[
+        ["axis", "speed", "measure_direction", "machine_id", "date"]
+        + ["feature", "score"]
+    ]
+
+
+def load_legacy_quantile_scores(quantile_file: Path) -> pd.DataFrame:
+    quantile_df = pd.read_csv(quantile_file, index_col=None)
+    quantile_df = normalize_measurement_keys(quantile_df)
+    th_columns = [col for col in quantile_df.columns if col.startswith("th_")]
+    scores = quantile_df.melt(
+        id_vars=MEASUREMENT_KEY_VARS,
+        value_vars=th_columns,
+        var_name="feature",
+        value_name="score",
+    )
+    return scores.assign(
+        time_series=quantile_file.stem, detector="quantile_statistics"
+    )[SCORE_COLUMNS]
+
+
+def load_legacy_straburzynski_scores(score_file: Path) -> pd.DataFrame:
+    scores = normalize_measurement_keys(pd.read_csv(score_file, index_col=None))
+    scores = scores.rename(columns={"feature": "time_series"})
+    return scores.assign(detector="straburzynski_legacy", feature="score")[
+        SCORE_COLUMNS
+    ]
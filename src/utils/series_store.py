@@ -0,0 +1,127 @@
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import pyarrow as pa
+
+SERIES_STORE_FILE_NAME = "preprocessed_series.arrow"
+SERIES_STORE_METADATA_KEY = b"series_store"
+CHUNK_ROWS = 256
+CODEC = "zstd"
+COMPRESSION_LEVEL = 3
+SERIES_DTYPE = np.dtype("<f4")
+
+FloatArray = npt.NDArray[np.float32]
+
+
+def shuffle_bytes(values: FloatArray) -> bytes:
+    # Byte planes of float32 values: exponents and high mantissa bytes of
+    # neighbouring samples end up next to each other and compress well.
+    return values.view(np.uint8).reshape(-1, SERIES_DTYPE.itemsize).T.tobytes()
+
+
+def unshuffle_bytes(data: Any, length: int) -> FloatArray:
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(
+        SERIES_DTYPE.itemsize, length
+    )
+    return np.ascontiguousarray(planes.T).view(SERIES_DTYPE).ravel()
+
+
+def encode_series(values: Any, codec: pa.Codec) -> tuple[bytes | None, int]:
+    # Any array-like cell is a series; scalars (NaN) mark a missing one.
+    if np.ndim(values) == 0:
+        return None, -1
+    values = np.asarray(values, dtype=SERIES_DTYPE).ravel()
+    return codec.compress(shuffle_bytes(values), asbytes=True), len(values)
+
+
+def decode_series(blob: Any, length: int, codec: pa.Codec) -> Any:
+    if blob is None:
+        return np.nan
+    data = codec.decompress(
+        blob, decompressed_size=length * SERIES_DTYPE.itemsize
+    )
+    return unshuffle_bytes(data, length)
+
+
+def _length_column(ts_name: str) -> str:
+    return f"{ts_name}.length"
+
+
+def write_series_store(
+    df: pd.DataFrame,
+    store_file: Path,
+    time_series: list[str],
+) -> Path:
+    # Series cells become one compressed blob per measurement; all other
+    # columns are stored as plain Arrow columns. Record batches of
+    # CHUNK_ROWS measurements are the unit of reading.
+    time_series = [ts_name for ts_name in time_series if ts_name in df.columns]
+    codec = pa.Codec(CODEC, compression_level=COMPRESSION_LEVEL)
+    table = pa.Table.from_pandas(df.drop(columns=time_series))
+    for ts_name in time_series:
+        encoded = [encode_series(v, codec) for v in df[ts_name]]
+        table = table.append_column(
+            ts_name, pa.array([blob for blob, _ in encoded], type=pa.binary())
+        )
+        table = table.append_column(
+            _length_column(ts_name),
+            pa.array([length for _, length in encoded], type=pa.int64()),
+        )
+    metadata = {
+        **(table.schema.metadata or {}),
+        SERIES_STORE_METADATA_KEY: json.dumps(
+            {
+                "columns": [str(column) for column in df.columns],
+                "time_series": time_series,
+                "codec": CODEC,
+            }
+        ).encode(),
+    }
+    table = table.replace_schema_metadata(metadata)
+
+    store_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = store_file.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    with pa.OSFile(str(tmp_file), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=CHUNK_ROWS):
+                writer.write_batch(batch)
+    os.replace(tmp_file, store_file)
+    return store_file
+
+
+def read_series_store(
+    store_file: Path,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    # Series that are not requested are neither read nor decompressed.
+    table = pa.ipc.open_file(pa.memory_map(str(store_file), "r")).read_all()
+    store_metadata = json.loads(
+        table.schema.metadata[SERIES_STORE_METADATA_KEY]
+    )
+    all_columns: list[str] = store_metadata["columns"]
+    time_series: list[str] = store_metadata["time_series"]
+    if columns is None:
+        columns = all_columns
+    columns = [column for column in all_columns if column in columns]
+    codec = pa.Codec(store_metadata["codec"])
+
+    series_columns = [*time_series, *map(_length_column, time_series)]
+    df = table.drop_columns(series_columns).to_pandas()
+    df = df[[column for column in columns if column not in time_series]]
+    for ts_name in time_series:
+        if ts_name not in columns:
+            continue
+        blobs = table[ts_name].to_pylist()
+        lengths = table[_length_column(ts_name)].to_pylist()
+        values = np.empty(len(blobs), dtype=object)
+        for i, (blob, length) in enumerate(zip(blobs, lengths)):
+            values[i] = decode_series(blob, length, codec)
+        df[ts_name] = values
+    restored: pd.DataFrame = df[columns]
+    return restored
@@ -0,0 +1,52 @@
+import json
+import os
+import re
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+SNAPSHOT_PATH = Path("artifacts/sessions/")
+
+
+@dataclass
+class SessionSnapshot:
+    """Where an annotator left off: the slice, the row and its key."""
+
+    user: str
+    mv_avg_window_size_frac: str
+    axis: str
+    measure_direction: str
+    speed: str
+    row_id: int = 0
+    # machine_id, date and speed of the row, to find it again when rows
+    # were added to the slice in the meantime.
+    row_key: list[Any] = field(default_factory=list)
+
+
+def get_snapshot_file(user: str, snapshot_path: Path = SNAPSHOT_PATH) -> Path:
+    return snapshot_path / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', user)}.json"
+
+
+def save_snapshot(
+    snapshot: SessionSnapshot,
+    snapshot_path: Path = SNAPSHOT_PATH,
+) -> None:
+    snapshot_file = get_snapshot_file(snapshot.user, snapshot_path)
+    snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = snapshot_file.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    tmp_file.write_text(json.dumps(asdict(snapshot)), encoding="utf-8")
+    os.replace(tmp_file, snapshot_file)
+
+
+def load_snapshot(
+    user: str,
+    snapshot_path: Path = SNAPSHOT_PATH,
+) -> SessionSnapshot | None:
+    snapshot_file = get_snapshot_file(user, snapshot_path)
+    try:
+        return SessionSnapshot(
+            **json.loads(snapshot_file.read_text(encoding="utf-8"))
+        )
+    except (OSError, TypeError, ValueError):
+        return None
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+CACHE_PATH = Path("artifacts/cache/")
+
+
+def get_cache_file(
+    source: Path,
+    cache_path: Path = CACHE_PATH,
+    variant: str = "",
+) -> Path:
+    # The name changes with the source's mtime and size, so a refreshed
+    # source never attaches to a stale cache file.
+    stat = source.stat()
+    key = f"{source.resolve()}:{stat.st_mtime_ns}:{stat.st_size}:{variant}"
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    return cache_path / f"{source.stem}-{digest[:16]}.arrow"
+
+
+def write_cache_file(df: pd.DataFrame, cache_file: Path) -> Path:
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Workers may build the same file concurrently; each writes its own
+    # temporary file and the last rename wins with identical content.
+    tmp_file = cache_file.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    with pa.OSFile(str(tmp_file), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_file, cache_file)
+    return cache_file
+
+
+def open_shared_csv(
+    source: Path,
+    cache_path: Path = CACHE_PATH,
+    **read_csv_kwargs: Any,
+) -> pa.Table:
+    # Different parse options give different tables, so they get their own
+    # cache file.
+    cache_file = get_cache_file(
+        source, cache_path, variant=repr(sorted(read_csv_kwargs.items()))
+    )
+    if not cache_file.is_file():
+        write_cache_file(pd.read_csv(source, **read_csv_kwargs), cache_file)
+    # Memory-mapped Arrow buffers live in the OS page cache, so every worker
+    # process reading the same file shares one physical copy.
+    return pa.ipc.open_file(pa.memory_map(str(cache_file), "r")).read_all()
+
+
+def _filter(table: pa.Table, equals: dict[str, Any]) -> pa.Table:
+    mask = None
+    for column, value in equals.items():
+        column_mask = pc.equal(table[column], pa.scalar(value))
+        mask = column_mask if mask is None else pc.and_(mask, column_mask)
+    return table if mask is None else table.filter(mask)
+
+
+def select_rows(table: pa.Table, **equals: Any) -> pd.DataFrame:
+    rows: pd.DataFrame = _filter(table, equals).to_pandas()
+    return rows
+
+
+def unique_values(table: pa.Table, column: str, **equals: Any) -> list[Any]:
+    return list(sorted(pc.unique(_filter(table, equals)[column]).to_pylist()))
+
+
+def prune_cache(cache_path: Path = CACHE_PATH) -> int:
+    removed = 0
+    for cache_file in cache_path.glob("*.arrow"):
+        cache_file.unlink(missing_ok=True)
+        removed += 1
+    return removed
@@ -0,0 +1,196 @@
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from src.utils.annotations import SLICE_VARS
+from src.utils.measurement import (
+    APP_DATA_PATH,
+    MEASUREMENT_KEY_VARS,
+    get_preprocessed_file,
+)
+from src.utils.reference_table import load_machine_series
+
+SIMILARITY_DIR_NAME = "similarity"
+EMBEDDING_LENGTH = 128
+SIMILARITY_TIME_SERIES = ["contour_deviation_1", "current_1"]
+
+FloatArray = npt.NDArray[np.float32]
+
+
+def get_similarity_index_file(
+    mv_avg_window_size_frac: str,
+    axis: str,
+    measure_direction: str,
+    speed: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> Path:
+    return (
+        app_data_path
+        / mv_avg_window_size_frac
+        / SIMILARITY_DIR_NAME
+        / f"{axis}_{measure_direction}_{speed}.npz"
+    )
+
+
+def embed_series(values: object, length: int = EMBEDDING_LENGTH) -> FloatArray:
+    values = np.asarray(values, dtype=np.float64).ravel()
+    finite = np.isfinite(values)
+    if finite.sum() < 2:
+        return np.zeros(length, dtype=np.float32)
+    positions = np.flatnonzero(finite)
+    resampled = np.interp(
+        np.linspace(0, len(values) - 1, length), positions, values[finite]
+    )
+    resampled -= resampled.mean()
+    std = resampled.std()
+    if std > 0:
+        resampled /= std
+    return resampled.astype(np.float32)
+
+
+def embed_slice(
+    series: pd.DataFrame,
+    time_series: list[str] = SIMILARITY_TIME_SERIES,
+) -> FloatArray:
+    # A time series missing from a machine file embeds as zeros, so all
+    # machines of a slice share the embedding width.
+    embeddings = np.hstack(
+        [
+            (
+                np.vstack([embed_series(v) for v in series[ts_name]])
+                if ts_name in series.columns and len(series) > 0
+                else np.zeros((len(series), EMBEDDING_LENGTH), np.float32)
+            )
+            for ts_name in time_series
+        ]
+    )
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    normalized: FloatArray = embeddings / np.where(norms > 0, norms, 1)
+    return normalized
+
+
+def get_source_signatures(
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> list[str]:
+    # Like the shared cache, an index is tied to the mtime and size of every
+    # preprocessed file it was built from.
+    signatures = []
+    for machine_dir in sorted(
+        d
+        for d in (app_data_path / mv_avg_window_size_frac).iterdir()
+        if d.is_dir()
+    ):
+        preprocessed_file = get_preprocessed_file(
+            machine_dir.name, mv_avg_window_size_frac, app_data_path
+        )
+        if preprocessed_file.is_file():
+            stat = preprocessed_file.stat()
+            signatures.append(
+                f"{preprocessed_file.resolve()}:{stat.st_mtime_ns}:"
+                f"{stat.st_size}"
+            )
+    return signatures
+
+
+def is_similarity_index_current(
+    index_file: Path,
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> bool:
+    if not index_file.is_file():
+        return False
+    with np.load(index_file) as npz:
+        if "sources" not in npz.files:
+            return False
+        sources: list[str] = npz["sources"].tolist()
+    return sources == get_source_signatures(
+        mv_avg_window_size_frac, app_data_path
+    )
+
+
+def build_similarity_indexes(
+    mv_avg_window_size_frac: str,
+    slices: list[tuple[str, str, str]] | None = None,
+    time_series: list[str] = SIMILARITY_TIME_SERIES,
+    app_data_path: Path = APP_DATA_PATH,
+) -> list[Path]:
+    keys: dict[tuple[str, str, str], list[npt.NDArray[np.str_]]] = {}
+    embeddings: dict[tuple[str, str, str], list[FloatArray]] = {}
+    # Taken before reading, so a file rewritten meanwhile marks the index
+    # as outdated.
+    sources = get_source_signatures(mv_avg_window_size_frac, app_data_path)
+    machine_dirs = sorted(
+        d
+        for d in (app_data_path / mv_avg_window_size_frac).iterdir()
+        if d.is_dir()
+    )
+    # Each machine file is read once and split into all requested slices.
+    for machine_dir in machine_dirs:
+        if not get_preprocessed_file(
+            machine_dir.name, mv_avg_window_size_frac, app_data_path
+        ).is_file():
+            continue
+        series = load_machine_series(
+            mv_avg_window_size_frac=mv_avg_window_size_frac,
+            machine_id=machine_dir.name,
+            time_series=time_series,
+            app_data_path=app_data_path,
+        ).reset_index()
+        for slice_key, slice_series in series.groupby(SLICE_VARS):
+            if slices is not None and slice_key not in slices:
+                continue
+            keys.setdefault(slice_key, []).append(
+                slice_series[MEASUREMENT_KEY_VARS].to_numpy(dtype=str)
+            )
+            embeddings.setdefault(slice_key, []).append(
+                embed_slice(slice_series, time_series)
+            )
+
+    index_files = []
+    for slice_key in keys:
+        axis, measure_direction, speed = slice_key
+        index_file = get_similarity_index_file(
+            mv_avg_window_size_frac=mv_avg_window_size_frac,
+            axis=axis,
+            measure_direction=measure_direction,
+            speed=speed,
+            app_data_path=app_data_path,
+        )
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            index_file,
+            keys=np.vstack(keys[slice_key]),
+            embeddings=np.vstack(embeddings[slice_key]),
+            sources=np.array(sources, dtype=str),
+        )
+        index_files.append(index_file)
+    return index_files
+
+
+class SimilarityIndex:
+    """Exact cosine k-NN over z-normalized, resampled series."""
+
+    def __init__(self, index_file: Path) -> None:
+        with np.load(index_file) as npz:
+            self.keys = pd.DataFrame(npz["keys"], columns=MEASUREMENT_KEY_VARS)
+            self.embeddings: FloatArray = npz["embeddings"]
+        self._positions = {
+            tuple(key): i for i, key in enumerate(self.keys.to_numpy().tolist())
+        }
+
+    def __contains__(self, key: tuple[str, ...]) -> bool:
+        return key in self._positions
+
+    def query(self, key: tuple[str, ...], k: int = 10) -> pd.DataFrame:
+        position = self._positions[key]
+        scores = self.embeddings @ self.embeddings[position]
+        scores[position] = -np.inf
+        k = min(k, len(scores) - 1)
+        if k <= 0:
+            return self.keys.iloc[0:0].assign(similarity=[])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return self.keys.iloc[top].assign(similarity=scores[top])
@@ -0,0 +1,145 @@
+from pathlib import Path
+from typing import cast
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from src.utils.annotations import ANNO_INDEX_VARS, SAVE_PATH
+
+SPANS_FILE_NAME = "spans.csv"
+SPAN_CLASSES = ["anomaly", "edge_case"]
+SPAN_COLUMNS = [*ANNO_INDEX_VARS, "time_series", "start", "end", "class"]
+
+IntArray = npt.NDArray[np.int64]
+
+
+def get_spans_file(
+    axis: str,
+    measure_direction: str,
+    speed: str,
+    save_path: Path = SAVE_PATH,
+) -> Path:
+    return save_path / axis / measure_direction / speed / SPANS_FILE_NAME
+
+
+def load_slice_spans(
+    axis: str,
+    measure_direction: str,
+    speed: str,
+    save_path: Path = SAVE_PATH,
+) -> pd.DataFrame:
+    spans_file = get_spans_file(axis, measure_direction, speed, save_path)
+    if not spans_file.is_file():
+        return pd.DataFrame(columns=SPAN_COLUMNS).astype(
+            {"start": np.int64, "end": np.int64}
+        )
+    return pd.read_csv(spans_file, index_col=None)[SPAN_COLUMNS]
+
+
+def save_slice_spans(
+    spans: pd.DataFrame,
+    axis: str,
+    measure_direction: str,
+    speed: str,
+    save_path: Path = SAVE_PATH,
+) -> Path:
+    spans_file = get_spans_file(axis, measure_direction, speed, save_path)
+    spans_file.parent.mkdir(parents=True, exist_ok=True)
+    spans[SPAN_COLUMNS].to_csv(spans_file, index=False)
+    return spans_file
+
+
+def iter_spans_files(save_path: Path = SAVE_PATH) -> list[Path]:
+    return sorted(save_path.glob(f"*/*/*/{SPANS_FILE_NAME}"))
+
+
+def load_all_spans(save_path: Path = SAVE_PATH) -> pd.DataFrame:
+    parts = []
+    for spans_file in iter_spans_files(save_path):
+        speed_dir = spans_file.parent
+        parts.append(
+            pd.read_csv(spans_file, index_col=None)[SPAN_COLUMNS].assign(
+                axis=speed_dir.parent.parent.name,
+                measure_direction=speed_dir.parent.name,
+            )
+        )
+    if len(parts) == 0:
+        return pd.DataFrame(
+            columns=[*SPAN_COLUMNS, "axis", "measure_direction"]
+        ).astype({"start": np.int64, "end": np.int64})
+    return pd.concat(parts, ignore_index=True)
+
+
+class SpanIndex:
+    """Static interval tree over labeled sample ranges [start, end).
+
+    Spans are sorted by start and read as an implicit balanced binary tree
+    whose nodes keep the largest end in their subtree, so an overlap query
+    visits O(log n + k) nodes for k hits.
+    """
+
+    def __init__(self, spans: pd.DataFrame) -> None:
+        order = np.argsort(spans["start"].to_numpy(), kind="stable")
+        self.spans = spans.iloc[order].reset_index(drop=True)
+        self._starts = self.spans["start"].to_numpy(dtype=np.int64)
+        self._ends = self.spans["end"].to_numpy(dtype=np.int64)
+        self._max_ends = self._ends.copy()
+        self._build(0, len(self._ends))
+        self._by_measurement = cast(
+            dict[tuple[object, ...], IntArray],
+            (
+                self.spans.groupby(ANNO_INDEX_VARS).indices
+                if len(self.spans)
+                else {}
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def _build(self, lo: int, hi: int) -> int:
+        # Returns the largest end in [lo, hi); the depth is O(log n).
+        if lo >= hi:
+            return np.iinfo(np.int64).min
+        mid = (lo + hi) // 2
+        self._max_ends[mid] = max(
+            self._ends[mid], self._build(lo, mid), self._build(mid + 1, hi)
+        )
+        return int(self._max_ends[mid])
+
+    def overlapping(self, start: int, end: int) -> IntArray:
+        hits = []
+        stack = [(0, len(self._ends))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            # No span in this subtree ends after the query starts.
+            if self._max_ends[mid] <= start:
+                continue
+            stack.append((lo, mid))
+            # Spans right of mid start even later.
+            if self._starts[mid] < end:
+                if self._ends[mid] > start:
+                    hits.append(mid)
+                stack.append((mid + 1, hi))
+        return np.sort(np.asarray(hits, dtype=np.int64))
+
+    def query(
+        self,
+        start: int,
+        end: int,
+        **equals: object,
+    ) -> pd.DataFrame:
+        hits = self.spans.iloc[self.overlapping(start, end)]
+        for column, value in equals.items():
+            hits = hits[hits[column] == value]
+        return hits
+
+    def for_measurement(self, key: tuple[object, ...]) -> pd.DataFrame:
+        positions = self._by_measurement.get(key)
+        if positions is None:
+            return self.spans.iloc[:0]
+        return self.spans.iloc[positions]
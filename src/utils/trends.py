@@ -0,0 +1,124 @@
+import os
+import uuid
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils.detectors import RESIDUALS_STD, get_window_size
+from src.utils.measurement import (
+    APP_DATA_PATH,
+    MEASUREMENT_KEY_VARS,
+    TIME_SERIES,
+)
+from src.utils.quality import (
+    centered_moving_average,
+    iter_length_groups,
+    series_lengths,
+    stack_series,
+)
+from src.utils.reference_table import load_machine_series
+
+TRENDS_FILE_NAME = "trends.parquet"
+TREND_QUANTILES = {"q05": 0.05, "q50": 0.5, "q95": 0.95}
+TREND_STATS = ["mean", "std", *TREND_QUANTILES, "exceedance"]
+TREND_COLUMNS = [*MEASUREMENT_KEY_VARS, "time_series", *TREND_STATS]
+# Share of residuals further than this many RESIDUALS_STD from the moving
+# average.
+EXCEEDANCE_THRESHOLD = 3.0
+
+
+def get_trends_file(
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> Path:
+    return app_data_path / mv_avg_window_size_frac / TRENDS_FILE_NAME
+
+
+def trend_statistics(
+    series: pd.DataFrame,
+    window_frac: float,
+    residuals_std: float = RESIDUALS_STD,
+    threshold: float = EXCEEDANCE_THRESHOLD,
+) -> pd.DataFrame:
+    # One row per measurement and time series; measurements of equal length
+    # are stacked like in quality_metrics.
+    parts = []
+    for ts_name in [ts for ts in TIME_SERIES if ts in series.columns]:
+        lengths = series_lengths(series[ts_name])
+        for length, group in iter_length_groups(series, lengths):
+            values = stack_series(group[ts_name], length)
+            residuals = np.abs(
+                values
+                - centered_moving_average(
+                    values, get_window_size(length, window_frac)
+                )
+            )
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                stats = {
+                    "mean": np.nanmean(values, axis=1),
+                    "std": np.nanstd(values, axis=1),
+                    **dict(
+                        zip(
+                            TREND_QUANTILES,
+                            np.nanquantile(
+                                values, list(TREND_QUANTILES.values()), axis=1
+                            ),
+                        )
+                    ),
+                    "exceedance": np.sum(
+                        residuals > threshold * residuals_std, axis=1
+                    )
+                    / np.sum(np.isfinite(residuals), axis=1),
+                }
+            parts.append(
+                pd.DataFrame(stats, index=group.index).assign(
+                    time_series=ts_name
+                )
+            )
+    if not parts:
+        return pd.DataFrame(columns=TREND_COLUMNS)
+    return pd.concat(parts).reset_index()[TREND_COLUMNS]
+
+
+def compute_machine_trends(
+    mv_avg_window_size_frac: str,
+    machine_id: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> pd.DataFrame:
+    series = load_machine_series(
+        mv_avg_window_size_frac=mv_avg_window_size_frac,
+        machine_id=machine_id,
+        time_series=TIME_SERIES,
+        app_data_path=app_data_path,
+    )
+    return trend_statistics(series, float(mv_avg_window_size_frac))
+
+
+def save_trends(
+    trends: pd.DataFrame,
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> Path:
+    # Keys repeat for every time series and compress to dictionaries;
+    # statistics are kept as float32.
+    trends_file = get_trends_file(mv_avg_window_size_frac, app_data_path)
+    tmp_file = trends_file.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    trends[TREND_COLUMNS].astype(
+        {stat: np.float32 for stat in TREND_STATS}
+    ).sort_values(MEASUREMENT_KEY_VARS).to_parquet(
+        tmp_file, index=False, compression="zstd"
+    )
+    os.replace(tmp_file, trends_file)
+    return trends_file
+
+
+def load_trends(
+    mv_avg_window_size_frac: str,
+    app_data_path: Path = APP_DATA_PATH,
+) -> pd.DataFrame:
+    return pd.read_parquet(
+        get_trends_file(mv_avg_window_size_frac, app_data_path)
+    )
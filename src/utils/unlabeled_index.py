@@ -0,0 +1,79 @@
+from typing import Iterable
+
+
+class UnlabeledIndex:
+    """Fenwick tree over row positions flagged as unlabeled.
+
+    Marking a row and jumping to the next or previous unlabeled row are
+    O(log n), so navigation cost does not grow with the slice size.
+    """
+
+    def __init__(self, unlabeled: Iterable[bool]) -> None:
+        self._flags = [bool(flag) for flag in unlabeled]
+        self._size = len(self._flags)
+        self._count = sum(self._flags)
+        self._tree = [0] * (self._size + 1)
+        for i, flag in enumerate(self._flags, start=1):
+            self._tree[i] += int(flag)
+            parent = i + (i & -i)
+            if parent <= self._size:
+                self._tree[parent] += self._tree[i]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, position: int) -> bool:
+        return 0 <= position < self._size and self._flags[position]
+
+    def _update(self, position: int, delta: int) -> None:
+        i = position + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+        self._count += delta
+
+    def _prefix(self, end: int) -> int:
+        # Number of unlabeled rows in positions [0, end).
+        total = 0
+        i = min(end, self._size)
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _find_kth(self, k: int) -> int:
+        position = 0
+        remaining = k + 1
+        step = 1 << self._size.bit_length()
+        while step > 0:
+            candidate = position + step
+            if candidate <= self._size and self._tree[candidate] < remaining:
+                position = candidate
+                remaining -= self._tree[candidate]
+            step >>= 1
+        return position
+
+    def mark_labeled(self, position: int) -> None:
+        if position in self:
+            self._flags[position] = False
+            self._update(position, -1)
+
+    def mark_unlabeled(self, position: int) -> None:
+        if 0 <= position < self._size and not self._flags[position]:
+            self._flags[position] = True
+            self._update(position, 1)
+
+    def next_after(self, position: int) -> int | None:
+        k = self._prefix(position + 1)
+        if k >= self._count:
+            return None
+        return self._find_kth(k)
+
+    def previous_before(self, position: int) -> int | None:
+        k = self._prefix(position)
+        if k == 0:
+            return None
+        return self._find_kth(k - 1)
+
+    def first(self) -> int | None:
+        return self.next_after(-1)
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.utils.measurement import (
+    APP_DATA_PATH,
+    MEASUREMENT_KEY_VARS,
+    TIME_SERIES,
+    get_preprocessed_file,
+)
+from src.utils.reference_table import (
+    get_reference_table_file,
+    list_window_fractions,
+    load_for_all_fractions,
+    load_machine_series,
+    load_reference_table,
+)
+
+if not APP_DATA_PATH.is_dir():
+    st.error(f"No data found in {APP_DATA_PATH}. Please run ETL first.")
+    st.stop()
+
+time_series_default_values = [
+    "contour_deviation_1",
+    "current_1",
+]
+default_axis = "Y"
+default_direction = "GL"
+
+
+# Shared by all sessions of this process; treat the results as read-only.
+# Keyed by the source mtimes, so a rewritten file is loaded again and the
+# outdated copy is evicted.
+@st.cache_resource(max_entries=2)
+def load_reference_tables(
+    reference_mtimes: dict[str, float],
+) -> dict[str, pd.DataFrame]:
+    return load_for_all_fractions(load_reference_table, list(reference_mtimes))
+
+
+def get_series_mtimes(
+    machine_id: str,
+    mv_avg_window_size_fracs: list[str],
+) -> dict[str, float | None]:
+    # None for a window fraction without a file for this machine.
+    mtimes: dict[str, float | None] = {}
+    for frac in mv_avg_window_size_fracs:
+        preprocessed_file = get_preprocessed_file(machine_id, frac)
+        mtimes[frac] = (
+            preprocessed_file.stat().st_mtime
+            if preprocessed_file.is_file()
+            else None
+        )
+    return mtimes
+
+
+@st.cache_resource(max_entries=16)
+def load_series(
+    machine_id: str,
+    series_mtimes: dict[str, float | None],
+    time_series: tuple[str, ...],
+) -> dict[str, pd.DataFrame]:
+    def load(mv_avg_window_size_frac: str) -> pd.DataFrame:
+        if series_mtimes[mv_avg_window_size_frac] is None:
+            return pd.DataFrame()
+        return load_machine_series(
+            mv_avg_window_size_frac=mv_avg_window_size_frac,
+            machine_id=machine_id,
+            time_series=list(time_series),
+        )
+
+    return load_for_all_fractions(load, list(series_mtimes))
+
+
+mv_avg_window_size_fracs = list_window_fractions()
+
+st.set_page_config(layout="wide")
+st.title("Window Fraction Comparison")
+
+if "comparison_single_done" not in st.session_state:
+    st.session_state.comparison_single_done = False
+if "comparison_speed_done" not in st.session_state:
+    st.session_state.comparison_speed_done = False
+if "comparison_multi_done" not in st.session_state:
+    st.session_state.comparison_multi_done = False
+
+reference_mtimes = {
+    frac: get_reference_table_file(frac).stat().st_mtime
+    for frac in mv_avg_window_size_fracs
+    if get_reference_table_file(frac).is_file()
+}
+if len(reference_mtimes) == 0:
+    st.error(f"No reference tables found in {APP_DATA_PATH}.")
+    st.stop()
+reference_tables = load_reference_tables(reference_mtimes)
+keys = pd.concat(
+    [table[MEASUREMENT_KEY_VARS] for table in reference_tables.values()],
+    ignore_index=True,
+).drop_duplicates()
+
+# ---- FORM 1 ----
+with st.form("comparison_single_selection_form"):
+    single_selection_row = st.columns(3)
+    machine_id = single_selection_row[0].selectbox(
+        "machine_id",
+        list(sorted(keys["machine_id"].unique())),
+    )
+    measure_directions = list(sorted(keys["measure_direction"].unique()))
+    measure_direction = single_selection_row[1].selectbox(
+        "measure_direction",
+        measure_directions,
+        index=(
+            measure_directions.index(default_direction)
+            if default_direction in measure_directions
+            else 0
+        ),
+    )
+    axes = list(sorted(keys["axis"].unique()))
+    axis = single_selection_row[2].selectbox(
+        "axis",
+        axes,
+        index=axes.index(default_axis) if default_axis in axes else 0,
+    )
+    single_submitted = st.form_submit_button("Apply")
+    if single_submitted:
+        st.session_state.comparison_single_done = True
+        st.session_state.comparison_machine_id = machine_id
+        st.session_state.comparison_measure_direction = measure_direction
+        st.session_state.comparison_axis = axis
+
+# ---- FORM 2 ----
+if st.session_state.comparison_single_done:
+    selected_keys = keys[
+        (keys["machine_id"] == st.session_state.comparison_machine_id)
+        & (
+            keys["measure_direction"]
+            == st.session_state.comparison_measure_direction
+        )
+        & (keys["axis"] == st.session_state.comparison_axis)
+    ]
+    with st.form("comparison_speed_selection_form"):
+        speed = st.selectbox(
+            "speed", list(sorted(selected_keys["speed"].unique()))
+        )
+        speed_submitted = st.form_submit_button("Apply")
+        if speed_submitted:
+            st.session_state.comparison_speed_done = True
+            st.session_state.comparison_speed = speed
+
+# ---- FORM 3 ----
+if (
+    st.session_state.comparison_single_done
+    and st.session_state.comparison_speed_done
+):
+    speed_keys = selected_keys[
+        selected_keys["speed"] == st.session_state.comparison_speed
+    ]
+    with st.form("comparison_multi_selection_form"):
+        date = st.selectbox("date", list(sorted(speed_keys["date"].unique())))
+        fracs = st.multiselect(
+            "moving average window size fractions",
+            list(reference_mtimes),
+            default=list(reference_mtimes),
+        )
+        time_series = st.multiselect(
+            "time series", TIME_SERIES, default=time_series_default_values
+        )
+        multi_submitted = st.form_submit_button("Apply")
+        if multi_submitted:
+            st.session_state.comparison_multi_done = True
+            st.session_state.comparison_date = date
+            st.session_state.comparison_fracs = fracs
+            st.session_state.comparison_time_series = time_series
+
+if (
+    st.session_state.comparison_single_done
+    and st.session_state.comparison_speed_done
+    and st.session_state.comparison_multi_done
+):
+    key = (
+        st.session_state.comparison_machine_id,
+        st.session_state.comparison_measure_direction,
+        st.session_state.comparison_axis,
+        st.session_state.comparison_speed,
+        st.session_state.comparison_date,
+    )
+    series = load_series(
+        machine_id=st.session_state.comparison_machine_id,
+        series_mtimes=get_series_mtimes(
+            st.session_state.comparison_machine_id, list(reference_mtimes)
+        ),
+        time_series=tuple(TIME_SERIES),
+    )
+    st.header(" | ".join(key))
+    fracs = []
+    for frac in st.session_state.comparison_fracs:
+        if key in series[frac].index:
+            fracs.append(frac)
+        else:
+            st.warning(f"Measurement not found for fraction {frac}.")
+    for ts_name in st.session_state.comparison_time_series:
+        overlay = {
+            frac: pd.Series(np.asarray(series[frac].loc[key, ts_name]).ravel())
+            for frac in fracs
+            if ts_name in series[frac].columns
+        }
+        st.subheader(ts_name)
+        st.line_chart(pd.DataFrame(overlay))